@@ -0,0 +1 @@
+"""Offline benchmarks for BeepBasket (``python -m benchmarks.run``)."""
@@ -0,0 +1,64 @@
+"""Compare two benchmark result files.
+
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 10]
+
+Prints every numeric metric present in both files with the relative change
+and exits with 1 when a timing got slower (or throughput lower) by more than
+``--threshold`` percent.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict
+
+# Metrics where a higher value is better; for everything else lower is better
+HIGHER_IS_BETTER = ("scans_per_second", "cache_hit_ratio")
+# Keys that describe the run rather than measure it
+SKIP = ("parameters", "created", "commit", "dirty", "python", "homeassistant",
+        "entries", "count", "scans", "processed", "api_requests", "todo_calls", "queue", "counters")
+
+
+def flatten(results: Any, prefix: str = "") -> Dict[str, float]:
+    metrics: Dict[str, float] = {}
+    if isinstance(results, dict):
+        for key, value in results.items():
+            if key not in SKIP:
+                metrics.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(results, list):
+        for item in results:
+            # Cache results are keyed by backend and size
+            name = f"{item.get('backend')}-{item.get('entries')}" if isinstance(item, dict) else str(len(metrics))
+            metrics.update(flatten(item, f"{prefix}{name}."))
+    elif isinstance(results, (int, float)) and not isinstance(results, bool):
+        metrics[prefix.rstrip(".")] = float(results)
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = flatten(json.load(f))
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = flatten(json.load(f))
+
+    regressions = 0
+    for name in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[name], candidate[name]
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if name.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:60} {old:12.3f} {new:12.3f} {change:+8.1f}%{flag}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Local stand-in for the OpenFoodFacts product API."""
+import asyncio
+import random
+from typing import Optional
+
+from aiohttp import web
+
+
+class FakeOpenFoodFacts:
+    """Answers ``/api/v2/product/{barcode}`` after ``latency`` ± ``jitter`` seconds.
+
+    ``failure_rate`` of the requests get a 503, ``not_found_rate`` a 404 and
+    the rest a product named after the barcode.
+    """
+
+    def __init__(self, latency: float = 0.1, jitter: float = 0.05, failure_rate: float = 0.0,
+                 not_found_rate: float = 0.1, seed: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.not_found_rate = not_found_rate
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.port = 0
+
+    @property
+    def product_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v2/product/{{barcode}}"
+
+    async def async_start(self):
+        app = web.Application()
+        app.router.add_get("/api/v2/product/{barcode}", self._product)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def async_stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _product(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(max(0.0, self._rng.uniform(self.latency - self.jitter, self.latency + self.jitter)))
+        roll = self._rng.random()
+        if roll < self.failure_rate:
+            return web.json_response({"status": 0}, status=503)
+        if roll < self.failure_rate + self.not_found_rate:
+            return web.json_response({"status": 0, "status_verbose": "product not found"}, status=404)
+        barcode = request.match_info["barcode"]
+        return web.json_response({
+            "code": barcode,
+            "status": 1,
+            "product": {
+                "product_name": f"Product {barcode}",
+                "brands": "Benchmark",
+                "categories": "Groceries,Snacks",
+            },
+        })
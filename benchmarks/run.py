@@ -0,0 +1,370 @@
+"""Offline benchmarks for the scan pipeline and the cache stores.
+
+    python -m benchmarks.run --output results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.compare results/old.json results/new.json
+
+Needs ``homeassistant`` (and so aiohttp) installed; nothing talks to the
+internet. OpenFoodFacts is replaced by a local server with configurable
+latency and failure rates, the todo list by an in-memory fake.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from homeassistant.const import __version__ as HA_VERSION  # noqa: E402
+
+from custom_components.beepbasket import async_setup_entry, async_unload_entry  # noqa: E402
+from custom_components.beepbasket.cache import BarcodeCache  # noqa: E402
+from custom_components.beepbasket.search import ProductSearchIndex  # noqa: E402
+from custom_components.beepbasket.const import (  # noqa: E402
+    CONF_DEDUP_WINDOW,
+    CONF_HEDGE_DELAY,
+    CONF_LOCAL_PROVIDER_TIMEOUT,
+    CONF_LOCAL_PROVIDER_URL,
+    CONF_OVERFLOW,
+    CONF_PROVIDERS,
+    CONF_QUEUE_SIZE,
+    CONF_SCANNER_ENTITIES,
+    CONF_STORAGE_BACKEND,
+    CONF_WORKERS,
+    DOMAIN,
+    OVERFLOW_COALESCE,
+    STORAGE_JSON,
+    STORAGE_SQLITE,
+)
+
+from tests.fake_hass import TODO_ENTITY, FakeConfigEntry, async_create_hass  # noqa: E402
+from .off_server import FakeOpenFoodFacts  # noqa: E402
+
+# Timed single-entry flushes per cache size
+INCREMENTAL_SAVES = 50
+# Typeahead queries: prefixes of every length, typos, barcode prefixes
+SEARCH_QUERIES = 500
+
+
+def ean13(number: int) -> str:
+    """A valid EAN-13 (correct check digit) for a running number."""
+    body = f"50{number:010d}"
+    total = sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def random_barcodes(count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [ean13(rng.randrange(10 ** 10)) for _ in range(count)]
+
+
+def _git_commit() -> Dict[str, Any]:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+async def _wait_for(condition, timeout: float):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("benchmark did not drain in time")
+        await asyncio.sleep(0.005)
+
+
+async def bench_scans(args, workdir: str) -> Dict[str, Any]:
+    """Fire ``barcode_scanned`` events and measure throughput and latency."""
+    hass = await async_create_hass(os.path.join(workdir, "scans"), todo_latency=args.todo_latency / 1000)
+    os.makedirs(hass.config.path(f"custom_components/{DOMAIN}"), exist_ok=True)
+    off = FakeOpenFoodFacts(
+        latency=args.api_latency / 1000, jitter=args.api_jitter / 1000,
+        failure_rate=args.failure_rate, not_found_rate=args.not_found_rate,
+    )
+    await off.async_start()
+
+    entry = FakeConfigEntry(
+        {"shopping_list_entity": TODO_ENTITY, CONF_SCANNER_ENTITIES: []},
+        {
+            CONF_QUEUE_SIZE: max(args.scans, 1),
+            CONF_WORKERS: args.workers,
+            CONF_DEDUP_WINDOW: 0,
+            CONF_OVERFLOW: OVERFLOW_COALESCE,
+            CONF_STORAGE_BACKEND: args.scan_backend,
+            # The stand-in is the only provider
+            CONF_PROVIDERS: [],
+            CONF_LOCAL_PROVIDER_URL: off.product_url,
+            CONF_LOCAL_PROVIDER_TIMEOUT: args.api_timeout,
+            CONF_HEDGE_DELAY: 0,
+        },
+    )
+    try:
+        await async_setup_entry(hass, entry)
+        data = hass.data[DOMAIN]
+        await asyncio.wait_for(data["ready"].wait(), args.timeout)
+
+        barcodes = random_barcodes(args.unique)
+        known = barcodes[:int(len(barcodes) * args.hit_ratio)]
+        await data["cache"].set_products({
+            barcode: {"name": f"Known {barcode}", "source": "benchmark"} for barcode in known
+        })
+
+        rng = random.Random(2)
+        scans = [rng.choice(barcodes) for _ in range(args.scans)]
+        scan_queue = data["scan_queue"]
+        resolver = data["resolver"]
+
+        def queue_drained():
+            stats = scan_queue.stats
+            rejected = stats["deduplicated"] + stats["coalesced"] + stats["dropped"]
+            return stats["processed"] + stats["failed"] + rejected >= len(scans) and not scan_queue.depth
+
+        started = time.perf_counter()
+        for barcode in scans:
+            hass.bus.async_fire("barcode_scanned", {"barcode": barcode})
+            await asyncio.sleep(1 / args.rate if args.rate else 0)
+        await _wait_for(queue_drained, args.timeout)
+        listed = time.perf_counter() - started
+        await _wait_for(lambda: not resolver.pending, args.timeout)
+        resolved = time.perf_counter() - started
+
+        pipeline = data["pipeline_stats"].as_dict()
+        return {
+            "scans": len(scans),
+            "processed": scan_queue.stats["processed"],
+            "scans_per_second": round(scan_queue.stats["processed"] / listed, 1),
+            "drain_seconds": round(listed, 3),
+            "resolve_seconds": round(resolved, 3),
+            "queue": dict(scan_queue.stats),
+            "stages": pipeline["stages"],
+            "counters": pipeline["counters"],
+            "cache_hit_ratio": pipeline["cache_hit_ratio"],
+            "api_requests": off.requests,
+            "todo_calls": hass.data["fake_todo"].calls,
+        }
+    finally:
+        await async_unload_entry(hass, entry)
+        entry.async_unload()
+        await off.async_stop()
+        await hass.async_stop(force=True)
+
+
+def _products(size: int) -> Dict[str, Dict[str, Any]]:
+    return {
+        ean13(i): {
+            "name": f"Product {i}",
+            "brands": "Benchmark",
+            "categories": "Groceries,Snacks",
+            "source": "openfoodfacts",
+        }
+        for i in range(size)
+    }
+
+
+def _disk_bytes(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+async def bench_cache(hass, backend: str, size: int, workdir: str) -> Dict[str, Any]:
+    """Load/save times, disk size and resident memory for ``size`` entries."""
+    directory = os.path.join(workdir, f"cache-{backend}-{size}")
+    os.makedirs(directory)
+    path = os.path.join(directory, "barcode_cache.json")
+
+    cache = BarcodeCache(path, hass, backend)
+    await cache.load()
+    started = time.perf_counter()
+    await cache.set_products(_products(size))
+    bulk_write = time.perf_counter() - started
+    started = time.perf_counter()
+    await cache.async_close()
+    close = time.perf_counter() - started
+
+    cache = BarcodeCache(path, hass, backend)
+    started = time.perf_counter()
+    await cache.load()
+    load = time.perf_counter() - started
+
+    saves: List[float] = []
+    for i in range(INCREMENTAL_SAVES):
+        await cache.set_product(ean13(i), {"name": f"Renamed {i}", "source": "manual", "local_override": True})
+        started = time.perf_counter()
+        await cache.async_flush()
+        saves.append((time.perf_counter() - started) * 1000)
+    await cache.async_close()
+    saves.sort()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    cache = BarcodeCache(path, hass, backend)
+    await cache.load()
+    # Let the loop drop the executor future that still holds the raw load result
+    await asyncio.sleep(0)
+    resident = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    await cache.async_close()
+
+    return {
+        "backend": backend,
+        "entries": size,
+        "bulk_write_seconds": round(bulk_write, 4),
+        "close_seconds": round(close, 4),
+        "load_seconds": round(load, 4),
+        "incremental_save_ms": {
+            "p50": round(saves[len(saves) // 2], 3),
+            "p95": round(saves[int(len(saves) * 0.95) - 1], 3),
+            "max": round(saves[-1], 3),
+        },
+        "disk_bytes": _disk_bytes(directory),
+        "memory_bytes_per_entry": round(resident / size, 1),
+    }
+
+
+async def bench_caches(args, workdir: str) -> List[Dict[str, Any]]:
+    hass = await async_create_hass(os.path.join(workdir, "caches"))
+    try:
+        return [
+            await bench_cache(hass, backend, size, workdir)
+            for backend in args.backends for size in args.sizes
+        ]
+    finally:
+        await hass.async_stop(force=True)
+
+
+def _percentiles_ms(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "p50": round(samples[len(samples) // 2] * 1000, 3),
+        "p95": round(samples[int(len(samples) * 0.95) - 1] * 1000, 3),
+        "max": round(samples[-1] * 1000, 3),
+    }
+
+
+def bench_search(args) -> Dict[str, Any]:
+    """Build time, query latency and single-update cost of the search index."""
+    rng = random.Random(3)
+    vocabulary = [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10)))
+        for _ in range(20000)
+    ]
+    categories = ["Beverages", "Snacks", "Dairies", "Breakfast cereals", "Plant-based foods", "Frozen foods"]
+    entries = [
+        (ean13(i), {
+            "name": " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 4))),
+            "brands": rng.choice(vocabulary[:2000]),
+            "categories": ",".join(rng.sample(categories, 2)),
+            "status": "complete",
+            "scanned_count": rng.randint(0, 50),
+        })
+        for i in range(args.search_size)
+    ]
+
+    index = ProductSearchIndex()
+    started = time.perf_counter()
+    index.build(entries)
+    build = time.perf_counter() - started
+
+    queries = []
+    for _ in range(SEARCH_QUERIES):
+        barcode, entry = rng.choice(entries)
+        word = rng.choice(entry["name"].split())
+        kind = rng.random()
+        if kind < 0.6:
+            queries.append(word[:rng.randint(2, len(word))])
+        elif kind < 0.8:
+            position = rng.randrange(len(word))
+            queries.append(word[:position] + rng.choice("aeiou") + word[position + 1:])
+        else:
+            queries.append(barcode[:rng.randint(4, 12)])
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query)
+        timings.append(time.perf_counter() - started)
+
+    updates = []
+    for barcode, entry in entries[:INCREMENTAL_SAVES]:
+        started = time.perf_counter()
+        index.async_update(barcode, {**entry, "name": f"Renamed {entry['name']}", "scanned_count": 99})
+        updates.append(time.perf_counter() - started)
+
+    return {
+        "entries": args.search_size,
+        "build_seconds": round(build, 4),
+        "query_ms": _percentiles_ms(timings),
+        "update_ms": _percentiles_ms(updates),
+    }
+
+
+async def async_main(args) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "created": datetime.now().isoformat(),
+        **_git_commit(),
+        "python": platform.python_version(),
+        "homeassistant": HA_VERSION,
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+    }
+    with tempfile.TemporaryDirectory(prefix="beepbasket-bench-") as workdir:
+        if not args.skip_scans:
+            results["scan_pipeline"] = await bench_scans(args, workdir)
+        if not args.skip_cache:
+            results["cache"] = await bench_caches(args, workdir)
+        if not args.skip_search:
+            results["search"] = bench_search(args)
+    return results
+
+
+def _csv(cast):
+    return lambda value: [cast(part) for part in value.split(",") if part]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scans", type=int, default=2000, help="scan events to fire")
+    parser.add_argument("--unique", type=int, default=500, help="distinct barcodes among the scans")
+    parser.add_argument("--hit-ratio", type=float, default=0.8, help="share of barcodes already cached")
+    parser.add_argument("--rate", type=float, default=0, help="scans per second (0 = burst)")
+    parser.add_argument("--workers", type=int, default=2, help="scan queue workers")
+    parser.add_argument("--scan-backend", choices=[STORAGE_JSON, STORAGE_SQLITE], default=STORAGE_JSON)
+    parser.add_argument("--api-latency", type=float, default=100, help="fake OpenFoodFacts latency (ms)")
+    parser.add_argument("--api-jitter", type=float, default=50, help="latency jitter (ms)")
+    parser.add_argument("--api-timeout", type=float, default=10, help="lookup timeout (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of 503 answers")
+    parser.add_argument("--not-found-rate", type=float, default=0.1, help="share of 404 answers")
+    parser.add_argument("--todo-latency", type=float, default=1, help="fake todo service latency (ms)")
+    parser.add_argument("--sizes", type=_csv(int), default=[1000, 10000, 100000], help="cache sizes")
+    parser.add_argument("--backends", type=_csv(str), default=[STORAGE_JSON, STORAGE_SQLITE])
+    parser.add_argument("--search-size", type=int, default=100000, help="entries in the search benchmark")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for the pipeline")
+    parser.add_argument("--skip-scans", action="store_true")
+    parser.add_argument("--skip-cache", action="store_true")
+    parser.add_argument("--skip-search", action="store_true")
+    parser.add_argument("--output", help="write results here (default: stdout)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(async_main(args))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,125 +1,106 @@
 import logging
-import aiohttp
 import asyncio
-import json
-import aiofiles
-from datetime import datetime
+import os
+import time
 from typing import Dict, Any, Optional
+from aiohttp import web
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONTENT_TYPE_JSON, EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant, SupportsResponse
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+from homeassistant.helpers.json import json_bytes
+
+from .barcode import INVALID_STATES, is_in_store, normalize_barcode
+from .batch import MAX_BATCH_SIZE, async_process_batch, parse_scans
+from .cache import STATUS_FILTERS, BarcodeCache
+from .const import (
+    DOMAIN,
+    CONF_DEDUP_WINDOW,
+    CONF_HEDGE_DELAY,
+    CONF_LOCAL_PROVIDER_TIMEOUT,
+    CONF_LOCAL_PROVIDER_URL,
+    CONF_MAX_RESIDENT_ENTRIES,
+    CONF_OVERFLOW,
+    CONF_PROVIDERS,
+    CONF_QUEUE_SIZE,
+    CONF_REFRESH_AFTER_DAYS,
+    CONF_REFRESH_BUDGET,
+    CONF_REFRESH_IDLE_END,
+    CONF_REFRESH_IDLE_START,
+    CONF_SCANNER_ENTITIES,
+    CONF_STORAGE_BACKEND,
+    CONF_TRACE_SCANS,
+    CONF_WORKERS,
+    DEFAULT_DEDUP_WINDOW,
+    DEFAULT_HEDGE_DELAY,
+    DEFAULT_LOCAL_PROVIDER_TIMEOUT,
+    DEFAULT_MAX_RESIDENT_ENTRIES,
+    DEFAULT_OVERFLOW,
+    DEFAULT_PROVIDERS,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_REFRESH_AFTER_DAYS,
+    DEFAULT_REFRESH_BUDGET,
+    DEFAULT_REFRESH_IDLE_END,
+    DEFAULT_REFRESH_IDLE_START,
+    DEFAULT_STORAGE_BACKEND,
+    DEFAULT_TRACE_SCANS,
+    DEFAULT_WORKERS,
+    SIGNAL_CACHE_UPDATED,
+    SIGNAL_SCAN,
+)
+from .config_flow import suggested_scanners
+from .ingest import ScanQueue
+from .lookup import LookupClient, LookupUnavailable, build_providers, provider_timeouts
+from .mappings import MAX_BULK_MAPPINGS, async_bulk_add_mappings, build_mapping
+from .product_index import ProductIndex
+from .refresh import ProductRefresher
+from .resolver import ProductResolver
+from .search import ProductSearchIndex, result_summary
+from .shopping_list import ShoppingListMirror
+from .stats import STAGE_CACHE_GET, STAGE_SCAN_TO_LIST, STAGE_TODO_ADD, PipelineStats
+from .transfer import async_import_ndjson, async_stream_export
+from .websocket import async_register_websocket
 
-DOMAIN = "beepbasket"
 TODO_DOMAIN = "todo"
+PLATFORMS = ["sensor"]
+VIEWS_REGISTERED = f"{DOMAIN}_views_registered"
+SERVICES = ("add_mapping", "bulk_add_mappings", "remove_mapping", "relookup", "scan_batch", "import_dump")
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Log a reminder if the shopping list has not appeared by then
+TODO_WAIT_WARNING = 60
+
+NOT_READY = {"error": "BeepBasket is starting"}
 
 _LOGGER = logging.getLogger(__name__)
 
-class BarcodeCache:
-    """Structured cache aligned with OpenFoodFacts schema."""
-    
-    # def __init__(self, cache_path: str):
-    #     self._cache_path = cache_path
-    #     self._cache: Dict[str, Dict[str, Any]] = {}
-    
-
-    def __init__(self, cache_path: str, hass):  # ← ADD hass param
-        self._cache_path = cache_path
-        self.hass = hass  # ← ADD hass reference
-        self._cache: Dict[str, Dict[str, Any]] = {}
-
-    async def load(self):
-        """Load structured cache from custom_components folder."""
-        try:
-            async with aiofiles.open(self._cache_path, 'r', encoding='utf-8') as f:
-                content = await f.read()
-                self._cache = json.loads(content) if content.strip() else {}
-            _LOGGER.info("📂 Loaded %d structured cache entries", len(self._cache))
-        except FileNotFoundError:
-            _LOGGER.info("📂 New cache file created")
-            self._cache = {}
-        except json.JSONDecodeError as e:
-            _LOGGER.error("❌ Cache JSON corrupt: %s", e)
-            self._cache = {}
-    
-    async def _save(self):
-        """Persist structured cache."""
-        async with aiofiles.open(self._cache_path, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(self._cache, indent=2, ensure_ascii=False))
-    
-    async def get(self, barcode: str) -> Optional[Dict[str, Any]]:
-        """Get full structured entry."""
-        return self._cache.get(barcode)
-    
-    async def get_display_name(self, barcode: str) -> str:
-        """For shopping list - safe fallback."""
-        entry = self._cache.get(barcode)
-        if entry and entry.get("status") == "complete":
-            return entry.get("name", barcode)
-        return barcode
-    
-    async def set_product(self, barcode: str, product_data: Dict[str, Any]):
-        """Set complete product (API or manual)."""
-        product_data["status"] = "complete"
-        product_data["scanned_count"] = product_data.get("scanned_count", 0) + 1
-        product_data["last_updated"] = datetime.now().isoformat()
-        self._cache[barcode] = product_data
-        await self._save()
-        self.hass.bus.async_fire("barcode_cache_updated")
-        _LOGGER.info("💾 Cached product: %s → %s", barcode, product_data.get("name"))
-    
-    # async def set_unknown(self, barcode: str):
-    #     """Track unknown barcode scans."""
-    #     if barcode not in self._cache:
-    #         self._cache[barcode] = {
-    #             "status": "unknown",
-    #             "scanned_count": 0,
-    #             "first_seen": datetime.now().isoformat()
-    #         }
-        
-    #     entry = self._cache[barcode]
-    #     entry["scanned_count"] += 1
-        
-    #     if entry["scanned_count"] >= 3:
-    #         entry["ready_to_contribute"] = True
-        
-    #     await self._save()
-    #     _LOGGER.info("❓ Unknown #%d: %s", entry["scanned_count"], barcode)
-
-
-    async def set_unknown(self, barcode: str):
-        """Track unknown barcode scans WITH name=barcode."""
-        if barcode not in self._cache:
-            self._cache[barcode] = {
-                "status": "unknown",
-                "name": barcode,  # ← ADD THIS
-                "scanned_count": 0,
-                "first_seen": datetime.now().isoformat()
-            }
-        
-        entry = self._cache[barcode]
-        entry["scanned_count"] += 1
-        if entry["scanned_count"] >= 3:
-            entry["ready_to_contribute"] = True
-        
-        await self._save()
-        self.hass.bus.async_fire("barcode_cache_updated")
-        _LOGGER.info("❓ Unknown #%d: %s (%s)", entry["scanned_count"], barcode, entry["name"])
+
+def is_ready(hass: HomeAssistant) -> bool:
+    """Cache loaded and the shopping list available."""
+    data = hass.data.get(DOMAIN, {})
+    ready = data.get("ready")
+    return ready is not None and ready.is_set() and not data.get("startup_error")
 
 
+def not_ready_body(hass: HomeAssistant) -> Dict[str, Any]:
+    error = hass.data.get(DOMAIN, {}).get("startup_error")
+    return {"error": f"BeepBasket failed to start: {error}"} if error else NOT_READY
 
 
-    async def remove(self, barcode: str):
-        """Remove entry."""
-        if barcode in self._cache:
-            del self._cache[barcode]
-            await self._save()
-            self.hass.bus.async_fire("barcode_cache_updated")
-            _LOGGER.info("🗑️ Removed: %s", barcode)
-    
-    def get_cache_for_api(self) -> Dict[str, Dict[str, Any]]:
-        """Return full structured cache for REST API."""
-        return self._cache
+async def async_wait_ready(hass: HomeAssistant):
+    """Wait until the pipeline runs; raise if starting it failed."""
+    data = hass.data[DOMAIN]
+    await data["ready"].wait()
+    if data.get("startup_error"):
+        raise HomeAssistantError(f"BeepBasket failed to start: {data['startup_error']}")
 
 class BarcodeListView(HomeAssistantView):
     """REST endpoint for barcode cache (GET mappings)."""
@@ -127,11 +108,67 @@ class BarcodeListView(HomeAssistantView):
     name = "api:beepbasket:mappings"
     requires_auth = True
 
-    def __init__(self, cache):
-        self._cache = cache
+    def __init__(self, hass):
+        self.hass = hass
+
+    @property
+    def _cache(self):
+        return self.hass.data[DOMAIN]["cache"]
 
     async def get(self, request):
-        return self.json(self._cache.get_cache_for_api())
+        """Full dict by default; ``since``, ``cursor``/``limit``, ``top`` and ``status`` narrow it.
+
+        Every response carries the cache version as ETag, so an unchanged
+        cache answers ``If-None-Match`` with 304.
+        """
+        if not is_ready(self.hass):
+            return self.json(not_ready_body(self.hass), 503)
+        cache = self._cache
+        # Taken first: the body covers at least this version
+        version = cache.version
+        etag = f'"{version}"'
+        if etag in (tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")):
+            return web.Response(status=304, headers={"ETag": etag})
+
+        query = request.query
+        status = query.get("status") or None
+        if status and status not in STATUS_FILTERS:
+            return self.json({"error": f"status must be one of {', '.join(STATUS_FILTERS)}"}, 400)
+        try:
+            since = int(query["since"]) if "since" in query else None
+            limit = int(query.get("limit", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return self.json({"error": "since and limit must be integers"}, 400)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        if "top" in query:
+            try:
+                top = max(1, min(int(query["top"]), MAX_PAGE_SIZE))
+            except ValueError:
+                return self.json({"error": "top must be an integer"}, 400)
+            rows = await cache.async_query(status, "scanned_count", top)
+            body = {"version": version, "entries": [{"barcode": barcode, **entry} for barcode, entry in rows]}
+        elif since is not None:
+            delta = await cache.changes_since(since, status)
+            if delta is None:
+                if status:
+                    changed = dict(await cache.async_query(status))
+                else:
+                    changed = dict(await cache.async_entries())
+                body = {"version": version, "full": True, "changed": changed, "removed": []}
+            else:
+                changed, removed = delta
+                body = {"version": version, "full": False, "changed": changed, "removed": removed}
+        elif status or "cursor" in query or "limit" in query:
+            entries, next_cursor = await cache.async_page(query.get("cursor"), limit, status)
+            body = {"version": version, "entries": entries, "next_cursor": next_cursor}
+        else:
+            # Copy the live mapping: it is serialized in the executor below
+            body = dict(await cache.async_entries())
+
+        # Turning every record into JSON takes a while on large caches; keep it off the event loop
+        payload = await self.hass.async_add_executor_job(json_bytes, body)
+        return web.Response(body=payload, content_type=CONTENT_TYPE_JSON, headers={"ETag": etag})
 
 class BarcodeCacheAddView(HomeAssistantView):
     """REST endpoint to add cache entry."""
@@ -139,32 +176,102 @@ class BarcodeCacheAddView(HomeAssistantView):
     name = "api:beepbasket:cache:add"
     requires_auth = True
 
-    def __init__(self, cache):
-        self._cache = cache
+    def __init__(self, hass):
+        self.hass = hass
+
+    @property
+    def _cache(self):
+        return self.hass.data[DOMAIN]["cache"]
 
     async def post(self, request):
+        if not is_ready(self.hass):
+            return self.json(not_ready_body(self.hass), 503)
         data = await request.json()
         barcode = data.get("barcode")
         product_data = data.get("product_data", {})
         if barcode and product_data:
-            await self._cache.set_product(barcode.strip(), product_data)
-            return self.json({"success": True})
+            key = normalize_barcode(str(barcode))
+            if key is None:
+                return self.json({"error": "Invalid barcode"}, 400)
+            await self._cache.set_product(key, product_data)
+            return self.json({"success": True, "barcode": key})
         return self.json({"error": "Missing barcode or product_data"}, 400)
 
+class BarcodeCacheBulkAddView(HomeAssistantView):
+    """REST endpoint to add many manual mappings at once."""
+    url = "/api/beepbasket/cache/bulk_add"
+    name = "api:beepbasket:cache:bulk_add"
+    requires_auth = True
+
+    def __init__(self, hass):
+        self.hass = hass
+
+    async def post(self, request):
+        if not is_ready(self.hass):
+            return self.json(not_ready_body(self.hass), 503)
+        data = await request.json()
+        mappings = data.get("mappings") if isinstance(data, dict) else data
+        if not isinstance(mappings, list) or not mappings:
+            return self.json({"error": "Missing mappings"}, 400)
+        if len(mappings) > MAX_BULK_MAPPINGS:
+            return self.json({"error": f"At most {MAX_BULK_MAPPINGS} mappings per request"}, 413)
+        return self.json(await async_bulk_add_mappings(self.hass, mappings))
+
+class BarcodeCacheExportView(HomeAssistantView):
+    """REST endpoint streaming the cache as NDJSON (backup, sync to another instance)."""
+    url = "/api/beepbasket/cache/export"
+    name = "api:beepbasket:cache:export"
+    requires_auth = True
+
+    def __init__(self, hass):
+        self.hass = hass
+
+    async def get(self, request):
+        if not is_ready(self.hass):
+            return self.json(not_ready_body(self.hass), 503)
+        status = request.query.get("status") or None
+        if status and status not in STATUS_FILTERS:
+            return self.json({"error": f"status must be one of {', '.join(STATUS_FILTERS)}"}, 400)
+        compress = request.query.get("gzip", "").lower() in ("1", "true")
+        return await async_stream_export(request, self.hass.data[DOMAIN]["cache"], status, compress)
+
+class BarcodeCacheImportView(HomeAssistantView):
+    """REST endpoint merging an NDJSON export (plain or gzip) into the cache."""
+    url = "/api/beepbasket/cache/import"
+    name = "api:beepbasket:cache:import"
+    requires_auth = True
+
+    def __init__(self, hass):
+        self.hass = hass
+
+    async def post(self, request):
+        if not is_ready(self.hass):
+            return self.json(not_ready_body(self.hass), 503)
+        result = await async_import_ndjson(self.hass.data[DOMAIN]["cache"], request.content)
+        return self.json(result, 400 if "error" in result else 200)
+
 class BarcodeCacheRemoveView(HomeAssistantView):
     """REST endpoint to remove cache entry."""
     url = "/api/beepbasket/cache/remove"
     name = "api:beepbasket:cache:remove"
     requires_auth = True
 
-    def __init__(self, cache):
-        self._cache = cache
+    def __init__(self, hass):
+        self.hass = hass
+
+    @property
+    def _cache(self):
+        return self.hass.data[DOMAIN]["cache"]
 
     async def post(self, request):
+        if not is_ready(self.hass):
+            return self.json(not_ready_body(self.hass), 503)
         data = await request.json()
         barcode = data.get("barcode")
         if barcode:
-            await self._cache.remove(barcode.strip())
+            # Entries saved before canonical keys may still use the raw spelling
+            barcode = str(barcode).strip()
+            await self._cache.remove(normalize_barcode(barcode) or barcode)
             return self.json({"success": True})
         return self.json({"error": "Missing barcode"}, 400)
 
@@ -178,67 +285,131 @@ class BarcodeLookupView(HomeAssistantView):
         self.hass = hass
 
     async def get(self, request, barcode: str):
-        result = await lookup_product(self.hass, barcode)
+        if not is_ready(self.hass):
+            return self.json(not_ready_body(self.hass), 503)
+        key = normalize_barcode(barcode)
+        if key is None:
+            return self.json({"error": "Invalid barcode"}, 400)
+        result = await lookup_product(self.hass, key)
         if result:
             return self.json(result)
         return self.json({"error": "Product not found"})
 
 
+class BarcodeScanBatchView(HomeAssistantView):
+    """Ingest buffered scans (e.g. from a scanner that was offline)."""
+    url = "/api/beepbasket/scan/batch"
+    name = "api:beepbasket:scan:batch"
+    requires_auth = True
 
+    def __init__(self, hass):
+        self.hass = hass
+
+    async def post(self, request):
+        if not is_ready(self.hass):
+            return self.json(not_ready_body(self.hass), 503)
+        data = await request.json()
+        scans = parse_scans(data.get("scans") if isinstance(data, dict) else data)
+        if scans is None:
+            return self.json({"error": "Expected a list of scans"}, 400)
+        if len(scans) > MAX_BATCH_SIZE:
+            return self.json({"error": f"At most {MAX_BATCH_SIZE} scans per batch"}, 413)
+        results = await async_process_batch(self.hass, scans)
+        return self.json({"results": results})
+
+
+class BarcodeQueueView(HomeAssistantView):
+    """Scan ingestion queue depth and counters."""
+    url = "/api/beepbasket/queue"
+    name = "api:beepbasket:queue"
+    requires_auth = True
+
+    def __init__(self, hass):
+        self.hass = hass
+
+    async def get(self, request):
+        if not is_ready(self.hass):
+            return self.json(not_ready_body(self.hass), 503)
+        scan_queue = self.hass.data[DOMAIN]["scan_queue"]
+        resolver = self.hass.data[DOMAIN]["resolver"]
+        return self.json({
+            "depth": scan_queue.depth,
+            "resolver_pending": resolver.pending,
+            **scan_queue.stats,
+        })
+
+
+class BarcodeSearchView(HomeAssistantView):
+    """Typeahead search over the cache for the card."""
+    url = "/api/beepbasket/search"
+    name = "api:beepbasket:search"
+    requires_auth = True
+
+    def __init__(self, hass):
+        self.hass = hass
+
+    async def get(self, request):
+        """``?q=`` matches words of name/brands/categories or a barcode prefix; ``limit`` and ``status`` narrow it."""
+        if not is_ready(self.hass):
+            return self.json(not_ready_body(self.hass), 503)
+        query = request.query
+        status = query.get("status") or None
+        if status and status not in STATUS_FILTERS:
+            return self.json({"error": f"status must be one of {', '.join(STATUS_FILTERS)}"}, 400)
+        try:
+            limit = max(1, min(int(query.get("limit", DEFAULT_SEARCH_LIMIT)), MAX_SEARCH_LIMIT))
+        except ValueError:
+            return self.json({"error": "limit must be an integer"}, 400)
+        started = time.perf_counter()
+        barcodes = self.hass.data[DOMAIN]["search"].search(query.get("q", ""), limit, status)
+        # The index only holds tokens: read what is shown from the cache
+        entries = await self.hass.data[DOMAIN]["cache"].async_get_many(barcodes)
+        results = [
+            {"barcode": barcode, **result_summary(entries[barcode])} for barcode in barcodes if barcode in entries
+        ]
+        return self.json({
+            "query": query.get("q", ""),
+            "results": results,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        })
+
+
+class BarcodeStatsView(HomeAssistantView):
+    """Per-stage latency percentiles and pipeline counters."""
+    url = "/api/beepbasket/stats"
+    name = "api:beepbasket:stats"
+    requires_auth = True
+
+    def __init__(self, hass):
+        self.hass = hass
+
+    async def get(self, request):
+        """``?traces=1`` adds the recent per-scan traces (needs the trace option)."""
+        if not is_ready(self.hass):
+            return self.json(not_ready_body(self.hass), 503)
+        data = self.hass.data[DOMAIN]
+        stats = data["pipeline_stats"].as_dict(include_traces=request.query.get("traces") in ("1", "true"))
+        stats["queue_depth"] = data["scan_queue"].depth
+        stats["resolver_pending"] = data["resolver"].pending
+        stats["cache_entries"] = len(data["cache"])
+        stats["cache_resident"] = data["cache"].resident_count
+        stats["providers"] = data["lookup_client"].provider_stats()
+        stats["refresh"] = data["refresher"].as_dict()
+        return self.json(stats)
 
 
 
-def is_valid_barcode(code: str) -> bool:
-    """Filter barcodes vs QR codes"""
-    if len(code) < 8:
-        return False
-    if code.isdigit() and 8 <= len(code) <= 14:
-        return True
-    if len(code) > 20 or '.' in code or '/' in code or '=' in code:
-        return False
-    return True
 
 async def get_cache_path(hass: HomeAssistant) -> str:
     """HA-standard: custom_components/beepbasket/barcode_cache.json"""
     return hass.config.path(f"custom_components/{DOMAIN}/barcode_cache.json")
 
 async def lookup_product(hass: HomeAssistant, barcode: str) -> Optional[Dict[str, Any]]:
-    """Robust OpenFoodFacts lookup returning structured data."""
-    url = f"https://world.openfoodfacts.org/api/v0/product/{barcode}.json"
-    timeout = aiohttp.ClientTimeout(total=10)
-    
+    """Product lookup through the entry's provider chain."""
+    client = hass.data[DOMAIN]["lookup_client"]
     try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    _LOGGER.warning("Lookup failed, HTTP %s for %s", resp.status, barcode)
-                    return None
-                
-                data = await resp.json()
-                
-                if data.get("status") != 1:
-                    _LOGGER.debug("Product not found: %s", barcode)
-                    return None
-                
-                product = data.get("product", {})
-                name = (product.get("product_name") or 
-                       product.get("generic_name") or
-                       product.get("brands") or
-                       product.get("categories", "").split(",")[0].strip()).strip()
-                
-                if name:
-                    _LOGGER.debug("Found: %s → %s", barcode, name)
-                    return {
-                        "name": name,
-                        "brands": product.get("brands", ""),
-                        "categories": product.get("categories", ""),
-                        "source": "openfoodfacts"
-                    }
-                
-                _LOGGER.debug("Valid product but no name data: %s", barcode)
-                return None
-                
-    except Exception as err:
+        return await client.async_lookup(barcode)
+    except LookupUnavailable as err:
         _LOGGER.warning("API lookup error for %s: %s", barcode, err)
         return None
 
@@ -250,34 +421,81 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         _LOGGER.error("❌ No shopping list configured in entry data")
         return False
 
-    # Wait for shopping list
-    for attempt in range(15):
-        todo_states = [state.entity_id for state in hass.states.async_all() if state.entity_id.startswith("todo.")]
-        if shopping_list_entity in todo_states:
-            _LOGGER.info("✅ Shopping list '%s' ready", shopping_list_entity)
-            break
-        _LOGGER.info("⏳ Waiting for todo lists... (%s/15)", attempt + 1)
-        await asyncio.sleep(2)
-    else:
-        _LOGGER.error("❌ Shopping list '%s' not available after 30s", shopping_list_entity)
-        return False
-
     hass.data[DOMAIN]["shopping_list_entity"] = shopping_list_entity
     hass.data[DOMAIN]["config_entry"] = entry
+    # Set once the cache is loaded and the shopping list exists; scans queue up until then
+    hass.data[DOMAIN]["ready"] = asyncio.Event()
 
-    # Structured cache
+    pipeline_stats = PipelineStats(trace=entry.options.get(CONF_TRACE_SCANS, DEFAULT_TRACE_SCANS))
+    hass.data[DOMAIN]["pipeline_stats"] = pipeline_stats
+
+    # Structured cache, loaded in the background by async_start_pipeline
     cache_path = await get_cache_path(hass)
-    # cache = BarcodeCache(cache_path)
-    cache = BarcodeCache(cache_path, hass)
-    await cache.load()
+    cache = BarcodeCache(
+        cache_path, hass, entry.options.get(CONF_STORAGE_BACKEND, DEFAULT_STORAGE_BACKEND), pipeline_stats,
+        max_resident=entry.options.get(CONF_MAX_RESIDENT_ENTRIES, DEFAULT_MAX_RESIDENT_ENTRIES),
+    )
     hass.data[DOMAIN]["cache"] = cache
-    _LOGGER.info("📂 Cache ready at: %s", cache_path)
+
+    # Config entries are not unloaded on shutdown, so flush the journal here too
+    async def flush_cache_on_stop(event):
+        await cache.async_close()
+
+    entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, flush_cache_on_stop)
+    )
+
+    product_index = ProductIndex(hass, os.path.join(os.path.dirname(cache_path), "products_index.db"))
+    hass.data[DOMAIN]["product_index"] = product_index
+
+    search = ProductSearchIndex()
+    hass.data[DOMAIN]["search"] = search
+    entry.async_on_unload(async_dispatcher_connect(hass, SIGNAL_CACHE_UPDATED, search.async_update))
+
+    options = entry.options
+    providers = build_providers(
+        options.get(CONF_PROVIDERS, DEFAULT_PROVIDERS),
+        options.get(CONF_LOCAL_PROVIDER_URL, ""),
+        provider_timeouts(options),
+        options.get(CONF_LOCAL_PROVIDER_TIMEOUT, DEFAULT_LOCAL_PROVIDER_TIMEOUT),
+    )
+    client = LookupClient(
+        hass, product_index, pipeline_stats, providers, options.get(CONF_HEDGE_DELAY, DEFAULT_HEDGE_DELAY) / 1000
+    )
+    hass.data[DOMAIN]["lookup_client"] = client
+
+    shopping_list = ShoppingListMirror(hass, shopping_list_entity)
+    hass.data[DOMAIN]["shopping_list"] = shopping_list
+
+    resolver = ProductResolver(hass, cache, client, shopping_list)
+    hass.data[DOMAIN]["resolver"] = resolver
+
+    refresher = ProductRefresher(
+        hass, cache, client, shopping_list, resolver, pipeline_stats,
+        max_age_days=options.get(CONF_REFRESH_AFTER_DAYS, DEFAULT_REFRESH_AFTER_DAYS),
+        budget=options.get(CONF_REFRESH_BUDGET, DEFAULT_REFRESH_BUDGET),
+        idle_start=options.get(CONF_REFRESH_IDLE_START, DEFAULT_REFRESH_IDLE_START),
+        idle_end=options.get(CONF_REFRESH_IDLE_END, DEFAULT_REFRESH_IDLE_END),
+    )
+    hass.data[DOMAIN]["refresher"] = refresher
 
     # REST API endpoints
-    hass.http.register_view(BarcodeListView(cache))
-    hass.http.register_view(BarcodeCacheAddView(cache))
-    hass.http.register_view(BarcodeCacheRemoveView(cache))
-    hass.http.register_view(BarcodeLookupView(hass))
+    # Views outlive a reload (aiohttp routes cannot be removed), so register
+    # them once and let them look up the current entry's objects per request
+    if not hass.data.get(VIEWS_REGISTERED):
+        hass.http.register_view(BarcodeListView(hass))
+        hass.http.register_view(BarcodeCacheAddView(hass))
+        hass.http.register_view(BarcodeCacheBulkAddView(hass))
+        hass.http.register_view(BarcodeCacheExportView(hass))
+        hass.http.register_view(BarcodeCacheImportView(hass))
+        hass.http.register_view(BarcodeCacheRemoveView(hass))
+        hass.http.register_view(BarcodeLookupView(hass))
+        hass.http.register_view(BarcodeScanBatchView(hass))
+        hass.http.register_view(BarcodeQueueView(hass))
+        hass.http.register_view(BarcodeStatsView(hass))
+        hass.http.register_view(BarcodeSearchView(hass))
+        hass.data[VIEWS_REGISTERED] = True
+    async_register_websocket(hass)
     _LOGGER.info("🌐 REST APIs registered")
 
     # # SERVICES
@@ -298,154 +516,319 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     #     display_name = await cache.get_display_name(barcode)
     #     _LOGGER.info("🖥️ Added manual: %s → %s", barcode, display_name)
 
+    async def sync_shopping_list(barcode: str, old_name: str, name: str):
+        """Rename active list items that still show the old name or the barcode."""
+        matching_items = shopping_list.items_for(barcode, old_name)
+        try:
+            for item in matching_items:
+                await shopping_list.async_rename(item, name, barcode)
+            
+            if matching_items:
+                _LOGGER.info("🔄 Synced %d items: %s → %s", len(matching_items), old_name, name)
+        except Exception as e:
+            _LOGGER.error("Shopping list sync FAILED: %s", str(e))
+
     async def add_mapping_service(call):
-        barcode = str(call.data.get("code") or call.data.get("barcode", "")).strip()
-        name = str(call.data.get("product_name") or call.data.get("product", "")).strip()
+        await async_wait_ready(hass)
+        mapping = build_mapping(call.data)
         
-        _LOGGER.debug("🖥️ add_mapping called: %s → %s", barcode, name)
+        _LOGGER.debug("🖥️ add_mapping called: %s", mapping)
         
-        if not barcode or not name:
+        if mapping is None:
             _LOGGER.warning("add_mapping: missing code/barcode or product_name/product")
             return
+        barcode, product_data = mapping
+        name = product_data["name"]
             
         cache = hass.data[DOMAIN]["cache"] 
         old_entry = await cache.get(barcode)
         old_name = old_entry.get("name") if old_entry else barcode
         
-        # Build OFF-compatible product_data (backwards + forwards compatible)
-        product_data = {
-            "name": name,
-            "brands": call.data.get("brands", ""),
-            "quantity": call.data.get("quantity", ""),
-            "stores": call.data.get("stores", ""),
-            "source": call.data.get("source", "manual"),
-            "local_override": True
-        }
-        
         await cache.set_product(barcode, product_data)
         
         # Sync shopping list (unchanged)
         if old_name != name:
             _LOGGER.debug("add_mapping: syncing shopping list %s → %s", old_name, name)
-            shopping_list_entity = hass.data[DOMAIN]["shopping_list_entity"]
-            
-            try:
-                response = await hass.services.async_call(
-                    "todo", "get_items", {"entity_id": shopping_list_entity, "status": "needs_action"},
-                    return_response=True, blocking=True
-                )
-                items = response.get(shopping_list_entity, {}).get('items', [])
-                matching_items = [item for item in items if old_name in item.get("summary", "") or barcode in item.get("summary", "")]
-                
-                for item in matching_items:
-                    await hass.services.async_call(
-                        "todo", "update_item",
-                        {"entity_id": shopping_list_entity, "item": old_name, "rename": name, "status": "needs_action"},
-                        blocking=True
-                    )
-                
-                if matching_items:
-                    _LOGGER.info("🔄 Synced %d items: %s → %s", len(matching_items), old_name, name)
-            except Exception as e:
-                _LOGGER.error("Shopping list sync FAILED: %s", str(e))
+            await sync_shopping_list(barcode, old_name, name)
         
         _LOGGER.info("🖥️ Updated: %s → %s", barcode, name)
 
 
+    async def bulk_add_mappings_service(call):
+        await async_wait_ready(hass)
+        mappings = list(call.data.get("mappings") or [])
+        if len(mappings) > MAX_BULK_MAPPINGS:
+            raise HomeAssistantError(f"At most {MAX_BULK_MAPPINGS} mappings per call, got {len(mappings)}")
+        return await async_bulk_add_mappings(hass, mappings)
+
     async def remove_mapping_service(call):
+        await async_wait_ready(hass)
         barcode = str(call.data["barcode"]).strip()
         if barcode:
+            barcode = normalize_barcode(barcode) or barcode
             await cache.remove(barcode)
             _LOGGER.info("🖥️ Removed: %s", barcode)
 
+    async def relookup_service(call):
+        """Force a fresh OpenFoodFacts lookup, ignoring the negative cache."""
+        await async_wait_ready(hass)
+        barcode = normalize_barcode(str(call.data["barcode"]))
+        if not barcode:
+            _LOGGER.warning("relookup: invalid barcode %r", call.data["barcode"])
+            return
+
+        await cache.clear_negative(barcode)
+        old_entry = await cache.get(barcode)
+        old_name = old_entry.get("name") if old_entry else barcode
+        if old_entry and old_entry.get("local_override"):
+            _LOGGER.info("🖥️ Re-lookup skipped, %s has a manual mapping", barcode)
+            return
+
+        client = hass.data[DOMAIN]["lookup_client"]
+        try:
+            product_data = await client.async_lookup(barcode)
+        except LookupUnavailable as err:
+            _LOGGER.warning("Re-lookup of %s failed: %s", barcode, err)
+            return
+
+        # Not a scan: keep the scan history either way
+        if not product_data:
+            if old_entry and old_entry.get("status") == "complete":
+                _LOGGER.info("❓ Re-lookup: %s not found, keeping '%s'", barcode, old_name)
+            elif old_entry:
+                await cache.set_unknown(barcode, scans=0)
+                _LOGGER.info("❓ Re-lookup: still unknown %s", barcode)
+            else:
+                _LOGGER.info("❓ Re-lookup: %s not found", barcode)
+            return
+
+        if not await cache.refresh_product(barcode, product_data):
+            if await cache.get(barcode) is not None:
+                # Mapped manually while we waited
+                return
+            await cache.set_product(barcode, product_data)
+        _LOGGER.info("🌐 Re-lookup %s → %s", barcode, product_data["name"])
+        if old_name != product_data["name"]:
+            await sync_shopping_list(barcode, old_name, product_data["name"])
+
     hass.services.async_register(DOMAIN, "add_mapping", add_mapping_service)
+    hass.services.async_register(
+        DOMAIN, "bulk_add_mappings", bulk_add_mappings_service, supports_response=SupportsResponse.OPTIONAL
+    )
     hass.services.async_register(DOMAIN, "remove_mapping", remove_mapping_service)
 
-    # Handle barcode_scanned events
-    async def handle_barcode(event):
-        barcode = event.data.get("barcode", "").strip()
-        
-        invalid_states = {"unavailable", "unknown", "none", ""}
-        if not barcode or barcode in invalid_states:
-            _LOGGER.debug("Skipping invalid barcode event: %r", barcode)
+    async def import_dump_service(call):
+        """Import an OpenFoodFacts JSONL/CSV export (optionally .gz) in the background."""
+        await async_wait_ready(hass)
+        path = str(call.data["path"]).strip()
+        if not hass.config.is_allowed_path(path):
+            raise HomeAssistantError(f"Path not allowed: {path} (add it to allowlist_external_dirs)")
+        if not await hass.async_add_executor_job(os.path.isfile, path):
+            _LOGGER.error("📚 Dump not found: %s", path)
             return
-
-        if not is_valid_barcode(barcode):
-            _LOGGER.debug("❌ QR/Rejected: '%s'", barcode)
+        if product_index.import_task and not product_index.import_task.done():
+            _LOGGER.warning("📚 An import is already running")
             return
+        _LOGGER.info("📚 Importing %s", path)
+        product_index.import_task = entry.async_create_background_task(
+            hass, product_index.async_import(path, restart=bool(call.data.get("restart", False))), "beepbasket_import"
+        )
 
+    async def scan_batch_service(call):
+        await async_wait_ready(hass)
+        scans = parse_scans(call.data.get("scans"))
+        if not scans:
+            _LOGGER.warning("scan_batch: expected a list of scans")
+            return {"results": []}
+        if len(scans) > MAX_BATCH_SIZE:
+            raise HomeAssistantError(f"At most {MAX_BATCH_SIZE} scans per batch, got {len(scans)}")
+        results = await async_process_batch(hass, scans)
+        return {"results": results}
+
+    hass.services.async_register(DOMAIN, "relookup", relookup_service)
+    hass.services.async_register(
+        DOMAIN, "scan_batch", scan_batch_service, supports_response=SupportsResponse.OPTIONAL
+    )
+    hass.services.async_register(DOMAIN, "import_dump", import_dump_service)
+
+    # Scan pipeline, run by the ScanQueue workers
+    async def handle_barcode(barcode: str, queued_at: float):
         cache = hass.data[DOMAIN]["cache"]
-        entry = await cache.get(barcode)
+        trace = pipeline_stats.start_trace(barcode)
+        with pipeline_stats.timer(STAGE_CACHE_GET, trace):
+            entry = await cache.get(barcode)
+        needs_lookup = False
 
         if entry and entry.get("status") == "complete":
             product = entry.get("name")
+            pipeline_stats.increment("cache_hit")
             _LOGGER.info("💾 Cache hit %s → %s", barcode, product)
+            await cache.count_scan(barcode)
+            # Stale-while-revalidate: list the cached name, refresh it later
+            refresher.async_request(barcode, entry)
+        elif cache.in_negative_window(entry):
+            await cache.set_unknown(barcode, lookup_missed=False)
+            product = entry.get("name") or barcode
+            pipeline_stats.increment("negative_cache_hit")
+            _LOGGER.info("🚫 Known unknown %s (no lookup until %s)", barcode, entry["retry_after"])
+        elif is_in_store(barcode):
+            # Store-specific number: no database knows it, add a mapping instead
+            await cache.set_unknown(barcode, lookup_missed=False)
+            product = (entry or {}).get("name") or barcode
+            pipeline_stats.increment("in_store_code")
+            _LOGGER.info("🏷️ In-store code %s, not looked up", barcode)
         else:
-            product_data = await lookup_product(hass, barcode)
-            if product_data:
-                await cache.set_product(barcode, product_data)
-                product = product_data["name"]
-                _LOGGER.info("🌐 API success %s → %s", barcode, product)
-            else:
-                await cache.set_unknown(barcode)
-                product = barcode
-                _LOGGER.warning("❓ Unknown: %s", barcode)
+            # Fast path: list the last known name now, resolve in the background
+            product = (entry or {}).get("name") or barcode
+            needs_lookup = True
+            pipeline_stats.increment("cache_miss")
+            _LOGGER.info("⏳ Listing '%s' while %s resolves", product, barcode)
 
-        await asyncio.sleep(1)
         target_entity = hass.data[DOMAIN]["shopping_list_entity"]
 
-        # Check active items
-        try:
-            response = await hass.services.async_call(
-                "todo", "get_items",
-                {"entity_id": target_entity},
-                return_response=True,
-                blocking=True
-            )
-            
-            active_items = []
-            if response and isinstance(response, dict) and target_entity in response:
-                items = response[target_entity].get('items', [])
-                active_items = [
-                    item["summary"].lower().strip()
-                    for item in items
-                    if isinstance(item, dict) and item.get("status") == "needs_action"
-                ]
-
-            if product.lower().strip() in active_items:
-                _LOGGER.info("⏭️ '%s' already ACTIVE in %s", product, target_entity)
-                return
-                
-        except Exception as e:
-            _LOGGER.warning("Todo check failed: %s", e)
+        if await shopping_list.async_is_active(product):
+            _LOGGER.info("⏭️ '%s' already ACTIVE in %s", product, target_entity)
+            result = "already_active"
+        else:
+            _LOGGER.info("📦 Adding '%s' to %s", product, target_entity)
+            with pipeline_stats.timer(STAGE_TODO_ADD, trace):
+                await shopping_list.async_add(product, barcode)
+            result = "added"
+        pipeline_stats.record(STAGE_SCAN_TO_LIST, time.perf_counter() - queued_at, trace)
+        if trace is not None:
+            trace["result"] = result
+        if needs_lookup:
+            resolver.async_enqueue(barcode, product)
+        async_dispatcher_send(hass, SIGNAL_SCAN, {
+            "barcode": barcode, "product": product, "result": result, "resolving": needs_lookup
+        })
+
+    scan_queue = ScanQueue(
+        hass,
+        handle_barcode,
+        maxsize=options.get(CONF_QUEUE_SIZE, DEFAULT_QUEUE_SIZE),
+        workers=options.get(CONF_WORKERS, DEFAULT_WORKERS),
+        dedup_window=options.get(CONF_DEDUP_WINDOW, DEFAULT_DEDUP_WINDOW),
+        overflow=options.get(CONF_OVERFLOW, DEFAULT_OVERFLOW),
+        pipeline_stats=pipeline_stats,
+    )
+    hass.data[DOMAIN]["scan_queue"] = scan_queue
 
-        _LOGGER.info("📦 Adding '%s' to %s", product, target_entity)
-        await hass.services.async_call(
-            "todo", "add_item",
-            {"entity_id": target_entity, "item": product},
-            blocking=True
-        )
+    # Handle barcode_scanned events
+    @callback
+    def handle_barcode_event(event):
+        raw = str(event.data.get("barcode") or "").strip()
+        
+        if not raw or raw.lower() in INVALID_STATES:
+            _LOGGER.debug("Skipping invalid barcode event: %r", raw)
+            return
 
-    unsub_event = hass.bus.async_listen("barcode_scanned", handle_barcode)
+        barcode = normalize_barcode(raw)
+        if barcode is None:
+            _LOGGER.debug("❌ QR/misread rejected: '%s'", raw)
+            return
+        if barcode != raw:
+            _LOGGER.debug("🔢 %s → %s", raw, barcode)
+
+        hass.data[DOMAIN]["scan_queue"].async_submit(barcode)
+
+    unsub_event = hass.bus.async_listen("barcode_scanned", handle_barcode_event)
     hass.data[DOMAIN]["unsub_event"] = unsub_event
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
+    # Scanner entities: only their state changes reach this callback
+    scanner_entities = entry.options.get(CONF_SCANNER_ENTITIES, entry.data.get(CONF_SCANNER_ENTITIES))
+    if scanner_entities is None:
+        # Entries created before scanners were configurable
+        scanner_entities = suggested_scanners(hass)
+
+    @callback
+    def handle_scanner_state(event):
+        new_state = event.data.get("new_state")
+        if new_state and new_state.state != "":
+            barcode = new_state.state.strip()
+            hass.bus.async_fire("barcode_scanned", {"barcode": barcode})
+            _LOGGER.info("🔗 %s → barcode_scanned: %s", event.data["entity_id"], barcode)
+
+    if scanner_entities:
+        dustbin_listener = async_track_state_change_event(hass, scanner_entities, handle_scanner_state)
+        hass.data[DOMAIN]["dustbin_listener"] = dustbin_listener
+        _LOGGER.info("🔗 Tracking scanners: %s", ", ".join(scanner_entities))
+
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    entry.async_create_background_task(hass, async_start_pipeline(hass, entry), "beepbasket_startup")
+    return True
 
-    # Dustbin sensor listener
-    async def handle_dustbin_sensor(event):
-        entity_id = event.data.get("entity_id")
-        if "dustbin_barcode" in entity_id:
-            new_state = hass.states.get(entity_id)
-            if new_state and new_state.state != "":
-                barcode = new_state.state.strip()
-                hass.bus.async_fire("barcode_scanned", {"barcode": barcode})
-                _LOGGER.info("🔗 Dustbin → barcode_scanned: %s", barcode)
 
-    dustbin_listener = hass.bus.async_listen("state_changed", handle_dustbin_sensor)
-    hass.data[DOMAIN]["dustbin_listener"] = dustbin_listener
+async def async_wait_for_entity(hass: HomeAssistant, entity_id: str):
+    """Return once ``entity_id`` has a state, without polling."""
+    if hass.states.get(entity_id) is not None:
+        return
+    appeared = asyncio.Event()
 
-    _LOGGER.info("🚀 Barcode → Shopping List initialized")
-    return True
+    @callback
+    def state_changed(event):
+        if event.data.get("new_state") is not None:
+            appeared.set()
+
+    @callback
+    def still_waiting(_now):
+        _LOGGER.warning("⏳ Still waiting for shopping list '%s'", entity_id)
+
+    _LOGGER.info("⏳ Waiting for shopping list '%s'", entity_id)
+    unsub_state = async_track_state_change_event(hass, [entity_id], state_changed)
+    unsub_warning = async_call_later(hass, TODO_WAIT_WARNING, still_waiting)
+    try:
+        # It may have appeared between the first check and subscribing
+        if hass.states.get(entity_id) is None:
+            await appeared.wait()
+    finally:
+        unsub_state()
+        unsub_warning()
+
+
+async def async_start_pipeline(hass: HomeAssistant, entry: ConfigEntry):
+    """Background part of the setup: load data, wait for the list, start workers.
+
+    If loading fails, the error is kept and ``ready`` is set anyway, so
+    waiting services fail instead of hanging; views report the error.
+    Reloading the integration retries.
+    """
+    data = hass.data[DOMAIN]
+    try:
+        await _async_start_pipeline(hass, data)
+    except Exception as err:
+        data["startup_error"] = str(err) or type(err).__name__
+        _LOGGER.exception("❌ BeepBasket failed to start, reload the integration to retry")
+        data["ready"].set()
+
+
+async def _async_start_pipeline(hass: HomeAssistant, data: Dict[str, Any]):
+    started = time.perf_counter()
+    await asyncio.gather(data["cache"].load(), data["product_index"].async_open())
+    _LOGGER.info("📂 Cache ready at: %s (%.2fs)", await get_cache_path(hass), time.perf_counter() - started)
+
+    # Nothing changes the cache before ready is set, so the scan sees it all
+    started = time.perf_counter()
+    indexed = await data["cache"].async_scan(data["search"].build)
+    _LOGGER.info("🔎 Search index built: %d entries (%.2fs)", indexed, time.perf_counter() - started)
+
+    await async_wait_for_entity(hass, data["shopping_list_entity"])
+    _LOGGER.info("✅ Shopping list '%s' ready", data["shopping_list_entity"])
+    await data["shopping_list"].async_start()
+
+    data["resolver"].async_start()
+    data["scan_queue"].async_start()
+    data["refresher"].async_start()
+    data["ready"].set()
+    _LOGGER.info("🚀 Barcode → Shopping List initialized (%d scans waiting)", data["scan_queue"].depth)
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+    for service in SERVICES:
+        hass.services.async_remove(DOMAIN, service)
     listeners = hass.data.get(DOMAIN, {})
     dustbin_listener = listeners.pop("dustbin_listener", None)
     if dustbin_listener:
@@ -453,5 +836,27 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     unsub_event = listeners.pop("unsub_event", None)
     if unsub_event:
         unsub_event()
+    scan_queue = listeners.get("scan_queue")
+    if scan_queue:
+        await scan_queue.async_stop()
+    shopping_list = listeners.get("shopping_list")
+    if shopping_list:
+        shopping_list.async_stop()
+    refresher = listeners.get("refresher")
+    if refresher:
+        await refresher.async_stop()
+    resolver = listeners.get("resolver")
+    if resolver:
+        await resolver.async_stop()
+    product_index = listeners.get("product_index")
+    if product_index:
+        await product_index.async_close()
+    cache = listeners.get("cache")
+    if cache:
+        await cache.async_close()
     hass.data.pop(DOMAIN, None)
     return True
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Apply changed options."""
+    await hass.config_entries.async_reload(entry.entry_id)
@@ -0,0 +1,110 @@
+"""Barcode validation and GTIN canonicalization.
+
+Every GTIN (EAN-8, UPC-E, UPC-A, EAN-13, GTIN-14) is identified by its
+GTIN-14 value. Cache keys use the short form OpenFoodFacts uses for the same
+number: 13 digits, or 8 for EAN-8, or all 14 for codes with an indicator
+digit. So ``049000050103`` (UPC-A), ``0049000050103`` and ``00049000050103``
+are one key, and the UPC-E ``04252614`` is the same key as its UPC-A.
+Eight digits that validate as EAN-8 are EAN-8; only other 8-digit codes are
+tried as UPC-E (a UPC-E that also validates as EAN-8 keeps that spelling).
+"""
+from typing import Optional
+
+INVALID_STATES = {"unavailable", "unknown", "none", ""}
+
+# Lengths of EAN-8, UPC-A, EAN-13 and GTIN-14: the numeric codes that carry a check digit
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+# GTIN-13 prefixes of variable-measure items (price or weight in the code)
+VARIABLE_MEASURE_PREFIXES = ("02",) + tuple(str(prefix) for prefix in range(20, 30))
+# Variable-measure layout: prefix (2) + item (5) + price/weight (5) + check digit
+VARIABLE_MEASURE_ITEM_DIGITS = 7
+# GS1 restricted circulation, numbered by each store (UPC number system 4,
+# GTIN-13 040-049) without a standard price layout: kept as scanned
+STORE_INTERNAL_PREFIXES = ("04",)
+
+
+def gtin_check_digit(body: str) -> str:
+    """GS1 mod-10 check digit for the digits before it."""
+    total = sum(int(digit) * (3 if i % 2 == 0 else 1) for i, digit in enumerate(reversed(body)))
+    return str((10 - total % 10) % 10)
+
+
+def has_valid_check_digit(code: str) -> bool:
+    return code.isdigit() and len(code) >= 2 and gtin_check_digit(code[:-1]) == code[-1]
+
+
+def expand_upce(code: str) -> Optional[str]:
+    """UPC-E (number system, 6 digits, check digit) to UPC-A; None if invalid."""
+    if len(code) != 8 or not code.isdigit() or code[0] not in "01":
+        return None
+    system, d, check = code[0], code[1:7], code[7]
+    last = d[5]
+    if last in "012":
+        body = d[0:2] + last + "0000" + d[2:5]
+    elif last == "3":
+        body = d[0:3] + "00000" + d[3:5]
+    elif last == "4":
+        body = d[0:4] + "00000" + d[4]
+    else:
+        body = d[0:5] + "0000" + last
+    upca = system + body + check
+    return upca if has_valid_check_digit(upca) else None
+
+
+def to_gtin14(code: str) -> Optional[str]:
+    """GTIN-14 for a numeric barcode with a valid check digit, else None."""
+    if not code.isdigit():
+        return None
+    if len(code) in GTIN_LENGTHS and has_valid_check_digit(code):
+        return code.zfill(14)
+    if len(code) == 8:
+        # Scanners send UPC-E as 8 digits starting with its number system.
+        # Only when it is not a valid EAN-8: read as UPC-E, more than half of
+        # the EAN-8 codes starting with 0 or 1 would become another product.
+        upca = expand_upce(code)
+        if upca:
+            return upca.zfill(14)
+    return None
+
+
+def is_variable_measure(key: str) -> bool:
+    """In-store / variable-weight code (GTIN-13 prefix 02 or 20-29)."""
+    return len(key) == 13 and key.startswith(VARIABLE_MEASURE_PREFIXES)
+
+
+def is_in_store(key: str) -> bool:
+    """Code only meaningful inside one store (variable measure or prefix 04): never looked up online."""
+    return is_variable_measure(key) or (len(key) == 13 and key.startswith(STORE_INTERNAL_PREFIXES))
+
+
+def normalize_barcode(code: str) -> Optional[str]:
+    """Canonical cache key for a scanned code; None for QR codes, states and misreads.
+
+    Numeric codes of a GTIN length must have a valid check digit.
+    Variable-measure codes have their price/weight digits zeroed, so every
+    weighing of the same item shares one key. Other codes (Code 128, other
+    numeric lengths and the like) pass through.
+    """
+    code = (code or "").strip()
+    if code.lower() in INVALID_STATES:
+        return None
+    if code.isdigit() and len(code) in GTIN_LENGTHS:
+        gtin = to_gtin14(code)
+        if gtin is None:
+            return None
+        if gtin.startswith("000000"):
+            return gtin[6:]
+        key = gtin[1:] if gtin[0] == "0" else gtin
+        if is_variable_measure(key):
+            body = key[:VARIABLE_MEASURE_ITEM_DIGITS].ljust(12, "0")
+            key = body + gtin_check_digit(body)
+        return key
+    if len(code) < 8 or len(code) > 20 or '.' in code or '/' in code or '=' in code:
+        return None
+    return code
+
+
+def is_valid_barcode(code: str) -> bool:
+    """Filter barcodes vs QR codes and misreads"""
+    return normalize_barcode(code) is not None
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .barcode import is_in_store, normalize_barcode
+from .const import DOMAIN, SIGNAL_SCAN
+from .lookup import LookupUnavailable
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 1000
+BATCH_LOOKUP_CONCURRENCY = 8
+
+
+def parse_scans(raw: Any) -> Optional[List[Dict[str, Any]]]:
+    """Accept ``["123", ...]`` or ``[{"barcode": "123", "timestamp": ...}, ...]``."""
+    if not isinstance(raw, list):
+        return None
+    scans = []
+    for item in raw:
+        if isinstance(item, dict):
+            scans.append({"barcode": str(item.get("barcode") or "").strip(), "timestamp": item.get("timestamp")})
+        else:
+            scans.append({"barcode": str(item or "").strip(), "timestamp": None})
+    return scans
+
+
+async def async_process_batch(hass: HomeAssistant, scans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Ingest buffered scans at once and report the outcome per barcode.
+
+    Duplicates are merged (``count``), cache misses are looked up together
+    with bounded concurrency, and the shopping list is updated in one pass
+    over the in-memory mirror. Misses that cannot be looked up right now are
+    listed as placeholders and handed to the background resolver.
+    """
+    data = hass.data[DOMAIN]
+    cache = data["cache"]
+    client = data["lookup_client"]
+    shopping_list = data["shopping_list"]
+    resolver = data["resolver"]
+    pipeline_stats = data["pipeline_stats"]
+    refresher = data["refresher"]
+
+    # Dedupe, keeping the order of first appearance
+    results: Dict[str, Dict[str, Any]] = {}
+    rejected: List[Dict[str, Any]] = []
+    for scan in scans:
+        barcode = normalize_barcode(scan["barcode"])
+        if barcode is None:
+            rejected.append({"barcode": scan["barcode"], "timestamp": scan.get("timestamp"), "result": "rejected"})
+            continue
+        result = results.setdefault(barcode, {"barcode": barcode, "timestamp": scan.get("timestamp"), "count": 0})
+        result["count"] += 1
+
+    # Classify against the cache
+    misses = []
+    for barcode, result in results.items():
+        entry = await cache.get(barcode)
+        if entry and entry.get("status") == "complete":
+            result.update(product=entry.get("name"), source="cache")
+            pipeline_stats.increment("cache_hit")
+            await cache.count_scan(barcode, result["count"])
+            refresher.async_request(barcode, entry)
+        elif cache.in_negative_window(entry):
+            await cache.set_unknown(barcode, lookup_missed=False, scans=result["count"])
+            result.update(product=entry.get("name") or barcode, source="negative_cache")
+            pipeline_stats.increment("negative_cache_hit")
+        elif is_in_store(barcode):
+            await cache.set_unknown(barcode, lookup_missed=False, scans=result["count"])
+            result.update(product=(entry or {}).get("name") or barcode, source="in_store")
+            pipeline_stats.increment("in_store_code")
+        else:
+            result.update(product=(entry or {}).get("name") or barcode)
+            misses.append(barcode)
+            pipeline_stats.increment("cache_miss")
+
+    # Resolve all misses together
+    semaphore = asyncio.Semaphore(BATCH_LOOKUP_CONCURRENCY)
+
+    async def resolve(barcode: str):
+        result = results[barcode]
+        async with semaphore:
+            try:
+                product_data = await client.async_lookup(barcode)
+            except LookupUnavailable as err:
+                _LOGGER.debug("Batch lookup of %s deferred: %s", barcode, err)
+                result["source"] = "pending"
+                return
+        if product_data:
+            await cache.set_product(barcode, product_data, scans=result["count"])
+            result.update(product=product_data["name"], source="lookup")
+        else:
+            await cache.set_unknown(barcode, scans=result["count"])
+            result["source"] = "unknown"
+
+    await asyncio.gather(*(resolve(barcode) for barcode in misses))
+
+    # One pass over the list
+    added = 0
+    for barcode, result in results.items():
+        product = result["product"]
+        if await shopping_list.async_is_active(product):
+            result["list"] = "already_active"
+        else:
+            try:
+                await shopping_list.async_add(product, barcode)
+                result["list"] = "added"
+                added += 1
+            except Exception as e:
+                result["list"] = "failed"
+                result["error"] = str(e)
+                continue
+        if result["source"] == "pending":
+            resolver.async_enqueue(barcode, product)
+        async_dispatcher_send(hass, SIGNAL_SCAN, {
+            "barcode": barcode, "product": product, "result": result["list"],
+            "resolving": result["source"] == "pending",
+        })
+
+    _LOGGER.info("📦 Batch: %d scans, %d unique, %d looked up, %d added, %d rejected",
+                 len(scans), len(results), len(misses), added, len(rejected))
+    return list(results.values()) + rejected
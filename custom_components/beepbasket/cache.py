@@ -1,79 +1,561 @@
-import json
-import aiofiles
-from datetime import datetime
-from typing import Dict, Any, Optional
+import heapq
+import logging
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .barcode import normalize_barcode
+from .const import DEFAULT_STORAGE_BACKEND, SIGNAL_CACHE_UPDATED
+from .records import CacheRecord
+from .stats import PipelineStats
+from .storage import SCHEMA_VERSION, STATUS_FILTERS, async_other_store_exists, create_stores, matches_status
+
+_LOGGER = logging.getLogger(__name__)
+
+# Negative cache: after the n-th "not found" answer, skip lookups of that
+# barcode for NEGATIVE_CACHE_TTLS[n - 1] (the last step repeats).
+NEGATIVE_CACHE_TTLS = (timedelta(hours=1), timedelta(hours=6), timedelta(days=1))
+
+# Removed barcodes remembered for delta sync before clients must refetch
+MAX_TOMBSTONES = 5000
+
+
+def _entry_rank(entry: Mapping[str, Any]) -> Tuple[bool, bool, str]:
+    return (
+        bool(entry.get("local_override")),
+        entry.get("status") == "complete",
+        entry.get("last_updated") or entry.get("first_seen") or "",
+    )
+
+
+def _keep_history(product_data: Dict[str, Any], existing: Optional[Mapping[str, Any]], scans: int, now: str):
+    """Carry the scan history of ``existing`` over to new product data."""
+    source = existing if existing is not None else product_data
+    product_data["scanned_count"] = (source.get("scanned_count") or 0) + scans
+    product_data["first_seen"] = source.get("first_seen") or now
+    last_scanned = now if scans else source.get("last_scanned")
+    if last_scanned:
+        product_data["last_scanned"] = last_scanned
+
+
+def merge_entries(first: Mapping[str, Any], second: Mapping[str, Any]) -> Dict[str, Any]:
+    """One entry for two spellings of a barcode.
+
+    Manual mappings beat lookups, complete beats unknown, then the newest
+    wins; scan counts add up and the earliest ``first_seen`` is kept.
+    """
+    winner, other = (first, second) if _entry_rank(first) >= _entry_rank(second) else (second, first)
+    merged = dict(winner)
+    merged["scanned_count"] = (first.get("scanned_count") or 0) + (second.get("scanned_count") or 0)
+    seen = [entry["first_seen"] for entry in (first, second) if entry.get("first_seen")]
+    if seen:
+        merged["first_seen"] = min(seen)
+    if merged.get("status") == "unknown" and merged["scanned_count"] >= 3:
+        merged["ready_to_contribute"] = True
+    return merged
+
 
 class BarcodeCache:
-    """Structured cache aligned with OpenFoodFacts schema."""
-    
-    def __init__(self, cache_path: str):
+    """Structured cache aligned with OpenFoodFacts schema.
+
+    Entries live in memory as compact CacheRecords; persistence is a
+    pluggable write-behind store (JSON snapshot + journal, or SQLite) chosen
+    by ``backend``. On first load with a new backend, data left by the other
+    one is migrated. With SQLite, ``max_resident`` bounds the entries kept in
+    memory: only the most recently updated are loaded, the least recently
+    used are evicted (manual mappings never), and any barcode that is not
+    resident is looked up in the database.
+    """
+
+    def __init__(self, cache_path: str, hass: HomeAssistant, backend: str = DEFAULT_STORAGE_BACKEND,
+                 pipeline_stats: Optional[PipelineStats] = None, max_resident: int = 0):
         self._cache_path = cache_path
-        self._cache: Dict[str, Dict[str, Any]] = {}
-    
+        self._backend = backend
+        self.hass = hass
+        # Resident entries, least recently used first
+        self._cache: "OrderedDict[str, CacheRecord]" = OrderedDict()
+        # Entries in the store, resident or not
+        self._count = 0
+        self._store, self._legacy_store = create_stores(hass, backend, cache_path, lambda: self._cache)
+        self._store.pipeline_stats = pipeline_stats
+        self._pipeline_stats = pipeline_stats
+        if max_resident and not self._store.supports_eviction:
+            _LOGGER.warning("⚠️ Limiting resident cache entries needs the SQLite backend; keeping all in memory")
+            max_resident = 0
+        self._max_resident = max_resident
+        # Delta sync: every change bumps the cache version and moves the
+        # barcode to the end of the changelog. Versions start at load time in
+        # ms, so they keep increasing across restarts; clients asking for
+        # changes older than the changelog floor get a full listing.
+        self._version = 0
+        self._changelog_floor = 0
+        self._changelog: "OrderedDict[str, int]" = OrderedDict()
+        self._sorted_keys: List[str] = []
+        self._sorted_version = -1
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def resident_count(self) -> int:
+        return len(self._cache)
+
     async def load(self):
-        """Load structured cache from custom_components folder."""
-        try:
-            async with aiofiles.open(self._cache_path, 'r', encoding='utf-8') as f:
-                content = await f.read()
-                self._cache = json.loads(content) if content.strip() else {}
-            _LOGGER.info("📂 Loaded %d structured cache entries", len(self._cache))
-        except FileNotFoundError:
-            _LOGGER.info("📂 New cache file created")
-            self._cache = {}
-        except json.JSONDecodeError as e:
-            _LOGGER.error("❌ Cache JSON corrupt: %s", e)
-            self._cache = {}
-    
-    async def _save(self):
-        """Persist structured cache."""
-        async with aiofiles.open(self._cache_path, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(self._cache, indent=2, ensure_ascii=False))
-    
-    async def get(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Load entries from the store, migrating from the other backend once."""
+        entries = await self._store.async_load(self._max_resident)
+        self._set_records(entries)
+        self._count = await self._store.async_count()
+        if not entries and await async_other_store_exists(self.hass, self._backend, self._cache_path):
+            legacy = await self._legacy_store.async_load()
+            if legacy:
+                self._set_records(legacy)
+                self._count = len(legacy)
+                await self._store.async_write_many(legacy)
+                _LOGGER.info("🚚 Migrated %d cache entries to the %s backend", len(legacy), self._backend)
+            await self._legacy_store.async_retire()
+        del entries
+
+        self._version = self._changelog_floor = int(time.time() * 1000)
+        self._changelog.clear()
+
+        if self._store.schema_version < SCHEMA_VERSION:
+            merged = self._merge_variants()
+            await self._store.async_flush()
+            await self._store.async_set_schema_version(SCHEMA_VERSION)
+            _LOGGER.info("🔢 Migrated cache to schema %d (%d entries moved to their canonical barcode)",
+                         SCHEMA_VERSION, merged)
+        if self._max_resident:
+            self._evict()
+            _LOGGER.info("💾 %d of %d cache entries resident", len(self._cache), len(self))
+
+    @callback
+    def _set_records(self, entries: Dict[str, Dict[str, Any]]):
+        items = entries.items()
+        if self._max_resident:
+            # Most recently touched last, so eviction starts with the oldest
+            items = sorted(items, key=lambda item: item[1].get("last_updated") or item[1].get("first_seen") or "")
+        self._cache = OrderedDict((barcode, CacheRecord.from_dict(entry)) for barcode, entry in items)
+
+    @callback
+    def _merge_variants(self) -> int:
+        """Move entries stored under another spelling (UPC-A, UPC-E, ...) to the canonical key.
+
+        Runs as a migration, while every entry is resident.
+        """
+        moved = 0
+        for barcode in list(self._cache):
+            key = normalize_barcode(barcode)
+            if key is None or key == barcode:
+                # Not a valid GTIN: keep it so nothing the user saved is lost
+                continue
+            entry = self._cache.pop(barcode)
+            if entry.get("name") == barcode:
+                entry.name = key
+            existing = self._cache.get(key)
+            self._cache[key] = CacheRecord.from_dict(merge_entries(existing, entry)) if existing else entry
+            if existing:
+                self._count -= 1
+            self._mark_dirty(barcode)
+            self._mark_dirty(key)
+            moved += 1
+        return moved
+
+    @callback
+    def _all_resident(self) -> bool:
+        return not self._max_resident or len(self._cache) >= self._count
+
+    @callback
+    def _put(self, barcode: str, record: CacheRecord, new: bool = False):
+        """Make ``record`` the resident entry; ``new`` if the store did not have the barcode."""
+        self._cache[barcode] = record
+        self._cache.move_to_end(barcode)
+        if new:
+            self._count += 1
+
+    @callback
+    def _evict(self):
+        """Drop least recently used entries beyond max_resident; they stay on disk."""
+        if not self._max_resident:
+            return
+        rotated = 0
+        while len(self._cache) > self._max_resident and rotated < len(self._cache):
+            barcode, record = self._cache.popitem(last=False)
+            if record.local_override:
+                # Manual mappings stay resident
+                self._cache[barcode] = record
+                rotated += 1
+                continue
+            if self._pipeline_stats:
+                self._pipeline_stats.increment("cache_evicted")
+
+    async def _resident(self, barcode: str) -> Optional[CacheRecord]:
+        """The entry for ``barcode``, read from the store (and kept) if it is not resident."""
+        record = self._cache.get(barcode)
+        if record is not None:
+            if self._max_resident:
+                self._cache.move_to_end(barcode)
+            return record
+        if self._all_resident():
+            return None
+
+        version = self._changelog.get(barcode)
+        data = await self._store.async_get(barcode)
+        if barcode in self._cache:
+            # Set or read back while we waited
+            return self._cache[barcode]
+        if data is None or self._changelog.get(barcode) != version:
+            # Not stored, or removed while we waited
+            return None
+        record = CacheRecord.from_dict(data)
+        self._put(barcode, record)
+        self._evict()
+        if self._pipeline_stats:
+            self._pipeline_stats.increment("cache_reload")
+        return record
+
+    @callback
+    def _mark_dirty(self, barcode: str):
+        """Queue the current state of a barcode for the next store flush."""
+        self._bump_version(barcode)
+        self._store.async_mark(barcode, self._cache.get(barcode))
+
+    @callback
+    def _bump_version(self, barcode: str):
+        self._version += 1
+        self._changelog[barcode] = self._version
+        self._changelog.move_to_end(barcode)
+        while len(self._changelog) > len(self) + MAX_TOMBSTONES:
+            _, self._changelog_floor = self._changelog.popitem(last=False)
+
+    @callback
+    def _notify(self, barcode: str):
+        """Tell listeners which barcode changed (None entry = removed)."""
+        entry = self._cache.get(barcode)
+        self.hass.bus.async_fire("barcode_cache_updated", {
+            "barcode": barcode,
+            "action": "removed" if entry is None else "updated",
+            "version": self._version,
+        })
+        async_dispatcher_send(self.hass, SIGNAL_CACHE_UPDATED, barcode, entry, self._version)
+
+    async def async_flush(self):
+        await self._store.async_flush()
+
+    async def async_close(self):
+        """Flush pending writes and release the store."""
+        await self._store.async_close()
+
+    async def async_query(self, status: Optional[str] = None, order_by: Optional[str] = None,
+                          limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """Indexed queries (status filter, top by scanned_count/last_updated)."""
+        await self._store.async_flush()
+        return await self._store.async_query(status, order_by, limit)
+
+    async def async_entries(self) -> Mapping[str, Mapping[str, Any]]:
+        """Every entry; read from the store while some are not resident."""
+        if self._all_resident():
+            return self._cache
+        return dict(await self.async_query())
+
+    async def async_scan(self, consumer: Callable[[Iterable[Tuple[str, Mapping[str, Any]]]], Any]) -> Any:
+        """Run ``consumer`` over every entry off the event loop; SQLite streams them from disk."""
+        await self._store.async_flush()
+        return await self._store.async_scan(consumer)
+
+    async def get(self, barcode: str) -> Optional[CacheRecord]:
         """Get full structured entry."""
-        return self._cache.get(barcode)
-    
+        return await self._resident(barcode)
+
     async def get_display_name(self, barcode: str) -> str:
         """For shopping list - safe fallback."""
-        entry = self._cache.get(barcode)
+        entry = await self._resident(barcode)
         if entry and entry.get("status") == "complete":
             return entry.get("name", barcode)
         return barcode
-    
-    async def set_product(self, barcode: str, product_data: Dict[str, Any]):
-        """Set complete product (API or manual)."""
+
+    async def async_get_many(self, barcodes: List[str]) -> Dict[str, Mapping[str, Any]]:
+        """Current entries among ``barcodes``; ones not resident are read from the store but not kept."""
+        missing = [] if self._all_resident() else [barcode for barcode in barcodes if barcode not in self._cache]
+        versions = {barcode: self._changelog.get(barcode) for barcode in missing}
+        stored = await self._store.async_get_many(missing) if missing else {}
+        # Decided after the read above, against what is current now
+        existing: Dict[str, Mapping[str, Any]] = {}
+        for barcode in barcodes:
+            entry = self._cache.get(barcode)
+            if entry is None and barcode in stored and self._changelog.get(barcode) == versions[barcode]:
+                entry = stored[barcode]
+            if entry is not None:
+                existing[barcode] = entry
+        return existing
+
+    async def set_product(self, barcode: str, product_data: Dict[str, Any], scans: int = 0):
+        """Set complete product (API or manual).
+
+        The scan count and ``first_seen`` of an existing entry are kept;
+        ``scans`` adds the scans this product data answers.
+        """
+        now = datetime.now().isoformat()
+        existing = await self._resident(barcode)
+        _keep_history(product_data, existing, scans, now)
         product_data["status"] = "complete"
-        product_data["scanned_count"] = product_data.get("scanned_count", 0) + 1
-        product_data["last_updated"] = datetime.now().isoformat()
-        self._cache[barcode] = product_data
-        await self._save()
+        product_data["last_updated"] = now
+        self._put(barcode, CacheRecord.from_dict(product_data), new=existing is None)
+        self._mark_dirty(barcode)
+        self._notify(barcode)
+        self._evict()
         _LOGGER.info("💾 Cached product: %s → %s", barcode, product_data.get("name"))
-    
-    async def set_unknown(self, barcode: str):
-        """Track unknown barcode scans."""
-        if barcode not in self._cache:
-            self._cache[barcode] = {
-                "status": "unknown",
-                "scanned_count": 0,
-                "first_seen": datetime.now().isoformat()
-            }
-        
-        entry = self._cache[barcode]
-        entry["scanned_count"] += 1
-        
-        if entry["scanned_count"] >= 3:
-            entry["ready_to_contribute"] = True
-        
-        await self._save()
-        _LOGGER.info("❓ Unknown #%d: %s", entry["scanned_count"], barcode)
-    
+
+    async def set_products(self, products: Dict[str, Dict[str, Any]]):
+        """Set many complete products and persist them in one store write (scan history is kept)."""
+        now = datetime.now().isoformat()
+        existing = await self.async_get_many(list(products))
+        for barcode, product_data in products.items():
+            _keep_history(product_data, existing.get(barcode), 0, now)
+            product_data["status"] = "complete"
+            product_data["last_updated"] = now
+            self._put(barcode, CacheRecord.from_dict(product_data), new=barcode not in existing)
+            self._bump_version(barcode)
+            self._store.async_mark(barcode, product_data)
+        await self._store.async_flush()
+        for barcode in products:
+            async_dispatcher_send(self.hass, SIGNAL_CACHE_UPDATED, barcode, self._cache.get(barcode), self._version)
+        self.hass.bus.async_fire("barcode_cache_updated", {
+            "barcodes": list(products), "action": "updated", "version": self._version,
+        })
+        self._evict()
+        _LOGGER.info("💾 Cached %d products", len(products))
+
+    async def async_import(self, entries: Dict[str, Dict[str, Any]]) -> int:
+        """Merge entries exported by another instance; returns how many were taken.
+
+        Entries are ranked like ``merge_entries`` does: manual mappings beat
+        lookups, complete beats unknown, then the newest wins; an incoming
+        entry only replaces a lower ranked local one. The higher scan count
+        and the earlier ``first_seen`` are kept, so importing the same export
+        twice changes nothing. Everything taken is persisted in one store
+        write.
+        """
+        current = await self.async_get_many(list(entries))
+
+        # Rank everything first, so a bad entry cannot leave a half-applied batch
+        taken: Dict[str, CacheRecord] = {}
+        for barcode, incoming in entries.items():
+            existing = current.get(barcode)
+            if existing is not None:
+                if _entry_rank(incoming) <= _entry_rank(existing):
+                    continue
+                incoming["scanned_count"] = max(incoming.get("scanned_count") or 0, existing.get("scanned_count") or 0)
+                seen = [entry["first_seen"] for entry in (incoming, existing) if entry.get("first_seen")]
+                if seen:
+                    incoming["first_seen"] = min(seen)
+            taken[barcode] = CacheRecord.from_dict(incoming)
+        if not taken:
+            return 0
+
+        for barcode, record in taken.items():
+            self._put(barcode, record, new=barcode not in current)
+            self._bump_version(barcode)
+            self._store.async_mark(barcode, record)
+        await self._store.async_flush()
+        for barcode in taken:
+            async_dispatcher_send(self.hass, SIGNAL_CACHE_UPDATED, barcode, self._cache.get(barcode), self._version)
+        self.hass.bus.async_fire("barcode_cache_updated", {
+            "barcodes": list(taken), "action": "updated", "version": self._version,
+        })
+        self._evict()
+        return len(taken)
+
+    @staticmethod
+    def is_stale(entry: Optional[Dict[str, Any]], max_age: timedelta) -> bool:
+        """True for a looked-up product not checked within ``max_age``.
+
+        Manual mappings never go stale. A refresh that found nothing sets
+        ``last_checked`` and keeps the old data, which also counts as fresh.
+        """
+        if not entry or entry.get("status") != "complete" or entry.get("local_override"):
+            return False
+        checked = max(entry.get("last_updated") or "", entry.get("last_checked") or "")
+        try:
+            return datetime.fromisoformat(checked) < datetime.now() - max_age
+        except ValueError:
+            # Entries from before last_updated was stored
+            return True
+
+    def stale_entries(self, max_age: timedelta, limit: int) -> List[str]:
+        """The ``limit`` most scanned stale barcodes.
+
+        Only resident entries are considered; the others are the least
+        recently used and get refreshed when they are scanned again.
+        """
+        return heapq.nlargest(
+            limit,
+            (barcode for barcode, entry in self._cache.items() if self.is_stale(entry, max_age)),
+            key=lambda barcode: self._cache[barcode].get("scanned_count") or 0,
+        )
+
+    async def refresh_product(self, barcode: str, product_data: Dict[str, Any]) -> bool:
+        """Replace looked-up data, keeping the scan history; False if the entry is gone or manual now."""
+        entry = await self._resident(barcode)
+        if not entry or entry.local_override:
+            return False
+        for key in ("scanned_count", "first_seen"):
+            if key in entry:
+                product_data[key] = entry[key]
+        product_data["status"] = "complete"
+        product_data["last_updated"] = datetime.now().isoformat()
+        self._put(barcode, CacheRecord.from_dict(product_data))
+        self._mark_dirty(barcode)
+        self._notify(barcode)
+        _LOGGER.info("♻️ Refreshed: %s → %s", barcode, product_data.get("name"))
+        return True
+
+    async def mark_checked(self, barcode: str):
+        """Remember a refresh that found nothing better, so it is not retried right away."""
+        entry = await self._resident(barcode)
+        if entry:
+            entry.last_checked = datetime.now().isoformat()
+            self._mark_dirty(barcode)
+
+    @staticmethod
+    def in_negative_window(entry: Optional[Dict[str, Any]]) -> bool:
+        """True while a not-found entry should not be looked up again."""
+        if not entry or entry.get("status") != "unknown" or not entry.get("retry_after"):
+            return False
+        try:
+            return datetime.now() < datetime.fromisoformat(entry["retry_after"])
+        except (TypeError, ValueError):
+            return False
+
+    async def clear_negative(self, barcode: str):
+        """Drop the negative-cache window so the next scan looks it up again."""
+        entry = await self._resident(barcode)
+        if entry and entry.retry_after is not None:
+            entry.retry_after = None
+            entry.miss_count = 0
+            self._mark_dirty(barcode)
+
+    async def count_scan(self, barcode: str, scans: int = 1):
+        """Count scans of a cached product.
+
+        The store write is coalesced with other changes (write-behind), so
+        repeated scans cost one write per flush.
+        """
+        entry = await self._resident(barcode)
+        if entry is None:
+            return
+        entry.scanned_count = (entry.scanned_count or 0) + scans
+        entry.last_scanned = datetime.now().isoformat()
+        self._mark_dirty(barcode)
+        self._notify(barcode)
+
+    async def set_unknown(self, barcode: str, lookup_missed: bool = True, scans: int = 1):
+        """Track unknown barcode scans WITH name=barcode.
+
+        ``lookup_missed`` means a lookup actually answered "not found"; it
+        extends the negative-cache window. Scans served from that window or
+        failed lookups only count the scan. ``scans`` 0 records a miss that
+        did not come from a scan (relookup).
+        """
+        entry = await self._resident(barcode)
+        if entry is None:
+            entry = CacheRecord(
+                status="unknown",
+                name=barcode,
+                scanned_count=0,
+                first_seen=datetime.now().isoformat()
+            )
+            self._put(barcode, entry, new=True)
+
+        entry.scanned_count = (entry.scanned_count or 0) + scans
+        if scans:
+            entry.last_scanned = datetime.now().isoformat()
+        if entry.scanned_count >= 3:
+            entry.ready_to_contribute = True
+        if lookup_missed:
+            misses = (entry.miss_count or 0) + 1
+            ttl = NEGATIVE_CACHE_TTLS[min(misses, len(NEGATIVE_CACHE_TTLS)) - 1]
+            entry.miss_count = misses
+            entry.retry_after = (datetime.now() + ttl).isoformat()
+
+        self._mark_dirty(barcode)
+        self._notify(barcode)
+        self._evict()
+        _LOGGER.info("❓ Unknown #%d: %s (%s)", entry.scanned_count, barcode, entry.name)
+
     async def remove(self, barcode: str):
         """Remove entry."""
-        if barcode in self._cache:
+        if await self._resident(barcode) is not None:
             del self._cache[barcode]
-            await self._save()
+            self._count -= 1
+            self._mark_dirty(barcode)
+            self._notify(barcode)
             _LOGGER.info("🗑️ Removed: %s", barcode)
-    
-    def get_cache_for_api(self) -> Dict[str, Dict[str, Any]]:
-        """Return full structured cache for REST API."""
-        return self._cache
+
+    async def get_cache_for_api(self) -> Mapping[str, Mapping[str, Any]]:
+        """Return full structured cache for REST API (see ``async_entries``)."""
+        return await self.async_entries()
+
+    matches_status = staticmethod(matches_status)
+
+    async def changes_since(self, since: int,
+                            status: Optional[str] = None) -> Optional[Tuple[Dict[str, Mapping[str, Any]], List[str]]]:
+        """Entries changed and barcodes removed after ``since``.
+
+        With ``status``, changed entries that no longer match it are listed
+        as removed, so a filtered client drops them. Changed entries that are
+        not resident any more are read from the store. Returns None when
+        ``since`` predates what the changelog remembers (restart, trimmed
+        tombstones), and the client has to refetch.
+        """
+        if since < self._changelog_floor or since > self._version:
+            return None
+        barcodes = []
+        for barcode, version in reversed(self._changelog.items()):
+            if version <= since:
+                break
+            barcodes.append(barcode)
+        entries = await self.async_get_many(barcodes)
+        changed: Dict[str, Mapping[str, Any]] = {}
+        removed: List[str] = []
+        for barcode in barcodes:
+            entry = entries.get(barcode)
+            if entry is None or not self.matches_status(entry, status):
+                removed.append(barcode)
+            else:
+                changed[barcode] = entry
+        return changed, removed
+
+    async def async_page(self, cursor: Optional[str], limit: int,
+                         status: Optional[str] = None) -> Tuple[Dict[str, Mapping[str, Any]], Optional[str]]:
+        """Entries in barcode order after ``cursor``; returns (entries, next_cursor).
+
+        Served by the store when it has indexes for ``status`` or not every
+        entry is resident; otherwise from the resident entries.
+        """
+        if not self._all_resident() or (status and self._store.indexed):
+            await self._store.async_flush()
+            return await self._store.async_page(cursor, limit, status)
+        if self._sorted_version != self._version:
+            self._sorted_keys = sorted(self._cache)
+            self._sorted_version = self._version
+
+        keys = self._sorted_keys
+        start = bisect_right(keys, cursor) if cursor else 0
+        entries: Dict[str, Mapping[str, Any]] = {}
+        for index in range(start, len(keys)):
+            barcode = keys[index]
+            entry = self._cache[barcode]
+            if self.matches_status(entry, status):
+                if len(entries) >= limit:
+                    # One more match, like the store's LIMIT + 1: there is a next page
+                    return entries, next(reversed(entries))
+                entries[barcode] = entry
+        return entries, None
@@ -2,27 +2,93 @@
 import logging
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigFlow
+from homeassistant.config_entries import ConfigEntry, ConfigFlow, OptionsFlow
+from homeassistant.core import callback
 from homeassistant.helpers import selector
 
-DOMAIN = "beepbasket"
+from .const import (
+    DOMAIN,
+    CONF_DEDUP_WINDOW,
+    CONF_HEDGE_DELAY,
+    CONF_LOCAL_PROVIDER_TIMEOUT,
+    CONF_LOCAL_PROVIDER_URL,
+    CONF_MAX_RESIDENT_ENTRIES,
+    CONF_OVERFLOW,
+    CONF_PROVIDER_TIMEOUT,
+    CONF_PROVIDERS,
+    CONF_QUEUE_SIZE,
+    CONF_REFRESH_AFTER_DAYS,
+    CONF_REFRESH_BUDGET,
+    CONF_REFRESH_IDLE_END,
+    CONF_REFRESH_IDLE_START,
+    CONF_SCANNER_ENTITIES,
+    CONF_STORAGE_BACKEND,
+    CONF_TRACE_SCANS,
+    CONF_WORKERS,
+    DEFAULT_DEDUP_WINDOW,
+    DEFAULT_HEDGE_DELAY,
+    DEFAULT_LOCAL_PROVIDER_TIMEOUT,
+    DEFAULT_MAX_RESIDENT_ENTRIES,
+    DEFAULT_OVERFLOW,
+    DEFAULT_PROVIDERS,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_REFRESH_AFTER_DAYS,
+    DEFAULT_REFRESH_BUDGET,
+    DEFAULT_REFRESH_IDLE_END,
+    DEFAULT_REFRESH_IDLE_START,
+    DEFAULT_STORAGE_BACKEND,
+    DEFAULT_TRACE_SCANS,
+    DEFAULT_WORKERS,
+    LEGACY_SCANNER_MATCH,
+    OVERFLOW_COALESCE,
+    OVERFLOW_DROP_OLDEST,
+    PROVIDER_OBF,
+    PROVIDER_OFF,
+    PROVIDER_OPF,
+    STORAGE_JSON,
+    STORAGE_SQLITE,
+)
+from .lookup import provider_timeouts
 
 _LOGGER = logging.getLogger(__name__)
 
+SCANNER_SELECTOR = selector.EntitySelector(
+    selector.EntitySelectorConfig(domain=["sensor", "input_text", "text"], multiple=True)
+)
+
+PROVIDER_SELECTOR = selector.SelectSelector(
+    selector.SelectSelectorConfig(options=[PROVIDER_OFF, PROVIDER_OBF, PROVIDER_OPF], multiple=True)
+)
+
+def suggested_scanners(hass):
+    """Scanners named like the README's ESPHome config."""
+    return [
+        entity_id for entity_id in hass.states.async_entity_ids("sensor")
+        if LEGACY_SCANNER_MATCH in entity_id
+    ]
+
 class BarcodeShoppingListConfigFlow(ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry):
+        return BarcodeShoppingListOptionsFlow()
+
     async def async_step_user(self, user_input=None):
         if self._async_current_entries():
-            return self.async_abort(reason="Only one shopping list allowed")        
-            
+            return self.async_abort(reason="Only one shopping list allowed")
+
         errors = {}
         if user_input:
             entity_id = user_input["shopping_list_entity"]
             if self.hass.states.get(entity_id):
                 return self.async_create_entry(
-                    title="Barcode → Shopping List", 
-                    data={"shopping_list_entity": entity_id}
+                    title="Barcode → Shopping List",
+                    data={
+                        "shopping_list_entity": entity_id,
+                        CONF_SCANNER_ENTITIES: user_input.get(CONF_SCANNER_ENTITIES, []),
+                    }
                 )
             errors["shopping_list_entity"] = "not_found"
 
@@ -30,7 +96,70 @@ class BarcodeShoppingListConfigFlow(ConfigFlow, domain=DOMAIN):
             step_id="user",
             data_schema=vol.Schema({
                 vol.Required("shopping_list_entity"):
-                    selector.EntitySelector(selector.EntitySelectorConfig(domain="todo"))
+                    selector.EntitySelector(selector.EntitySelectorConfig(domain="todo")),
+                vol.Optional(CONF_SCANNER_ENTITIES, default=suggested_scanners(self.hass)): SCANNER_SELECTOR,
             }),
             errors=errors
         )
+
+class BarcodeShoppingListOptionsFlow(OptionsFlow):
+    """Pick scanner entities, tune the scan pipeline, lookups, refreshes, the cache backend and tracing."""
+
+    async def async_step_init(self, user_input=None):
+        errors = {}
+        if user_input is not None:
+            local_url = user_input.get(CONF_LOCAL_PROVIDER_URL, "").strip()
+            if local_url and "{barcode}" not in local_url:
+                errors[CONF_LOCAL_PROVIDER_URL] = "missing_barcode_placeholder"
+            else:
+                return self.async_create_entry(title="", data={**user_input, CONF_LOCAL_PROVIDER_URL: local_url})
+
+        options = self.config_entry.options
+        scanners = options.get(CONF_SCANNER_ENTITIES, self.config_entry.data.get(CONF_SCANNER_ENTITIES))
+        if scanners is None:
+            scanners = suggested_scanners(self.hass)
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Optional(CONF_SCANNER_ENTITIES, default=scanners): SCANNER_SELECTOR,
+                vol.Required(CONF_QUEUE_SIZE, default=options.get(CONF_QUEUE_SIZE, DEFAULT_QUEUE_SIZE)):
+                    vol.All(vol.Coerce(int), vol.Range(min=1, max=10000)),
+                vol.Required(CONF_WORKERS, default=options.get(CONF_WORKERS, DEFAULT_WORKERS)):
+                    vol.All(vol.Coerce(int), vol.Range(min=1, max=16)),
+                vol.Required(CONF_DEDUP_WINDOW, default=options.get(CONF_DEDUP_WINDOW, DEFAULT_DEDUP_WINDOW)):
+                    vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
+                vol.Required(CONF_OVERFLOW, default=options.get(CONF_OVERFLOW, DEFAULT_OVERFLOW)):
+                    vol.In([OVERFLOW_COALESCE, OVERFLOW_DROP_OLDEST]),
+                vol.Optional(CONF_PROVIDERS, default=options.get(CONF_PROVIDERS, DEFAULT_PROVIDERS)):
+                    PROVIDER_SELECTOR,
+                vol.Optional(CONF_LOCAL_PROVIDER_URL, default=options.get(CONF_LOCAL_PROVIDER_URL, "")): str,
+                **{
+                    vol.Required(CONF_PROVIDER_TIMEOUT.format(provider=name), default=timeout):
+                        vol.All(vol.Coerce(float), vol.Range(min=1, max=60))
+                    for name, timeout in provider_timeouts(options).items()
+                },
+                vol.Required(CONF_LOCAL_PROVIDER_TIMEOUT,
+                             default=options.get(CONF_LOCAL_PROVIDER_TIMEOUT, DEFAULT_LOCAL_PROVIDER_TIMEOUT)):
+                    vol.All(vol.Coerce(float), vol.Range(min=0.5, max=60)),
+                vol.Required(CONF_HEDGE_DELAY, default=options.get(CONF_HEDGE_DELAY, DEFAULT_HEDGE_DELAY)):
+                    vol.All(vol.Coerce(int), vol.Range(min=0, max=60000)),
+                vol.Required(CONF_REFRESH_AFTER_DAYS,
+                             default=options.get(CONF_REFRESH_AFTER_DAYS, DEFAULT_REFRESH_AFTER_DAYS)):
+                    vol.All(vol.Coerce(int), vol.Range(min=0, max=3650)),
+                vol.Required(CONF_REFRESH_BUDGET, default=options.get(CONF_REFRESH_BUDGET, DEFAULT_REFRESH_BUDGET)):
+                    vol.All(vol.Coerce(int), vol.Range(min=0, max=1000)),
+                vol.Required(CONF_REFRESH_IDLE_START,
+                             default=options.get(CONF_REFRESH_IDLE_START, DEFAULT_REFRESH_IDLE_START)):
+                    vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+                vol.Required(CONF_REFRESH_IDLE_END,
+                             default=options.get(CONF_REFRESH_IDLE_END, DEFAULT_REFRESH_IDLE_END)):
+                    vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+                vol.Required(CONF_STORAGE_BACKEND, default=options.get(CONF_STORAGE_BACKEND, DEFAULT_STORAGE_BACKEND)):
+                    vol.In([STORAGE_JSON, STORAGE_SQLITE]),
+                vol.Required(CONF_MAX_RESIDENT_ENTRIES,
+                             default=options.get(CONF_MAX_RESIDENT_ENTRIES, DEFAULT_MAX_RESIDENT_ENTRIES)):
+                    vol.All(vol.Coerce(int), vol.Any(0, vol.Range(min=100, max=10000000))),
+                vol.Required(CONF_TRACE_SCANS, default=options.get(CONF_TRACE_SCANS, DEFAULT_TRACE_SCANS)): bool,
+            }),
+            errors=errors,
+        )
@@ -0,0 +1,72 @@
+"""Constants for BeepBasket."""
+
+DOMAIN = "beepbasket"
+
+# Text sensors that publish scanned barcodes (e.g. the ESPHome dustbin scanner)
+CONF_SCANNER_ENTITIES = "scanner_entities"
+LEGACY_SCANNER_MATCH = "dustbin_barcode"
+
+# Cache storage backend (options flow)
+CONF_STORAGE_BACKEND = "storage_backend"
+STORAGE_JSON = "json"
+STORAGE_SQLITE = "sqlite"
+DEFAULT_STORAGE_BACKEND = STORAGE_JSON
+
+# Entries kept in memory with the SQLite backend (0 = all)
+CONF_MAX_RESIDENT_ENTRIES = "max_resident_entries"
+DEFAULT_MAX_RESIDENT_ENTRIES = 0
+
+# Scan ingestion (options flow)
+CONF_QUEUE_SIZE = "queue_size"
+CONF_WORKERS = "workers"
+CONF_DEDUP_WINDOW = "dedup_window"
+CONF_OVERFLOW = "overflow"
+
+OVERFLOW_COALESCE = "coalesce"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_WORKERS = 2
+DEFAULT_DEDUP_WINDOW = 2.0
+DEFAULT_OVERFLOW = OVERFLOW_COALESCE
+
+# Lookup providers (options flow)
+CONF_PROVIDERS = "providers"
+CONF_LOCAL_PROVIDER_URL = "local_provider_url"
+# Timeout of each Open*Facts provider, e.g. "openfoodfacts_timeout"
+CONF_PROVIDER_TIMEOUT = "{provider}_timeout"
+# One timeout for all of them (older options), used when a provider has none
+CONF_LOOKUP_TIMEOUT = "lookup_timeout"
+CONF_LOCAL_PROVIDER_TIMEOUT = "local_provider_timeout"
+CONF_HEDGE_DELAY = "hedge_delay"
+
+PROVIDER_OFF = "openfoodfacts"
+PROVIDER_OBF = "openbeautyfacts"
+PROVIDER_OPF = "openproductsfacts"
+PROVIDER_LOCAL = "local"
+
+DEFAULT_PROVIDERS = [PROVIDER_OFF, PROVIDER_OBF, PROVIDER_OPF]
+DEFAULT_LOOKUP_TIMEOUT = 10.0
+# OpenFoodFacts knows most products: it gets the longest budget
+DEFAULT_PROVIDER_TIMEOUTS = {PROVIDER_OFF: 10.0, PROVIDER_OBF: 5.0, PROVIDER_OPF: 5.0}
+DEFAULT_LOCAL_PROVIDER_TIMEOUT = 3.0
+DEFAULT_HEDGE_DELAY = 1500  # ms
+
+# Background refresh of looked-up products (options flow)
+CONF_REFRESH_AFTER_DAYS = "refresh_after_days"
+CONF_REFRESH_BUDGET = "refresh_budget"
+CONF_REFRESH_IDLE_START = "refresh_idle_start"
+CONF_REFRESH_IDLE_END = "refresh_idle_end"
+
+DEFAULT_REFRESH_AFTER_DAYS = 30  # 0 = never refresh
+DEFAULT_REFRESH_BUDGET = 30  # lookups per hour
+DEFAULT_REFRESH_IDLE_START = 1  # hour of day
+DEFAULT_REFRESH_IDLE_END = 6
+
+# Per-scan stage timings kept for /api/beepbasket/stats (options flow)
+CONF_TRACE_SCANS = "trace_scans"
+DEFAULT_TRACE_SCANS = False
+
+# Dispatcher signals consumed by the websocket subscription
+SIGNAL_CACHE_UPDATED = f"{DOMAIN}_cache_updated"
+SIGNAL_SCAN = f"{DOMAIN}_scan"
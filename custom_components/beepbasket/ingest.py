@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+from homeassistant.core import HomeAssistant, callback
+
+from .const import OVERFLOW_COALESCE, OVERFLOW_DROP_OLDEST
+from .stats import STAGE_QUEUE_WAIT, PipelineStats
+
+_LOGGER = logging.getLogger(__name__)
+
+# Forget debounce timestamps once this many barcodes have been seen
+DEDUP_PRUNE_SIZE = 1000
+# Seconds async_stop waits for waiting and running scans on unload
+DRAIN_TIMEOUT = 10.0
+
+
+class ScanQueue:
+    """Bounded ingestion stage between ``barcode_scanned`` and the pipeline.
+
+    Repeats of a barcode within ``dedup_window`` seconds of its previous scan
+    are dropped (the window restarts on every repeat, so a double-firing
+    scanner is debounced). Scans of the same barcode never run concurrently.
+    When the queue is full, ``coalesce`` rejects the new scan and
+    ``drop_oldest`` discards the oldest waiting one; with ``coalesce`` a
+    barcode that is already waiting is never queued twice.
+
+    The handler gets the barcode and the ``time.perf_counter()`` value at
+    which the scan was queued, for end-to-end latency. ``async_stop`` lets
+    the workers finish the waiting scans first.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        handler: Callable[[str, float], Awaitable[None]],
+        maxsize: int,
+        workers: int,
+        dedup_window: float,
+        overflow: str,
+        pipeline_stats: Optional[PipelineStats] = None,
+    ):
+        self.hass = hass
+        self._handler = handler
+        self._maxsize = maxsize
+        self._worker_count = workers
+        self._dedup_window = dedup_window
+        self._overflow = overflow
+        self._pipeline_stats = pipeline_stats
+        # (barcode, queued_at) in arrival order; _waiting counts per barcode
+        self._pending: deque = deque()
+        self._waiting: Dict[str, int] = {}
+        self._ready = asyncio.Event()
+        # Set while no scan is waiting or running
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._active = 0
+        self._last_seen: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        self._workers = []
+        self.stats = {"submitted": 0, "deduplicated": 0, "coalesced": 0, "dropped": 0, "processed": 0, "failed": 0}
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    @callback
+    def async_start(self):
+        self._workers = [
+            self.hass.async_create_background_task(self._run(), f"beepbasket_scan_worker_{i}")
+            for i in range(self._worker_count)
+        ]
+
+    async def async_stop(self, drain_timeout: float = DRAIN_TIMEOUT):
+        """Finish the waiting scans (up to ``drain_timeout`` seconds), then stop the workers."""
+        if self._workers and drain_timeout:
+            try:
+                await asyncio.wait_for(self._idle.wait(), drain_timeout)
+            except asyncio.TimeoutError:
+                _LOGGER.warning("⚠️ Scan queue not drained in %.0fs, %d scans dropped", drain_timeout, self.depth)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @callback
+    def async_submit(self, barcode: str) -> bool:
+        """Queue a scan; returns False if it was debounced, coalesced or dropped."""
+        self.stats["submitted"] += 1
+        now = time.monotonic()
+        last = self._last_seen.get(barcode)
+        self._last_seen[barcode] = now
+        if last is not None and now - last < self._dedup_window:
+            self.stats["deduplicated"] += 1
+            _LOGGER.debug("🔂 Debounced repeat scan: %s", barcode)
+            return False
+        if len(self._last_seen) > DEDUP_PRUNE_SIZE:
+            self._prune(now)
+
+        if self._overflow == OVERFLOW_COALESCE and barcode in self._waiting:
+            self.stats["coalesced"] += 1
+            return False
+
+        if len(self._pending) >= self._maxsize:
+            if self._overflow == OVERFLOW_DROP_OLDEST:
+                dropped = self._pop()[0]
+                self.stats["dropped"] += 1
+                _LOGGER.warning("⚠️ Scan queue full, dropped oldest scan %s", dropped)
+            else:
+                self.stats["dropped"] += 1
+                _LOGGER.warning("⚠️ Scan queue full, dropped scan %s", barcode)
+                return False
+
+        self._pending.append((barcode, time.perf_counter()))
+        self._waiting[barcode] = self._waiting.get(barcode, 0) + 1
+        self._idle.clear()
+        self._ready.set()
+        return True
+
+    @callback
+    def _pop(self):
+        barcode, queued_at = self._pending.popleft()
+        self._waiting[barcode] -= 1
+        if not self._waiting[barcode]:
+            del self._waiting[barcode]
+        return barcode, queued_at
+
+    @callback
+    def _prune(self, now: float):
+        self._last_seen = {
+            barcode: seen for barcode, seen in self._last_seen.items()
+            if now - seen < self._dedup_window
+        }
+
+    async def _run(self):
+        while True:
+            while not self._pending:
+                self._ready.clear()
+                await self._ready.wait()
+            barcode, queued_at = self._pop()
+            self._active += 1
+            if self._pipeline_stats:
+                self._pipeline_stats.record(STAGE_QUEUE_WAIT, time.perf_counter() - queued_at)
+
+            lock = self._locks.setdefault(barcode, asyncio.Lock())
+            self._lock_users[barcode] = self._lock_users.get(barcode, 0) + 1
+            try:
+                async with lock:
+                    await self._handler(barcode, queued_at)
+                self.stats["processed"] += 1
+            except Exception:  # keep the worker alive
+                self.stats["failed"] += 1
+                _LOGGER.exception("Scan processing failed for %s", barcode)
+            finally:
+                self._lock_users[barcode] -= 1
+                if not self._lock_users[barcode]:
+                    del self._lock_users[barcode]
+                    del self._locks[barcode]
+                self._active -= 1
+                if not self._active and not self._pending:
+                    self._idle.set()
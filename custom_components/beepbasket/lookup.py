@@ -0,0 +1,344 @@
+import asyncio
+import logging
+import time
+import aiohttp
+from typing import Dict, Any, List, Mapping, Optional, Sequence
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import (
+    CONF_LOOKUP_TIMEOUT,
+    CONF_PROVIDER_TIMEOUT,
+    DEFAULT_HEDGE_DELAY,
+    DEFAULT_LOCAL_PROVIDER_TIMEOUT,
+    DEFAULT_LOOKUP_TIMEOUT,
+    DEFAULT_PROVIDER_TIMEOUTS,
+    DEFAULT_PROVIDERS,
+    PROVIDER_LOCAL,
+    PROVIDER_OBF,
+    PROVIDER_OFF,
+    PROVIDER_OPF,
+)
+from .product_index import ProductIndex
+from .stats import STAGE_LOOKUP, PipelineStats
+
+_LOGGER = logging.getLogger(__name__)
+
+# Open*Facts projects share the v2 product API
+PROVIDER_URLS = {
+    PROVIDER_OFF: "https://world.openfoodfacts.org/api/v2/product/{barcode}",
+    PROVIDER_OBF: "https://world.openbeautyfacts.org/api/v2/product/{barcode}",
+    PROVIDER_OPF: "https://world.openproductsfacts.org/api/v2/product/{barcode}",
+}
+OFF_FIELDS = "product_name,generic_name,brands,categories"
+
+# Circuit breaker: after BREAKER_THRESHOLD failures in a row a provider is
+# skipped for BREAKER_COOLDOWN seconds, doubling up to BREAKER_MAX_COOLDOWN
+# while its trial requests keep failing.
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 30.0
+BREAKER_MAX_COOLDOWN = 900.0
+
+# Adaptive ordering: exponentially weighted latency and hit rate per provider
+EWMA_ALPHA = 0.2
+MIN_HIT_RATE = 0.05
+
+
+class LookupUnavailable(Exception):
+    """No provider could answer (network errors, HTTP errors, open breakers)."""
+
+
+class LookupTimeout(LookupUnavailable):
+    """A provider did not answer within its timeout."""
+
+
+class LookupProvider:
+    """One product API in the lookup chain, with its breaker and statistics.
+
+    Remote providers speak the OpenFoodFacts v2 format. The local provider
+    may answer in that format or with a plain ``{"name", "brands",
+    "categories"}`` object; 404 means not found.
+    """
+
+    def __init__(self, name: str, url: str, timeout: float, order: int):
+        self.name = name
+        self.url = url
+        self.order = order
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._timeout_seconds = timeout
+        self.latency: Optional[float] = None
+        self.hit_rate: Optional[float] = None
+        self.failures = 0
+        self._cooldown = BREAKER_COOLDOWN
+        self._open_until = 0.0
+        self.calls = {"found": 0, "not_found": 0, "failed": 0}
+
+    @property
+    def available(self) -> bool:
+        """Closed breaker, or open long enough to let a trial through."""
+        return self.failures < BREAKER_THRESHOLD or time.monotonic() >= self._open_until
+
+    @property
+    def score(self) -> float:
+        """Expected cost of asking this provider first (lower is better)."""
+        if self.latency is None:
+            return 0.0
+        hit_rate = self.hit_rate if self.hit_rate is not None else 1.0
+        return self.latency / max(hit_rate, MIN_HIT_RATE)
+
+    async def async_fetch(self, session: aiohttp.ClientSession, barcode: str) -> Optional[Dict[str, Any]]:
+        started = time.monotonic()
+        try:
+            product = await self._fetch(session, barcode)
+        except LookupUnavailable:
+            self._record_failure(time.monotonic() - started)
+            raise
+        except asyncio.CancelledError:
+            # Lost a hedge race: it would have taken at least this long
+            self._record_latency(time.monotonic() - started)
+            raise
+        self._record_answer(time.monotonic() - started, product is not None)
+        return product
+
+    def _record_latency(self, latency: float):
+        self.latency = latency if self.latency is None else (1 - EWMA_ALPHA) * self.latency + EWMA_ALPHA * latency
+
+    def _record_hit(self, found: bool):
+        hit = 1.0 if found else 0.0
+        self.hit_rate = hit if self.hit_rate is None else (1 - EWMA_ALPHA) * self.hit_rate + EWMA_ALPHA * hit
+
+    def _record_answer(self, latency: float, found: bool):
+        self._record_latency(latency)
+        self._record_hit(found)
+        self.calls["found" if found else "not_found"] += 1
+        if self.failures >= BREAKER_THRESHOLD:
+            _LOGGER.info("✅ Lookup provider %s recovered", self.name)
+        self.failures = 0
+        self._cooldown = BREAKER_COOLDOWN
+
+    def _record_failure(self, latency: float):
+        # A failure costs the time spent and yields nothing
+        self._record_latency(latency)
+        self._record_hit(False)
+        self.calls["failed"] += 1
+        self.failures += 1
+        if self.failures >= BREAKER_THRESHOLD:
+            if self.failures > BREAKER_THRESHOLD:
+                # A trial request failed: back off further
+                self._cooldown = min(self._cooldown * 2, BREAKER_MAX_COOLDOWN)
+            self._open_until = time.monotonic() + self._cooldown
+            _LOGGER.warning("⛔ Lookup provider %s skipped for %ds after %d failures",
+                            self.name, self._cooldown, self.failures)
+
+    async def _fetch(self, session: aiohttp.ClientSession, barcode: str) -> Optional[Dict[str, Any]]:
+        url = self.url.format(barcode=barcode)
+        params = None if self.name == PROVIDER_LOCAL else {"fields": OFF_FIELDS}
+        try:
+            async with session.get(url, params=params, timeout=self.timeout) as resp:
+                if resp.status == 404:
+                    _LOGGER.debug("Product not found on %s: %s", self.name, barcode)
+                    return None
+                if resp.status != 200:
+                    raise LookupUnavailable(f"{self.name}: HTTP {resp.status}")
+                data = await resp.json(content_type=None)
+        except asyncio.TimeoutError as err:
+            raise LookupTimeout(f"{self.name}: no answer within {self._timeout_seconds}s") from err
+        except (aiohttp.ClientError, ValueError) as err:
+            raise LookupUnavailable(f"{self.name}: {err or type(err).__name__}") from err
+
+        if not isinstance(data, dict):
+            raise LookupUnavailable(f"{self.name}: unexpected answer")
+        if "product" not in data and "status" not in data:
+            # Plain answer from a local endpoint
+            name = str(data.get("name") or "").strip()
+            return self._product(name, data) if name else None
+
+        if data.get("status") != 1:
+            _LOGGER.debug("Product not found on %s: %s", self.name, barcode)
+            return None
+
+        product = data.get("product") or {}
+        name = (product.get("product_name") or
+                product.get("generic_name") or
+                product.get("brands") or
+                (product.get("categories") or "").split(",")[0]).strip()
+
+        if name:
+            _LOGGER.debug("Found on %s: %s → %s", self.name, barcode, name)
+            return self._product(name, product)
+
+        _LOGGER.debug("Valid product but no name data on %s: %s", self.name, barcode)
+        return None
+
+    def _product(self, name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "brands": data.get("brands", ""),
+            "categories": data.get("categories", ""),
+            "source": self.name,
+        }
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "available": self.available,
+            "failures": self.failures,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "hit_rate": round(self.hit_rate, 3) if self.hit_rate is not None else None,
+            **self.calls,
+        }
+
+
+def provider_timeouts(options: Mapping[str, Any]) -> Dict[str, float]:
+    """Timeout per Open*Facts provider from the options; an older shared ``lookup_timeout`` still applies."""
+    shared = options.get(CONF_LOOKUP_TIMEOUT)
+    return {
+        name: float(options.get(CONF_PROVIDER_TIMEOUT.format(provider=name)) or shared or default)
+        for name, default in DEFAULT_PROVIDER_TIMEOUTS.items()
+    }
+
+
+def build_providers(names: Sequence[str] = DEFAULT_PROVIDERS, local_url: str = "",
+                    timeouts: Optional[Mapping[str, float]] = None,
+                    local_timeout: float = DEFAULT_LOCAL_PROVIDER_TIMEOUT) -> List[LookupProvider]:
+    """Providers in configured order, each with its own timeout; a local endpoint (if set) comes first."""
+    timeouts = DEFAULT_PROVIDER_TIMEOUTS if timeouts is None else timeouts
+    providers = []
+    if local_url:
+        providers.append(LookupProvider(PROVIDER_LOCAL, local_url, local_timeout, 0))
+    for name in names:
+        if name in PROVIDER_URLS:
+            timeout = timeouts.get(name, DEFAULT_LOOKUP_TIMEOUT)
+            providers.append(LookupProvider(name, PROVIDER_URLS[name], timeout, len(providers)))
+    return providers
+
+
+class LookupClient:
+    """Long-lived product lookup client owned by the config entry.
+
+    An imported offline dump (``ProductIndex``) is checked first, then the
+    provider chain. Providers are tried cheapest first (observed latency
+    divided by hit rate); when one has not answered after ``hedge_delay``
+    seconds, or answered "not found", the next one starts too, and the first
+    product found wins. Concurrent lookups of the same barcode share one
+    chain run, and all requests use Home Assistant's shared aiohttp session.
+    """
+
+    def __init__(self, hass: HomeAssistant, product_index: Optional[ProductIndex] = None,
+                 pipeline_stats: Optional[PipelineStats] = None,
+                 providers: Optional[List[LookupProvider]] = None,
+                 hedge_delay: float = DEFAULT_HEDGE_DELAY / 1000):
+        self.hass = hass
+        self._product_index = product_index
+        self._pipeline_stats = pipeline_stats
+        self._session = async_get_clientsession(hass)
+        self.providers = providers if providers is not None else build_providers()
+        # 0 turns hedging off: the next provider only starts after a miss or error
+        self._hedge_delay = hedge_delay or None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def async_lookup(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Return product data, None when not found; raise LookupUnavailable when no provider answered."""
+        task = self._inflight.get(barcode)
+        if task is None:
+            task = self.hass.async_create_task(self._fetch(barcode))
+            self._inflight[barcode] = task
+            task.add_done_callback(lambda _: self._inflight.pop(barcode, None))
+        else:
+            _LOGGER.debug("🔁 Joining in-flight lookup for %s", barcode)
+        # Shield so one cancelled caller does not cancel the shared request
+        return await asyncio.shield(task)
+
+    def ordered_providers(self) -> List[LookupProvider]:
+        """Available providers, cheapest first; untried ones keep their configured order."""
+        available = [provider for provider in self.providers if provider.available]
+        return sorted(available, key=lambda provider: (provider.score, provider.order))
+
+    async def _fetch(self, barcode: str) -> Optional[Dict[str, Any]]:
+        if self._product_index:
+            product = await self._product_index.async_get(barcode)
+            if product:
+                _LOGGER.debug("Found in offline index: %s → %s", barcode, product["name"])
+                self._count("index_hit")
+                return product
+
+        started = time.perf_counter()
+        try:
+            return await self._fetch_chain(barcode)
+        finally:
+            if self._pipeline_stats:
+                self._pipeline_stats.record(STAGE_LOOKUP, time.perf_counter() - started)
+
+    async def _fetch_chain(self, barcode: str) -> Optional[Dict[str, Any]]:
+        order = self.ordered_providers()
+        # Skipped and failed providers are reported, but a "not found" from any
+        # other provider is final once all have answered
+        errors = [f"{provider.name}: circuit open" for provider in self.providers if provider not in order]
+        if not order:
+            raise LookupUnavailable("; ".join(errors) or "no lookup providers configured")
+
+        pending = set()
+        remaining = iter(order)
+
+        def start_next() -> bool:
+            provider = next(remaining, None)
+            if provider is None:
+                return False
+            pending.add(self.hass.async_create_task(self._call(provider, barcode)))
+            return True
+
+        misses = 0
+        start_next()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=self._hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slow answer: hedge with the next provider
+                    if start_next():
+                        self._count("lookup_hedged")
+                    else:
+                        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                for task in done:
+                    try:
+                        product = task.result()
+                    except LookupUnavailable as err:
+                        errors.append(str(err))
+                        start_next()
+                        continue
+                    if product:
+                        return product
+                    misses += 1
+                    start_next()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if errors and not misses:
+            raise LookupUnavailable("; ".join(errors))
+        if errors:
+            # Otherwise a product only a flaky provider could know (home
+            # brands) would never be negative-cached and retry forever
+            _LOGGER.debug("%s not found (%s)", barcode, "; ".join(errors))
+        return None
+
+    async def _call(self, provider: LookupProvider, barcode: str) -> Optional[Dict[str, Any]]:
+        try:
+            product = await provider.async_fetch(self._session, barcode)
+        except LookupTimeout:
+            self._count("api_timeout")
+            raise
+        except LookupUnavailable:
+            self._count("api_error")
+            raise
+        self._count("api_success" if product else "api_miss")
+        return product
+
+    def _count(self, counter: str):
+        if self._pipeline_stats:
+            self._pipeline_stats.increment(counter)
+
+    def provider_stats(self) -> List[Dict[str, Any]]:
+        """Providers in the order the next lookup would try them; skipped ones last."""
+        ordered = self.ordered_providers()
+        return [provider.as_dict() for provider in ordered + [p for p in self.providers if p not in ordered]]
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from homeassistant.core import HomeAssistant
+
+from .barcode import normalize_barcode
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_BULK_MAPPINGS = 5000
+RENAME_CONCURRENCY = 4
+
+
+def build_mapping(data: Mapping[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(barcode, product_data) from add_mapping style fields, None if incomplete or invalid."""
+    barcode = normalize_barcode(str(data.get("code") or data.get("barcode", "")))
+    name = str(data.get("product_name") or data.get("product", "")).strip()
+    if not barcode or not name:
+        return None
+
+    # Build OFF-compatible product_data (backwards + forwards compatible)
+    return barcode, {
+        "name": name,
+        "brands": data.get("brands", ""),
+        "quantity": data.get("quantity", ""),
+        "stores": data.get("stores", ""),
+        "source": data.get("source", "manual"),
+        "local_override": True
+    }
+
+
+async def async_bulk_add_mappings(hass: HomeAssistant, raw_mappings: List[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Write many manual mappings at once and rename affected list items.
+
+    Renames are computed against a single snapshot of the shopping list
+    mirror before anything changes, so an item is renamed at most once, and
+    only the needed ``todo.update_item`` calls are made (a few at a time).
+    """
+    cache = hass.data[DOMAIN]["cache"]
+    shopping_list = hass.data[DOMAIN]["shopping_list"]
+
+    mappings: Dict[str, Dict[str, Any]] = {}
+    invalid = 0
+    for raw in raw_mappings:
+        mapping = build_mapping(raw) if isinstance(raw, Mapping) else None
+        if mapping is None:
+            invalid += 1
+            continue
+        barcode, product_data = mapping
+        mappings[barcode] = product_data
+
+    renames = {}
+    for barcode, product_data in mappings.items():
+        old_entry = await cache.get(barcode)
+        old_name = old_entry.get("name") if old_entry else barcode
+        if old_name == product_data["name"]:
+            continue
+        for item in shopping_list.items_for(barcode, old_name):
+            renames[id(item)] = (item, product_data["name"], barcode)
+
+    await cache.set_products(mappings)
+
+    semaphore = asyncio.Semaphore(RENAME_CONCURRENCY)
+    failed = 0
+
+    async def rename(item, name, barcode):
+        nonlocal failed
+        async with semaphore:
+            try:
+                await shopping_list.async_rename(item, name, barcode)
+            except Exception as e:
+                failed += 1
+                _LOGGER.error("Shopping list sync FAILED for %s: %s", barcode, e)
+
+    await asyncio.gather(*(rename(*rename_args) for rename_args in renames.values()))
+
+    _LOGGER.info("🖥️ Bulk mappings: %d saved, %d list items renamed, %d invalid",
+                 len(mappings), len(renames) - failed, invalid)
+    return {"saved": len(mappings), "renamed": len(renames) - failed, "rename_failed": failed, "invalid": invalid}
@@ -0,0 +1,230 @@
+import asyncio
+import csv
+import gzip
+import io
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional
+from homeassistant.core import HomeAssistant
+
+from .barcode import normalize_barcode
+
+_LOGGER = logging.getLogger(__name__)
+
+# Rows per transaction; progress is saved (and reported) after each batch
+IMPORT_BATCH = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    code TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    brands TEXT,
+    categories TEXT,
+    modified INTEGER
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+UPSERT = """
+INSERT INTO products (code, name, brands, categories, modified) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(code) DO UPDATE SET
+    name = excluded.name, brands = excluded.brands,
+    categories = excluded.categories, modified = excluded.modified
+WHERE products.modified IS NULL OR excluded.modified IS NULL OR excluded.modified > products.modified
+"""
+
+
+def _product_name(product: Dict[str, Any]) -> str:
+    """Same name fallback as the OpenFoodFacts API lookup."""
+    return (product.get("product_name") or
+            product.get("generic_name") or
+            product.get("brands") or
+            (product.get("categories") or "").split(",")[0]).strip()
+
+
+class ProductIndex:
+    """Local OpenFoodFacts products, imported from a JSONL or CSV export.
+
+    A SQLite table keyed by barcode (WAL mode). Lookups run on one dedicated
+    thread with a long-lived connection; an import streams the dump on its
+    own connection, so lookups keep working while it runs.
+    """
+
+    def __init__(self, hass: HomeAssistant, db_path: str):
+        self.hass = hass
+        self._db_path = db_path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="beepbasket_index")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._has_products = False
+        self._cancel_import = False
+        self.import_task: Optional[asyncio.Task] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    async def _run(self, func: Callable, *args):
+        return await self.hass.loop.run_in_executor(self._executor, func, *args)
+
+    async def async_open(self):
+        def _open():
+            self._conn = self._connect()
+            return self._conn.execute("SELECT 1 FROM products LIMIT 1").fetchone() is not None
+
+        self._has_products = await self._run(_open)
+        if self._has_products:
+            _LOGGER.info("📚 Offline product index ready: %s", self._db_path)
+
+    async def async_close(self):
+        self._cancel_import = True
+        if self.import_task:
+            await asyncio.gather(self.import_task, return_exceptions=True)
+
+        def _close():
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+        await self._run(_close)
+        self._executor.shutdown(wait=False)
+
+    async def async_get(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Product data for ``barcode`` from the dump, or None."""
+        if not self._has_products:
+            return None
+
+        def _get():
+            return self._conn.execute(
+                "SELECT name, brands, categories FROM products WHERE code = ?", (barcode,)
+            ).fetchone()
+
+        row = await self._run(_get)
+        if row is None:
+            return None
+        return {
+            "name": row[0],
+            "brands": row[1] or "",
+            "categories": row[2] or "",
+            "source": "openfoodfacts_dump",
+        }
+
+    async def async_import(self, path: str, restart: bool = False) -> Dict[str, Any]:
+        """Stream a dump into the index (executor); resumable and incremental."""
+        self._cancel_import = False
+        loop = self.hass.loop
+
+        def report(progress: Dict[str, Any]):
+            loop.call_soon_threadsafe(self.hass.bus.async_fire, "beepbasket_import_progress", progress)
+
+        result = await self._run(self._import, path, restart, report)
+        self._has_products = self._has_products or result["imported"] > 0
+        return result
+
+    def _import(self, path: str, restart: bool, report: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        stat = os.stat(path)
+        source = f"{os.path.abspath(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+        conn = self._connect()
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            skip = 0
+            if not restart and meta.get("import_source") == source:
+                if meta.get("import_complete") == "1":
+                    _LOGGER.info("📚 %s already imported", path)
+                    return {"path": path, "lines": int(meta.get("import_line", 0)), "imported": 0, "complete": True}
+                skip = int(meta.get("import_line", 0))
+                _LOGGER.info("📚 Resuming import of %s at line %d", path, skip)
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("import_source", source), ("import_complete", "0"), ("import_line", str(skip))],
+            )
+            conn.commit()
+
+            with open(path, "rb") as raw:
+                stream = gzip.GzipFile(fileobj=raw) if path.endswith(".gz") else raw
+                text = io.TextIOWrapper(stream, encoding="utf-8", errors="replace", newline="")
+                name = path[:-3] if path.endswith(".gz") else path
+                rows = _iter_csv(text, skip) if name.endswith((".csv", ".tsv")) else _iter_jsonl(text, skip)
+
+                line = skip
+                imported = 0
+                batch = []
+                for product in rows:
+                    line += 1
+                    if self._cancel_import:
+                        break
+                    row = _index_row(product)
+                    if row:
+                        batch.append(row)
+                    if line % IMPORT_BATCH == 0:
+                        imported += self._write_batch(conn, batch, line)
+                        batch = []
+                        report({"path": path, "lines": line, "imported": imported,
+                                "bytes_read": raw.tell(), "total_bytes": stat.st_size})
+                imported += self._write_batch(conn, batch, line)
+
+            complete = not self._cancel_import
+            if complete:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('import_complete', '1')")
+                conn.commit()
+            result = {"path": path, "lines": line, "imported": imported, "complete": complete}
+            report({**result, "bytes_read": stat.st_size if complete else None, "total_bytes": stat.st_size})
+            _LOGGER.info("📚 Import %s: %d lines, %d products written", "finished" if complete else "paused", line, imported)
+            return result
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _write_batch(conn: sqlite3.Connection, batch, line: int) -> int:
+        before = conn.total_changes
+        conn.executemany(UPSERT, batch)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('import_line', ?)", (str(line),))
+        conn.commit()
+        # total_changes also counts the meta row
+        return conn.total_changes - before - 1
+
+
+def _index_row(product: Dict[str, Any]):
+    # Same key as a scan of this product; codes with bad check digits are skipped
+    code = normalize_barcode(str(product.get("code") or ""))
+    name = _product_name(product)
+    if not code or not name:
+        return None
+    try:
+        modified = int(product.get("last_modified_t") or 0) or None
+    except (TypeError, ValueError):
+        modified = None
+    return (code, name, product.get("brands") or "", product.get("categories") or "", modified)
+
+
+def _iter_jsonl(text: io.TextIOWrapper, skip: int = 0) -> Iterator[Dict[str, Any]]:
+    # Lines already imported are skipped unparsed
+    for line in itertools.islice(text, skip, None):
+        try:
+            product = json.loads(line)
+        except ValueError:
+            yield {}
+            continue
+        yield product if isinstance(product, dict) else {}
+
+
+def _iter_csv(text: io.TextIOWrapper, skip: int = 0) -> Iterator[Dict[str, Any]]:
+    """OpenFoodFacts "CSV" exports are tab separated."""
+    csv.field_size_limit(sys.maxsize)
+    reader = csv.DictReader(text, delimiter="\t", quoting=csv.QUOTE_NONE)
+    if skip:
+        # Read the header, then drop the imported lines without splitting them
+        reader.fieldnames
+        for _ in itertools.islice(text, skip):
+            pass
+    yield from reader
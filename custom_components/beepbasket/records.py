@@ -0,0 +1,81 @@
+"""Compact in-memory representation of cache entries."""
+import sys
+from collections.abc import Mapping
+from operator import attrgetter
+from typing import Any, Dict, Iterator, Optional
+
+# Known entry fields, in the order they are listed
+FIELDS = (
+    "status", "name", "source", "brands", "categories", "quantity", "stores",
+    "scanned_count", "miss_count", "local_override", "ready_to_contribute",
+    "first_seen", "last_updated", "last_scanned", "last_checked", "retry_after",
+)
+_FIELD_SET = frozenset(FIELDS)
+_get_fields = attrgetter(*FIELDS)
+# Few distinct values shared by every entry
+INTERNED_FIELDS = ("status", "source")
+
+
+class CacheRecord(Mapping):
+    """One cache entry with slots instead of a per-entry dict.
+
+    Reads like the entry dict it replaces (``entry.get("name")``,
+    ``dict(entry)``, ``**entry``, ``as_dict()`` for JSON), so callers and
+    the stores see the same data. ``status`` and ``source`` are interned;
+    timestamps stay ISO strings so reads and serialization cost nothing
+    extra. Unset fields are None and fields this class does not know go to
+    ``extra``.
+    """
+
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, **fields: Any):
+        # Bulk loads and imports build many of these: set slots directly
+        set_slot = object.__setattr__
+        for field in FIELDS:
+            set_slot(self, field, fields.pop(field, None))
+        for field in INTERNED_FIELDS:
+            value = getattr(self, field)
+            if isinstance(value, str):
+                set_slot(self, field, sys.intern(value))
+        self.extra: Optional[Dict[str, Any]] = {
+            key: value for key, value in fields.items() if value is not None
+        } or None
+
+    def __setattr__(self, key: str, value: Any):
+        if key in INTERNED_FIELDS and isinstance(value, str):
+            value = sys.intern(value)
+        object.__setattr__(self, key, value)
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "CacheRecord":
+        return data if isinstance(data, cls) else cls(**data)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for field in FIELDS:
+            if getattr(self, field) is not None:
+                yield field
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = {field: value for field, value in zip(FIELDS, _get_fields(self)) if value is not None}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self) -> str:
+        return f"CacheRecord({self.as_dict()!r})"
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Any, Deque, Dict, Optional, Set
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .cache import BarcodeCache
+from .lookup import LookupClient, LookupUnavailable
+from .resolver import ProductResolver
+from .shopping_list import ShoppingListMirror
+from .stats import PipelineStats
+
+_LOGGER = logging.getLogger(__name__)
+
+# How often the idle-hours sweep looks for stale entries
+SWEEP_INTERVAL = timedelta(minutes=10)
+# Pause between two refresh lookups, and while scans are being resolved
+REFRESH_SPACING = 2.0
+BUDGET_WINDOW = 3600.0
+
+
+class ProductRefresher:
+    """Stale-while-revalidate for looked-up products.
+
+    Scans of stale entries are served from the cache and queue a refresh
+    here (``async_request``). During the idle hours a sweep also queues the
+    most scanned stale entries. Both share one lookup budget per hour and
+    yield to the resolver, so refreshes never delay a scan.
+    """
+
+    def __init__(self, hass: HomeAssistant, cache: BarcodeCache, client: LookupClient,
+                 shopping_list: ShoppingListMirror, resolver: ProductResolver, pipeline_stats: PipelineStats,
+                 max_age_days: int, budget: int, idle_start: int, idle_end: int):
+        self.hass = hass
+        self._cache = cache
+        self._client = client
+        self._shopping_list = shopping_list
+        self._resolver = resolver
+        self._stats = pipeline_stats
+        self.max_age = timedelta(days=max_age_days)
+        self.enabled = max_age_days > 0 and budget > 0
+        self._budget = budget
+        self._idle_start = idle_start
+        self._idle_end = idle_end
+        # Scan requests go before sweep picks
+        self._requested: Deque[str] = deque()
+        self._swept: Deque[str] = deque()
+        self._queued: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._sent: Deque[float] = deque()
+        self._worker: Optional[asyncio.Task] = None
+        self._unsub_sweep = None
+
+    @callback
+    def async_start(self):
+        if not self.enabled:
+            return
+        self._worker = self.hass.async_create_background_task(self._run(), "beepbasket_refresher")
+        self._unsub_sweep = async_track_time_interval(self.hass, self._async_sweep, SWEEP_INTERVAL)
+
+    async def async_stop(self):
+        if self._unsub_sweep:
+            self._unsub_sweep()
+            self._unsub_sweep = None
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    @callback
+    def async_request(self, barcode: str, entry: Optional[Dict[str, Any]]):
+        """Queue a refresh if the entry just served from the cache is stale."""
+        if not self.enabled or barcode in self._queued or not self._cache.is_stale(entry, self.max_age):
+            return
+        self._queued.add(barcode)
+        self._requested.append(barcode)
+        self._stats.increment("refresh_queued")
+        self._wakeup.set()
+
+    def is_idle_hour(self) -> bool:
+        """Inside the idle window; equal start and end hours mean all day."""
+        hour = dt_util.now().hour
+        if self._idle_start == self._idle_end:
+            return True
+        if self._idle_start < self._idle_end:
+            return self._idle_start <= hour < self._idle_end
+        return hour >= self._idle_start or hour < self._idle_end
+
+    @callback
+    def _async_sweep(self, _now=None):
+        """Queue the most scanned stale entries that fit this hour's budget."""
+        if not self.is_idle_hour() or self._queued:
+            return
+        self._prune_sent()
+        room = self._budget - len(self._sent)
+        if room <= 0:
+            return
+        barcodes = self._cache.stale_entries(self.max_age, room)
+        for barcode in barcodes:
+            self._queued.add(barcode)
+            self._swept.append(barcode)
+        if barcodes:
+            _LOGGER.debug("♻️ Sweep queued %d stale entries", len(barcodes))
+            self._wakeup.set()
+
+    @callback
+    def _prune_sent(self):
+        cutoff = time.monotonic() - BUDGET_WINDOW
+        while self._sent and self._sent[0] < cutoff:
+            self._sent.popleft()
+
+    async def _wait_for_turn(self):
+        """Sleep until the budget allows another lookup and no scan is resolving."""
+        while True:
+            self._prune_sent()
+            if len(self._sent) >= self._budget:
+                await asyncio.sleep(self._sent[0] + BUDGET_WINDOW - time.monotonic())
+            elif self._resolver.pending:
+                await asyncio.sleep(REFRESH_SPACING)
+            else:
+                return
+
+    async def _run(self):
+        while True:
+            if not self._requested and not self._swept:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self._wait_for_turn()
+            barcode = (self._requested or self._swept).popleft()
+            try:
+                if self._cache.is_stale(await self._cache.get(barcode), self.max_age):
+                    self._sent.append(time.monotonic())
+                    await self._refresh(barcode)
+            except Exception:  # keep the worker alive
+                _LOGGER.exception("Refresh failed for %s", barcode)
+            finally:
+                self._queued.discard(barcode)
+            await asyncio.sleep(REFRESH_SPACING)
+
+    async def _refresh(self, barcode: str):
+        old_name = (await self._cache.get(barcode) or {}).get("name")
+        try:
+            product_data = await self._client.async_lookup(barcode)
+        except LookupUnavailable as err:
+            # Still stale: the next scan or sweep tries again
+            self._stats.increment("refresh_failed")
+            _LOGGER.debug("Refresh of %s deferred: %s", barcode, err)
+            return
+
+        if not product_data:
+            # Keep the old name rather than forgetting a product that was known
+            await self._cache.mark_checked(barcode)
+            self._stats.increment("refresh_not_found")
+            return
+
+        if not await self._cache.refresh_product(barcode, product_data):
+            return
+        name = product_data["name"]
+        if name == old_name:
+            self._stats.increment("refresh_unchanged")
+            return
+        self._stats.increment("refresh_updated")
+        try:
+            for item in self._shopping_list.items_for(barcode, old_name):
+                await self._shopping_list.async_rename(item, name, barcode)
+        except Exception as e:
+            _LOGGER.error("Shopping list sync FAILED: %s", e)
+
+    def as_dict(self) -> Dict[str, Any]:
+        self._prune_sent()
+        return {
+            "enabled": self.enabled,
+            "queued": len(self._queued),
+            "budget_used": len(self._sent),
+            "budget_per_hour": self._budget,
+            "idle_hours": [self._idle_start, self._idle_end],
+        }
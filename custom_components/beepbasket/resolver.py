@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from typing import Dict, Set
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
+
+from .cache import BarcodeCache
+from .const import SIGNAL_SCAN
+from .lookup import LookupClient, LookupUnavailable
+from .shopping_list import ShoppingListMirror
+
+_LOGGER = logging.getLogger(__name__)
+
+# Retry delays (seconds) while no lookup provider can answer; the last repeats.
+RETRY_BACKOFF = (5, 15, 60, 300)
+# Failed lookups of one barcode before giving up until its next scan
+MAX_RETRIES = 8
+RESOLVER_WORKERS = 4
+
+
+class ProductResolver:
+    """Background lookups for barcodes already on the list as placeholders.
+
+    ``handle_barcode`` adds the barcode (or last known name) to the shopping
+    list immediately and hands it to the resolver, which looks it up and
+    renames the placeholder through ``todo.update_item`` once a name is known.
+    """
+
+    def __init__(self, hass: HomeAssistant, cache: BarcodeCache, client: LookupClient, shopping_list: ShoppingListMirror):
+        self.hass = hass
+        self._cache = cache
+        self._client = client
+        self._shopping_list = shopping_list
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._placeholders: Dict[str, str] = {}
+        self._failures: Dict[str, int] = {}
+        self._retry_unsubs: Set = set()
+        self._workers = []
+
+    @callback
+    def async_start(self):
+        self._workers = [
+            self.hass.async_create_background_task(self._run(), f"beepbasket_resolver_{i}")
+            for i in range(RESOLVER_WORKERS)
+        ]
+
+    async def async_stop(self):
+        for unsub in self._retry_unsubs:
+            unsub()
+        self._retry_unsubs.clear()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @callback
+    def async_enqueue(self, barcode: str, placeholder: str):
+        """Resolve ``barcode`` later; ``placeholder`` is the summary on the list."""
+        if barcode in self._placeholders:
+            return
+        self._placeholders[barcode] = placeholder
+        self._queue.put_nowait(barcode)
+
+    @property
+    def pending(self) -> int:
+        return len(self._placeholders)
+
+    async def _run(self):
+        while True:
+            barcode = await self._queue.get()
+            try:
+                await self._resolve(barcode)
+            except Exception:  # keep the worker alive
+                _LOGGER.exception("Resolver failed for %s", barcode)
+                self._placeholders.pop(barcode, None)
+            finally:
+                self._queue.task_done()
+
+    async def _resolve(self, barcode: str):
+        try:
+            product_data = await self._client.async_lookup(barcode)
+        except LookupUnavailable as err:
+            placeholder = self._placeholders[barcode]
+            if self._failures.get(barcode, 0) >= MAX_RETRIES:
+                # Give up for now: count the scan without a negative-cache
+                # window, so the next scan of it tries again
+                del self._placeholders[barcode]
+                del self._failures[barcode]
+                await self._cache.set_unknown(barcode, lookup_missed=False)
+                _LOGGER.warning("API lookup of %s failed %d times, giving up: %s", barcode, MAX_RETRIES + 1, err)
+            else:
+                self._schedule_retry(barcode, err)
+            async_dispatcher_send(self.hass, SIGNAL_SCAN, {
+                "barcode": barcode, "product": placeholder, "result": "lookup_failed"
+            })
+            return
+
+        self._failures.pop(barcode, None)
+        placeholder = self._placeholders.pop(barcode)
+        if not product_data:
+            await self._cache.set_unknown(barcode)
+            _LOGGER.warning("❓ Unknown: %s", barcode)
+            async_dispatcher_send(self.hass, SIGNAL_SCAN, {
+                "barcode": barcode, "product": placeholder, "result": "unknown"
+            })
+            return
+
+        await self._cache.set_product(barcode, product_data, scans=1)
+        name = product_data["name"]
+        _LOGGER.info("🌐 API success %s → %s", barcode, name)
+        if name != placeholder:
+            await self._rename_placeholder(barcode, placeholder, name)
+        async_dispatcher_send(self.hass, SIGNAL_SCAN, {
+            "barcode": barcode, "product": name, "result": "resolved"
+        })
+
+    @callback
+    def _schedule_retry(self, barcode: str, err: Exception):
+        failures = self._failures.get(barcode, 0) + 1
+        self._failures[barcode] = failures
+        delay = RETRY_BACKOFF[min(failures, len(RETRY_BACKOFF)) - 1]
+        _LOGGER.warning("API lookup error for %s: %s (retry in %ss)", barcode, err, delay)
+
+        @callback
+        def _retry(_now):
+            self._retry_unsubs.discard(unsub)
+            self._queue.put_nowait(barcode)
+
+        unsub = async_call_later(self.hass, delay, _retry)
+        self._retry_unsubs.add(unsub)
+
+    async def _rename_placeholder(self, barcode: str, placeholder: str, name: str):
+        """Rename the placeholder item, or drop it if ``name`` is already listed."""
+        item = self._shopping_list.find(placeholder)
+        if item is None:
+            _LOGGER.debug("Placeholder '%s' no longer active, nothing to rename", placeholder)
+            return
+        try:
+            if await self._shopping_list.async_is_active(name):
+                await self._shopping_list.async_remove(item)
+                _LOGGER.info("⏭️ '%s' already ACTIVE, dropped placeholder '%s'", name, placeholder)
+                return
+
+            await self._shopping_list.async_rename(item, name, barcode)
+            _LOGGER.info("🔄 Resolved '%s' → '%s'", placeholder, name)
+        except Exception as e:
+            _LOGGER.error("Placeholder rename FAILED: %s", e)
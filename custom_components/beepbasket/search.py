@@ -0,0 +1,290 @@
+import heapq
+import logging
+import re
+import sys
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+from homeassistant.core import callback
+
+_LOGGER = logging.getLogger(__name__)
+
+# Fields searched besides the barcode
+SEARCH_FIELDS = ("name", "brands", "categories")
+# Entry fields the search endpoint returns with each hit
+RESULT_FIELDS = ("name", "brands", "status", "scanned_count", "ready_to_contribute")
+
+MIN_QUERY_LENGTH = 2
+MIN_FUZZY_LENGTH = 3
+# Dice similarity of the trigram sets for a fuzzy token match
+FUZZY_THRESHOLD = 0.5
+MAX_FUZZY_LENGTH_DIFFERENCE = 2
+MAX_FUZZY_TOKENS = 50
+# Barcodes re-indexed since the popularity order was sorted, before it is re-sorted
+RERANK_AFTER = 1000
+
+TOKEN_PATTERN = re.compile(r"[0-9a-z]+")
+
+
+def fold(text: str) -> str:
+    """Lowercase without accents: ``Crème Brûlée`` → ``creme brulee``."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(fold(text)) if len(token) > 1]
+
+
+def trigrams(token: str) -> Set[str]:
+    # Padding gives short words enough trigrams to compare and favours
+    # tokens that start and end the same way
+    padded = f"  {token}  "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def result_summary(entry: Mapping[str, Any]) -> Dict[str, Any]:
+    return {field: entry.get(field) for field in RESULT_FIELDS if entry.get(field) is not None}
+
+
+def _doc_tokens(barcode: str, entry: Mapping[str, Any]) -> Tuple[str, ...]:
+    tokens: Set[str] = set()
+    for field in SEARCH_FIELDS:
+        value = entry.get(field)
+        if field == "name" and value == barcode:
+            # Unknown products are named after their barcode
+            continue
+        if isinstance(value, list):
+            value = " ".join(str(part) for part in value)
+        if value:
+            tokens.update(tokenize(str(value)))
+    return tuple(tokens)
+
+
+class ProductSearchIndex:
+    """In-memory typeahead search over the product cache.
+
+    Words of the name, brands and categories are indexed in a sorted token
+    list (prefix ranges by bisection) and by trigram (typo-tolerant
+    matches). Barcodes are kept sorted for prefix search. Hits are ranked by
+    ``scanned_count``; fuzzy hits only fill up what prefix matching left.
+    Large candidate sets are ranked by walking a precomputed popularity
+    order instead of comparing every candidate.
+    ``async_update`` follows single cache changes, so no rebuild is needed
+    after the initial ``build``. Per barcode only its tokens, scan count and
+    status are kept; ``search`` returns barcodes and the caller reads the
+    entries it shows.
+    """
+
+    def __init__(self):
+        # barcode -> (tokens, status, ready_to_contribute)
+        self._docs: Dict[str, Tuple[Tuple[str, ...], Optional[str], bool]] = {}
+        self._counts: Dict[str, int] = {}
+        self._token_docs: Dict[str, Set[str]] = {}
+        self._tokens: List[str] = []
+        self._trigram_tokens: Dict[str, Set[str]] = {}
+        self._barcodes: List[str] = []
+        # Barcodes by scanned_count, exact except for the ones in _changed
+        self._ranked: List[str] = []
+        self._changed: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def build(self, entries: Iterable[Tuple[str, Mapping[str, Any]]]):
+        """Index everything at once from any iterable, e.g. a database cursor.
+
+        Executor-safe: touches only this index. Returns the number of entries.
+        """
+        docs: Dict[str, Tuple[Tuple[str, ...], Optional[str], bool]] = {}
+        counts: Dict[str, int] = {}
+        token_docs: Dict[str, Set[str]] = {}
+        for barcode, entry in entries:
+            tokens = _doc_tokens(barcode, entry)
+            docs[barcode] = self._doc(tokens, entry)
+            counts[barcode] = entry.get("scanned_count") or 0
+            for token in tokens:
+                token_docs.setdefault(token, set()).add(barcode)
+        trigram_tokens: Dict[str, Set[str]] = {}
+        for token in token_docs:
+            for gram in trigrams(token):
+                trigram_tokens.setdefault(gram, set()).add(token)
+        self._docs = docs
+        self._counts = counts
+        self._token_docs = token_docs
+        self._tokens = sorted(token_docs)
+        self._trigram_tokens = trigram_tokens
+        self._barcodes = sorted(docs)
+        self._rerank()
+        return len(docs)
+
+    @staticmethod
+    def _doc(tokens: Tuple[str, ...], entry: Mapping[str, Any]) -> Tuple[Tuple[str, ...], Optional[str], bool]:
+        status = entry.get("status")
+        # Few distinct values: share one string object
+        status = sys.intern(status) if isinstance(status, str) else None
+        return tokens, status, bool(entry.get("ready_to_contribute"))
+
+    def _matches(self, barcode: str, status: Optional[str]) -> bool:
+        """Like ``storage.matches_status`` on the indexed fields."""
+        if not status:
+            return True
+        _, doc_status, ready = self._docs[barcode]
+        return ready if status == "ready_to_contribute" else doc_status == status
+
+    @callback
+    def async_update(self, barcode: str, entry: Optional[Mapping[str, Any]], _version: int = 0):
+        """Re-index one barcode; ``entry`` None removes it (SIGNAL_CACHE_UPDATED handler)."""
+        old = self._docs.pop(barcode, None)
+        self._counts.pop(barcode, None)
+        self._changed.add(barcode)
+        if old:
+            for token in old[0]:
+                self._remove_token_doc(token, barcode)
+        if entry is None:
+            if old:
+                del self._barcodes[bisect_left(self._barcodes, barcode)]
+            return
+
+        tokens = _doc_tokens(barcode, entry)
+        self._docs[barcode] = self._doc(tokens, entry)
+        self._counts[barcode] = entry.get("scanned_count") or 0
+        if not old:
+            insort(self._barcodes, barcode)
+        for token in tokens:
+            docs = self._token_docs.get(token)
+            if docs is None:
+                docs = self._token_docs[token] = set()
+                insort(self._tokens, token)
+                for gram in trigrams(token):
+                    self._trigram_tokens.setdefault(gram, set()).add(token)
+            docs.add(barcode)
+
+    @callback
+    def _remove_token_doc(self, token: str, barcode: str):
+        docs = self._token_docs[token]
+        docs.discard(barcode)
+        if docs:
+            return
+        del self._token_docs[token]
+        del self._tokens[bisect_left(self._tokens, token)]
+        for gram in trigrams(token):
+            grams = self._trigram_tokens[gram]
+            grams.discard(token)
+            if not grams:
+                del self._trigram_tokens[gram]
+
+    @staticmethod
+    def _prefix_bounds(keys: List[str], prefix: str) -> Tuple[int, int]:
+        start = bisect_left(keys, prefix)
+        return start, bisect_left(keys, prefix + "\uffff", start)
+
+    def _prefix_range(self, keys: List[str], prefix: str) -> List[str]:
+        start, end = self._prefix_bounds(keys, prefix)
+        return keys[start:end]
+
+    def _fuzzy_tokens(self, term: str) -> Set[str]:
+        """Indexed tokens within FUZZY_THRESHOLD trigram similarity of ``term``."""
+        grams = trigrams(term)
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self._trigram_tokens.get(gram, ()))
+        close = []
+        for token, count in shared.items():
+            if abs(len(token) - len(term)) > MAX_FUZZY_LENGTH_DIFFERENCE:
+                continue
+            # A padded token of n characters has n + 2 trigrams
+            similarity = 2 * count / (len(grams) + len(token) + 2)
+            if similarity >= FUZZY_THRESHOLD:
+                close.append((similarity, token))
+        return {token for _, token in heapq.nlargest(MAX_FUZZY_TOKENS, close)}
+
+    def _match(self, term_tokens: List[Set[str]]) -> Set[str]:
+        """Barcodes whose tokens match every term (each term: a set of acceptable tokens)."""
+        if not term_tokens or not all(term_tokens):
+            return set()
+        # Start from the most selective term, then filter by the others
+        sizes = [sum(len(self._token_docs[token]) for token in tokens) for tokens in term_tokens]
+        order = sorted(range(len(term_tokens)), key=sizes.__getitem__)
+        candidates: Set[str] = set()
+        for token in term_tokens[order[0]]:
+            candidates |= self._token_docs[token]
+        for index in order[1:]:
+            tokens = term_tokens[index]
+            candidates = {barcode for barcode in candidates if not tokens.isdisjoint(self._docs[barcode][0])}
+        return candidates
+
+    def _rerank(self):
+        self._ranked = sorted(self._docs, key=self._counts.__getitem__, reverse=True)
+        self._changed = set()
+
+    def _rank(self, barcodes: Iterable[str], limit: int, status: Optional[str]) -> List[str]:
+        if status:
+            barcodes = [barcode for barcode in barcodes if self._matches(barcode, status)]
+        return heapq.nlargest(limit, barcodes, key=self._counts.__getitem__)
+
+    def _walk(self, contains: Callable[[str], bool], limit: int, status: Optional[str]) -> List[str]:
+        """Top ``limit`` matches of ``contains`` by walking the popularity order."""
+        if len(self._changed) > RERANK_AFTER:
+            self._rerank()
+        changed = self._changed
+        picked = []
+        for barcode in self._ranked:
+            if contains(barcode) and barcode not in changed and self._matches(barcode, status):
+                picked.append(barcode)
+                if len(picked) == limit:
+                    break
+        # Re-indexed barcodes are out of place in the order: rank them by their current count
+        picked.extend(
+            barcode for barcode in changed
+            if barcode in self._docs and contains(barcode) and self._matches(barcode, status)
+        )
+        return self._rank(picked, limit, None)
+
+    def _worth_walking(self, candidates: int, limit: int) -> bool:
+        # Comparing every candidate costs ``candidates``; walking the
+        # popularity order about limit * len(docs) / candidates
+        return candidates ** 2 > limit * len(self._docs)
+
+    def search(self, query: str, limit: int = 20, status: Optional[str] = None) -> List[str]:
+        """Barcodes of the barcode-prefix hits, then word-prefix hits, then fuzzy hits; each by scan count."""
+        query = query.strip()
+        if len(query) < MIN_QUERY_LENGTH:
+            return []
+        found: List[str] = []
+        seen: Set[str] = set()
+
+        def take(candidates: Set[str]):
+            if seen:
+                candidates = candidates - seen
+            wanted = limit - len(found)
+            if self._worth_walking(len(candidates), wanted):
+                hits = self._walk(candidates.__contains__, wanted, status)
+            else:
+                hits = self._rank(candidates, wanted, status)
+            found.extend(hits)
+            seen.update(hits)
+
+        if query.isdigit():
+            # Sorted barcodes: the prefix is a contiguous range, no set needed
+            start, end = self._prefix_bounds(self._barcodes, query)
+            if self._worth_walking(end - start, limit):
+                found.extend(self._walk(lambda barcode: barcode.startswith(query), limit, status))
+            else:
+                found.extend(self._rank(self._barcodes[start:end], limit, status))
+            seen.update(found)
+
+        terms = tokenize(query)
+        if terms and len(found) < limit:
+            prefixed = [set(self._prefix_range(self._tokens, term)) for term in terms]
+            take(self._match(prefixed))
+            if len(found) < limit:
+                # Typos: widen each term with similar tokens
+                fuzzy = [
+                    matches | self._fuzzy_tokens(term) if len(term) >= MIN_FUZZY_LENGTH else matches
+                    for term, matches in zip(terms, prefixed)
+                ]
+                take(self._match(fuzzy))
+
+        return found
@@ -0,0 +1,116 @@
+"""Diagnostic sensors for the scan pipeline."""
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Dict
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .stats import STAGE_CACHE_SAVE, STAGE_LOOKUP, STAGE_SCAN_TO_LIST
+
+# Values are read from memory, so polling is cheap
+SCAN_INTERVAL = timedelta(seconds=30)
+
+
+@dataclass(frozen=True, kw_only=True)
+class BeepBasketSensorDescription(SensorEntityDescription):
+    value_fn: Callable[[Dict[str, Any]], Any]
+
+
+def _p95(stage: str) -> Callable[[Dict[str, Any]], Any]:
+    return lambda data: data["pipeline_stats"].percentile(stage, 95)
+
+
+SENSORS = (
+    BeepBasketSensorDescription(
+        key="scan_to_list_p95",
+        name="Scan to list p95",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_p95(STAGE_SCAN_TO_LIST),
+    ),
+    BeepBasketSensorDescription(
+        key="lookup_p95",
+        name="Lookup p95",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_p95(STAGE_LOOKUP),
+    ),
+    BeepBasketSensorDescription(
+        key="cache_save_p95",
+        name="Cache save p95",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_p95(STAGE_CACHE_SAVE),
+    ),
+    BeepBasketSensorDescription(
+        key="cache_hit_ratio",
+        name="Cache hit ratio",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda data: data["pipeline_stats"].cache_hit_ratio,
+    ),
+    BeepBasketSensorDescription(
+        key="queue_depth",
+        name="Scan queue depth",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda data: data["scan_queue"].depth if "scan_queue" in data else None,
+    ),
+    BeepBasketSensorDescription(
+        key="api_timeouts",
+        name="Lookup timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda data: data["pipeline_stats"].counters["api_timeout"],
+    ),
+    BeepBasketSensorDescription(
+        key="cache_size",
+        name="Cache size on disk",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda data: data["pipeline_stats"].cache_save_bytes,
+    ),
+)
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback):
+    async_add_entities(BeepBasketSensor(hass, entry, description) for description in SENSORS)
+
+
+class BeepBasketSensor(SensorEntity):
+    """One pipeline metric, read from hass.data on every poll."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    entity_description: BeepBasketSensorDescription
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, description: BeepBasketSensorDescription):
+        self.hass = hass
+        self.entity_description = description
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name="BeepBasket",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    @property
+    def available(self) -> bool:
+        return "pipeline_stats" in self.hass.data.get(DOMAIN, {})
+
+    @property
+    def native_value(self):
+        return self.entity_description.value_fn(self.hass.data[DOMAIN])
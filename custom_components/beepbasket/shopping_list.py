@@ -0,0 +1,232 @@
+import logging
+from typing import Dict, Any, Iterable, List, Optional
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+
+_LOGGER = logging.getLogger(__name__)
+
+RESYNC_DELAY = 1.0
+TODO_DOMAIN = "todo"
+
+
+def normalize_summary(summary: str) -> str:
+    return (summary or "").lower().strip()
+
+
+class ShoppingListMirror:
+    """In-memory index of the active (needs_action) items of the todo list.
+
+    Seeded once with ``todo.get_items`` and then kept current by our own
+    add/rename/remove calls. When the todo entity is found, its item
+    updates (``TodoListEntity.async_subscribe_updates``) replace the index
+    on every change, including renames in another app. Otherwise the
+    entity's state, its count of active items, is checked against the index
+    and a full resync runs when the two disagree; a rename keeps the count,
+    so ``async_is_active`` resyncs before it reports an item as listed.
+    """
+
+    def __init__(self, hass: HomeAssistant, entity_id: str):
+        self.hass = hass
+        self.entity_id = entity_id
+        self._items: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_barcode: Dict[str, str] = {}
+        self._count = 0
+        self._unsub_state = None
+        self._unsub_resync = None
+        self._entity = None
+        self._unsub_items = None
+
+    async def async_start(self):
+        await self.async_resync()
+        self._unsub_state = async_track_state_change_event(
+            self.hass, [self.entity_id], self._async_state_changed
+        )
+        self._async_subscribe_items()
+
+    @callback
+    def async_stop(self):
+        if self._unsub_state:
+            self._unsub_state()
+            self._unsub_state = None
+        self._async_unsubscribe_items()
+        if self._unsub_resync:
+            self._unsub_resync()
+            self._unsub_resync = None
+
+    @callback
+    def _async_subscribe_items(self):
+        """Follow the todo entity's item updates if it is loaded (and changed)."""
+        component = self.hass.data.get(TODO_DOMAIN)
+        entity = component.get_entity(self.entity_id) if hasattr(component, "get_entity") else None
+        if entity is self._entity:
+            return
+        self._async_unsubscribe_items()
+        if entity is not None and hasattr(entity, "async_subscribe_updates"):
+            self._entity = entity
+            self._unsub_items = entity.async_subscribe_updates(self._async_items_updated)
+            _LOGGER.debug("Following item updates of %s", self.entity_id)
+
+    @callback
+    def _async_unsubscribe_items(self):
+        if self._unsub_items:
+            self._unsub_items()
+        self._unsub_items = None
+        self._entity = None
+
+    @callback
+    def _async_items_updated(self, items: Optional[List[Dict[str, Any]]]):
+        if items is not None:
+            self._apply_items(items)
+
+    async def async_resync(self):
+        """Rebuild the index from a full ``todo.get_items``."""
+        response = await self.hass.services.async_call(
+            "todo", "get_items",
+            {"entity_id": self.entity_id, "status": "needs_action"},
+            return_response=True, blocking=True
+        )
+        self._apply_items((response or {}).get(self.entity_id, {}).get("items", []))
+        _LOGGER.debug("🔃 Shopping list mirror synced: %d active items", self._count)
+
+    @callback
+    def _apply_items(self, todo_items: Iterable[Any]):
+        """Replace the index with the active ones of ``todo_items``."""
+        items: Dict[str, List[Dict[str, Any]]] = {}
+        count = 0
+        for item in todo_items:
+            if not isinstance(item, dict) or item.get("status", "needs_action") != "needs_action":
+                continue
+            summary = item.get("summary", "")
+            items.setdefault(normalize_summary(summary), []).append(
+                {"summary": summary, "uid": item.get("uid")}
+            )
+            count += 1
+        self._items = items
+        self._count = count
+        self._by_barcode = {
+            barcode: key for barcode, key in self._by_barcode.items() if key in items
+        }
+
+    @callback
+    def _async_state_changed(self, event):
+        new_state = event.data.get("new_state")
+        if new_state is None:
+            # Entity removed (reload): its item updates stop
+            self._async_unsubscribe_items()
+            return
+        entity = self._entity
+        self._async_subscribe_items()
+        if self._entity is not None:
+            if self._entity is not entity:
+                # Changes before the subscription are not in the index
+                self.async_schedule_resync()
+            # Item updates keep the index exact
+            return
+        try:
+            count = int(new_state.state)
+        except (TypeError, ValueError):
+            return
+        if count != self._count:
+            _LOGGER.debug("Shopping list drift (%d listed, %d mirrored)", count, self._count)
+            self.async_schedule_resync()
+
+    @callback
+    def async_schedule_resync(self):
+        if self._unsub_resync is None:
+            self._unsub_resync = async_call_later(self.hass, RESYNC_DELAY, self._async_resync_later)
+
+    @callback
+    def _async_resync_later(self, _now):
+        self._unsub_resync = None
+        self.hass.async_create_task(self._async_safe_resync())
+
+    async def _async_safe_resync(self):
+        try:
+            await self.async_resync()
+        except Exception as e:
+            _LOGGER.warning("Shopping list resync failed: %s", e)
+
+    def is_active(self, summary: str) -> bool:
+        return normalize_summary(summary) in self._items
+
+    async def async_is_active(self, summary: str) -> bool:
+        """``is_active``, confirmed with a resync unless item updates keep the index exact."""
+        if not self.is_active(summary):
+            return False
+        if self._unsub_items is None:
+            # Renamed or replaced in another app without changing the count
+            await self.async_resync()
+        return self.is_active(summary)
+
+    def items_for(self, barcode: str, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Active items that show ``name`` or ``barcode`` (or were added for it)."""
+        keys = {normalize_summary(barcode)}
+        if name:
+            keys.add(normalize_summary(name))
+        tracked = self._by_barcode.get(barcode)
+        if tracked:
+            keys.add(tracked)
+        return [item for key in keys for item in self._items.get(key, [])]
+
+    @callback
+    def _index(self, summary: str, barcode: Optional[str] = None, uid: Optional[str] = None):
+        key = normalize_summary(summary)
+        self._items.setdefault(key, []).append({"summary": summary, "uid": uid})
+        self._count += 1
+        if barcode:
+            self._by_barcode[barcode] = key
+
+    @callback
+    def _unindex(self, item: Dict[str, Any]):
+        key = normalize_summary(item["summary"])
+        bucket = self._items.get(key)
+        if not bucket or item not in bucket:
+            return
+        bucket.remove(item)
+        self._count -= 1
+        if not bucket:
+            del self._items[key]
+
+    async def async_add(self, summary: str, barcode: Optional[str] = None):
+        # Index first so the state change caused by this call already matches
+        self._index(summary, barcode)
+        try:
+            await self.hass.services.async_call(
+                "todo", "add_item", {"entity_id": self.entity_id, "item": summary}, blocking=True
+            )
+        except Exception:
+            self.async_schedule_resync()
+            raise
+
+    async def async_rename(self, item: Dict[str, Any], name: str, barcode: Optional[str] = None):
+        self._unindex(item)
+        self._index(name, barcode, item.get("uid"))
+        try:
+            await self.hass.services.async_call(
+                "todo", "update_item",
+                {"entity_id": self.entity_id, "item": item.get("uid") or item["summary"], "rename": name},
+                blocking=True
+            )
+        except Exception:
+            self.async_schedule_resync()
+            raise
+
+    async def async_remove(self, item: Dict[str, Any]):
+        self._unindex(item)
+        try:
+            await self.hass.services.async_call(
+                "todo", "remove_item",
+                {"entity_id": self.entity_id, "item": item.get("uid") or item["summary"]},
+                blocking=True
+            )
+        except Exception:
+            self.async_schedule_resync()
+            raise
+
+    def find(self, summary: str) -> Optional[Dict[str, Any]]:
+        bucket = self._items.get(normalize_summary(summary))
+        return bucket[0] if bucket else None
+
+    @property
+    def active_count(self) -> int:
+        return self._count
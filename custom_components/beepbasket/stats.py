@@ -0,0 +1,103 @@
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional
+
+# Samples kept per stage for the rolling percentiles
+HISTOGRAM_SIZE = 1000
+# Per-scan trace records kept when tracing is enabled
+TRACE_SIZE = 200
+
+# Pipeline stages, in scan order
+STAGE_QUEUE_WAIT = "queue_wait"
+STAGE_CACHE_GET = "cache_get"
+STAGE_LOOKUP = "lookup"
+STAGE_TODO_ADD = "todo_add"
+STAGE_SCAN_TO_LIST = "scan_to_list"
+STAGE_CACHE_SAVE = "cache_save"
+
+
+class RollingHistogram:
+    """The last HISTOGRAM_SIZE durations of one stage, in milliseconds."""
+
+    def __init__(self):
+        self._samples: Deque[float] = deque(maxlen=HISTOGRAM_SIZE)
+        self.count = 0
+
+    def add(self, ms: float):
+        self._samples.append(ms)
+        self.count += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return round(ordered[index], 2)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": round(max(self._samples), 2) if self._samples else None,
+        }
+
+
+class PipelineStats:
+    """Per-stage latency histograms, counters and optional scan traces."""
+
+    def __init__(self, trace: bool = False):
+        self.stages: Dict[str, RollingHistogram] = {}
+        self.counters: Counter = Counter()
+        self.traces: Optional[Deque[Dict[str, Any]]] = deque(maxlen=TRACE_SIZE) if trace else None
+        self.cache_save_bytes: Optional[int] = None
+
+    def record(self, stage: str, seconds: float, trace: Optional[Dict[str, Any]] = None):
+        ms = seconds * 1000
+        self.stages.setdefault(stage, RollingHistogram()).add(ms)
+        if trace is not None:
+            trace["stages"][stage] = round(ms, 2)
+
+    @contextmanager
+    def timer(self, stage: str, trace: Optional[Dict[str, Any]] = None):
+        """Time a block, including awaits inside it."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started, trace)
+
+    def increment(self, counter: str, amount: int = 1):
+        self.counters[counter] += amount
+
+    def start_trace(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """A trace record for one scan, or None when tracing is off."""
+        if self.traces is None:
+            return None
+        trace = {"barcode": barcode, "at": datetime.now().isoformat(), "stages": {}}
+        self.traces.append(trace)
+        return trace
+
+    def percentile(self, stage: str, pct: float) -> Optional[float]:
+        histogram = self.stages.get(stage)
+        return histogram.percentile(pct) if histogram else None
+
+    @property
+    def cache_hit_ratio(self) -> Optional[float]:
+        hits = self.counters["cache_hit"] + self.counters["negative_cache_hit"]
+        total = hits + self.counters["cache_miss"]
+        return round(100 * hits / total, 1) if total else None
+
+    def as_dict(self, include_traces: bool = False) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "stages": {stage: histogram.as_dict() for stage, histogram in self.stages.items()},
+            "counters": dict(self.counters),
+            "cache_hit_ratio": self.cache_hit_ratio,
+            "cache_save_bytes": self.cache_save_bytes,
+        }
+        if include_traces:
+            data["traces"] = list(self.traces or [])
+        return data
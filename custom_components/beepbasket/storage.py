@@ -0,0 +1,573 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import aiofiles
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import STORAGE_JSON, STORAGE_SQLITE
+from .stats import STAGE_CACHE_SAVE, PipelineStats
+
+_LOGGER = logging.getLogger(__name__)
+
+# Write-behind tuning: changes are coalesced per barcode and written after
+# FLUSH_DELAY seconds. The JSON journal is folded into the snapshot once it
+# holds more records than the cache itself (amortised O(1) per write).
+FLUSH_DELAY = 2.0
+COMPACT_MIN_RECORDS = 1000
+
+Entries = Dict[str, Dict[str, Any]]
+
+# Layout of the stored entries; BarcodeCache migrates stores below it on load.
+# 1: every entry under its canonical barcode (normalize_barcode)
+SCHEMA_VERSION = 1
+
+# Status filters understood by queries and the mappings API
+STATUS_FILTERS = ("complete", "unknown", "ready_to_contribute")
+
+
+# Columns async_query may order by (always descending)
+ORDER_COLUMNS = ("scanned_count", "last_updated")
+
+
+def order_value(entry: Dict[str, Any], order_by: str) -> Any:
+    """The value SqliteStore keeps in the ``order_by`` column for ``entry``."""
+    if order_by == "scanned_count":
+        return int(entry.get("scanned_count") or 0)
+    return entry.get("last_updated") or entry.get("first_seen")
+
+
+def matches_status(entry: Dict[str, Any], status: Optional[str]) -> bool:
+    if not status:
+        return True
+    if status == "ready_to_contribute":
+        return bool(entry.get("ready_to_contribute"))
+    return entry.get("status") == status
+
+
+class CacheStore(ABC):
+    """Persistence behind BarcodeCache.
+
+    ``async_mark`` records the latest state of one barcode (None = removed);
+    stores coalesce those and write them in the background. Every store
+    answers reads (``async_get``, ``async_query``, ``async_page``); stores
+    that ``supports_eviction`` answer them from disk, so the cache does not
+    have to keep all entries in memory.
+    """
+
+    supports_eviction = False
+    # Status filters and ordering run on database indexes
+    indexed = False
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._unsub_flush = None
+        self.pipeline_stats: Optional[PipelineStats] = None
+        # SCHEMA_VERSION the stored data has, known after async_load
+        self.schema_version = 0
+
+    @abstractmethod
+    async def async_load(self, limit: int = 0) -> Entries:
+        """Open the store and return the entries to keep in memory.
+
+        Stores that ``supports_eviction`` return at most ``limit`` (0 = all),
+        the most recently updated; the others return everything.
+        """
+
+    @abstractmethod
+    async def async_count(self) -> int:
+        """Number of stored entries, including changes not written yet."""
+
+    @abstractmethod
+    async def async_scan(self, consumer: Callable[[Iterable[Tuple[str, Dict[str, Any]]]], Any]) -> Any:
+        """Run ``consumer`` over every stored (barcode, entry) off the event loop (flush first)."""
+
+    @abstractmethod
+    async def async_set_schema_version(self, version: int):
+        """Record that the stored data has been migrated to ``version``."""
+
+    @abstractmethod
+    def _paths(self) -> List[str]:
+        """Files holding this store's data."""
+
+    def size_bytes(self) -> int:
+        """Executor: bytes on disk."""
+        return sum(os.path.getsize(path) for path in self._paths() if os.path.exists(path))
+
+    async def async_write_many(self, entries: Entries):
+        """Bulk write (migration); entries are persisted before returning."""
+        for barcode, entry in entries.items():
+            self._pending[barcode] = dict(entry)
+        await self.async_flush()
+
+    @abstractmethod
+    async def async_retire(self):
+        """Move this store's files aside after migrating away from it."""
+
+    @abstractmethod
+    async def async_query(self, status: Optional[str] = None, order_by: Optional[str] = None,
+                          limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """(barcode, entry) rows matching ``status``, newest/most scanned first by ``order_by``."""
+
+    @abstractmethod
+    async def async_get(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """One entry, including changes not written yet."""
+
+    @abstractmethod
+    async def async_get_many(self, barcodes: List[str]) -> Entries:
+        """The stored entries among ``barcodes`` (missing ones are left out)."""
+
+    @abstractmethod
+    async def async_page(self, cursor: Optional[str], limit: int,
+                         status: Optional[str] = None) -> Tuple[Entries, Optional[str]]:
+        """Entries in barcode order after ``cursor`` (flush first); returns (entries, next_cursor)."""
+
+    @callback
+    def async_mark(self, barcode: str, entry: Optional[Dict[str, Any]]):
+        self._pending[barcode] = dict(entry) if entry is not None else None
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(self.hass, FLUSH_DELAY, self._scheduled_flush)
+
+    @callback
+    def _scheduled_flush(self, _now):
+        self._unsub_flush = None
+        self.hass.async_create_task(self.async_flush())
+
+    async def async_flush(self):
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            started = time.perf_counter()
+            await self._async_write(pending)
+            if self.pipeline_stats and pending:
+                self.pipeline_stats.record(STAGE_CACHE_SAVE, time.perf_counter() - started)
+                self.pipeline_stats.cache_save_bytes = await self.hass.async_add_executor_job(self.size_bytes)
+
+    @abstractmethod
+    async def _async_write(self, pending: Dict[str, Optional[Dict[str, Any]]]):
+        """Persist coalesced changes (None = removed)."""
+
+    async def async_close(self):
+        await self.async_flush()
+
+
+class JsonJournalStore(CacheStore):
+    """JSON snapshot (``barcode_cache.json``) plus an append-only journal.
+
+    Each line of ``barcode_cache.journal`` holds the full entry for one
+    barcode (or ``null`` when removed), so replaying it on top of the
+    snapshot is idempotent. Compaction snapshots the live cache dict.
+    """
+
+    def __init__(self, hass: HomeAssistant, cache_path: str, entries: Callable[[], Entries]):
+        super().__init__(hass)
+        self._cache_path = cache_path
+        self._journal_path = os.path.splitext(cache_path)[0] + ".journal"
+        self._meta_path = os.path.splitext(cache_path)[0] + ".meta.json"
+        self._entries = entries
+        self._journal_records = 0
+
+    def _paths(self) -> List[str]:
+        return [self._cache_path, self._journal_path, self._meta_path]
+
+    async def async_load(self, limit: int = 0) -> Entries:
+        """Load snapshot, then replay the journal on top of it (always everything)."""
+        self.schema_version = await self.hass.async_add_executor_job(self._read_schema_version)
+        try:
+            async with aiofiles.open(self._cache_path, 'r', encoding='utf-8') as f:
+                content = await f.read()
+                cache = json.loads(content) if content.strip() else {}
+            _LOGGER.info("📂 Loaded %d structured cache entries", len(cache))
+        except FileNotFoundError:
+            _LOGGER.info("📂 New cache file created")
+            cache = {}
+        except json.JSONDecodeError as e:
+            corrupt_path = f"{self._cache_path}.corrupt-{datetime.now():%Y%m%d%H%M%S}"
+            _LOGGER.error("❌ Cache JSON corrupt: %s (moved to %s)", e, corrupt_path)
+            await self.hass.async_add_executor_job(os.replace, self._cache_path, corrupt_path)
+            cache = {}
+
+        replayed, damaged = await self._replay_journal(cache)
+        if replayed:
+            _LOGGER.info("📜 Replayed %d journal records", replayed)
+        if damaged:
+            # Fold what survived into a fresh snapshot so later appends never
+            # land after a torn line.
+            _LOGGER.warning("⚠️ Skipped %d damaged journal records", damaged)
+            await self._compact(cache)
+        return cache
+
+    def _read_schema_version(self) -> int:
+        """Executor: version from ``barcode_cache.meta.json`` (0 before it existed)."""
+        try:
+            with open(self._meta_path, encoding='utf-8') as f:
+                return int(json.load(f).get("schema_version", 0))
+        except FileNotFoundError:
+            return 0
+        except (ValueError, AttributeError) as e:
+            _LOGGER.warning("⚠️ Unreadable %s (%s), migrating again", self._meta_path, e)
+            return 0
+
+    async def async_set_schema_version(self, version: int):
+        def _write():
+            tmp_path = f"{self._meta_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"schema_version": version}, f)
+            os.replace(tmp_path, self._meta_path)
+
+        await self.hass.async_add_executor_job(_write)
+        self.schema_version = version
+
+    async def _replay_journal(self, cache: Entries) -> Tuple[int, int]:
+        """Apply journal records; a torn trailing line from a crash is skipped."""
+        self._journal_records = 0
+        damaged = 0
+        try:
+            async with aiofiles.open(self._journal_path, 'r', encoding='utf-8') as f:
+                async for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                        barcode = record["b"]
+                        entry = record["e"]
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        damaged += 1
+                        continue
+                    if entry is None:
+                        cache.pop(barcode, None)
+                    else:
+                        cache[barcode] = entry
+                    self._journal_records += 1
+        except FileNotFoundError:
+            pass
+        return self._journal_records, damaged
+
+    async def _async_write(self, pending: Dict[str, Optional[Dict[str, Any]]]):
+        """Append coalesced changes to the journal, compacting when it grows."""
+        if pending:
+            lines = "".join(
+                json.dumps({"b": barcode, "e": entry}, ensure_ascii=False, separators=(",", ":")) + "\n"
+                for barcode, entry in pending.items()
+            )
+            async with aiofiles.open(self._journal_path, 'a', encoding='utf-8') as f:
+                await f.write(lines)
+                await f.flush()
+            self._journal_records += len(pending)
+
+        cache = self._entries()
+        if self._journal_records > max(COMPACT_MIN_RECORDS, len(cache)):
+            await self._compact(cache)
+
+    async def _compact(self, cache: Entries):
+        """Atomically rewrite the snapshot and truncate the journal.
+
+        Only the item list is taken on the event loop; entries are copied in
+        the executor. An entry changed meanwhile is already marked, so its
+        journal line (written after this) wins on replay.
+        """
+        items = list(cache.items())
+        await self.hass.async_add_executor_job(self._write_snapshot, items)
+        self._journal_records = 0
+        _LOGGER.debug("🗜️ Compacted cache snapshot (%d entries)", len(items))
+
+    def _write_snapshot(self, items: List[Tuple[str, Dict[str, Any]]]):
+        """Executor: temp file + fsync + rename, then drop the folded journal."""
+        # as_dict reads each field once, so a concurrent change cannot break it
+        snapshot = {
+            barcode: entry.as_dict() if hasattr(entry, "as_dict") else dict(entry)
+            for barcode, entry in items
+        }
+        tmp_path = f"{self._cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._cache_path)
+        with open(self._journal_path, 'w', encoding='utf-8'):
+            pass
+
+    async def async_write_many(self, entries: Entries):
+        # The live dict already holds ``entries``; a snapshot covers them all
+        async with self._flush_lock:
+            await self._compact(self._entries())
+
+    async def async_retire(self):
+        def _retire():
+            for path in self._paths():
+                if os.path.exists(path):
+                    os.replace(path, f"{path}.migrated")
+
+        await self.hass.async_add_executor_job(_retire)
+
+    async def async_query(self, status=None, order_by=None, limit=None):
+        if order_by and order_by not in ORDER_COLUMNS:
+            raise ValueError(f"Cannot order by {order_by}")
+        rows = [
+            (barcode, entry) for barcode, entry in self._entries().items()
+            if matches_status(entry, status)
+        ]
+        if order_by:
+            # Same values and NULLs-last order as SqliteStore's DESC
+            def key(row):
+                value = order_value(row[1], order_by)
+                return value is not None, value
+
+            rows.sort(key=key, reverse=True)
+        return rows[:limit] if limit else rows
+
+    async def async_count(self) -> int:
+        return len(self._entries())
+
+    async def async_scan(self, consumer):
+        return await self.hass.async_add_executor_job(consumer, list(self._entries().items()))
+
+    async def async_get(self, barcode: str) -> Optional[Dict[str, Any]]:
+        # Every entry stays in the live dict
+        entry = self._entries().get(barcode)
+        return dict(entry) if entry is not None else None
+
+    async def async_get_many(self, barcodes: List[str]) -> Entries:
+        entries = self._entries()
+        return {barcode: dict(entries[barcode]) for barcode in barcodes if barcode in entries}
+
+    async def async_page(self, cursor=None, limit=500, status=None):
+        barcodes = sorted(
+            barcode for barcode, entry in self._entries().items()
+            if (not cursor or barcode > cursor) and matches_status(entry, status)
+        )
+        entries = {barcode: dict(self._entries()[barcode]) for barcode in barcodes[:limit]}
+        return entries, barcodes[limit - 1] if len(barcodes) > limit else None
+
+    async def async_close(self):
+        """Flush everything and leave a compacted snapshot behind."""
+        await self.async_flush()
+        async with self._flush_lock:
+            if self._journal_records:
+                await self._compact(self._entries())
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    barcode TEXT PRIMARY KEY,
+    status TEXT,
+    ready_to_contribute INTEGER NOT NULL DEFAULT 0,
+    scanned_count INTEGER NOT NULL DEFAULT 0,
+    last_updated TEXT,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_status ON entries (status);
+CREATE INDEX IF NOT EXISTS entries_ready ON entries (ready_to_contribute) WHERE ready_to_contribute;
+CREATE INDEX IF NOT EXISTS entries_scanned_count ON entries (scanned_count);
+CREATE INDEX IF NOT EXISTS entries_last_updated ON entries (last_updated);
+"""
+
+SQLITE_UPSERT = """
+INSERT OR REPLACE INTO entries (barcode, status, ready_to_contribute, scanned_count, last_updated, data)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+def _sqlite_status_filter(status: Optional[str]) -> Tuple[List[str], List[Any]]:
+    """WHERE conditions and parameters for a STATUS_FILTERS value."""
+    if status == "ready_to_contribute":
+        return ["ready_to_contribute"], []
+    if status:
+        return ["status = ?"], [status]
+    return [], []
+
+
+class SqliteStore(CacheStore):
+    """SQLite database (``barcode_cache.db``) in WAL mode.
+
+    All statements run on one dedicated thread that owns the connection.
+    Hot fields are real columns with indexes; the full entry is kept as JSON.
+    """
+
+    supports_eviction = True
+    indexed = True
+
+    def __init__(self, hass: HomeAssistant, db_path: str):
+        super().__init__(hass)
+        self._db_path = db_path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="beepbasket_cache")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _paths(self) -> List[str]:
+        return [self._db_path + suffix for suffix in ("", "-wal", "-shm")]
+
+    async def _run(self, func: Callable, *args):
+        return await self.hass.loop.run_in_executor(self._executor, func, *args)
+
+    async def async_load(self, limit: int = 0) -> Entries:
+        def _load():
+            self._conn = sqlite3.connect(self._db_path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SQLITE_SCHEMA)
+            self.schema_version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            sql, params = "SELECT barcode, data FROM entries", ()
+            if limit and self.schema_version >= SCHEMA_VERSION:
+                # Migrations need every entry; otherwise only the most recently updated
+                sql, params = sql + " ORDER BY last_updated DESC LIMIT ?", (limit,)
+            return {barcode: json.loads(data) for barcode, data in self._conn.execute(sql, params)}
+
+        cache = await self._run(_load)
+        _LOGGER.info("📂 Loaded %d cache entries from %s", len(cache), self._db_path)
+        return cache
+
+    async def async_count(self) -> int:
+        await self.async_flush()
+        return await self._run(lambda: self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0])
+
+    async def async_scan(self, consumer):
+        def _scan():
+            # Streamed from the cursor: one row in memory at a time
+            rows = self._conn.execute("SELECT barcode, data FROM entries")
+            return consumer((barcode, json.loads(data)) for barcode, data in rows)
+
+        return await self._run(_scan)
+
+    async def async_set_schema_version(self, version: int):
+        def _set():
+            # PRAGMA takes no parameters; version is an int
+            self._conn.execute(f"PRAGMA user_version = {int(version)}")
+
+        await self._run(_set)
+        self.schema_version = version
+
+    async def _async_write(self, pending: Dict[str, Optional[Dict[str, Any]]]):
+        if not pending:
+            return
+        upserts = [
+            (barcode, entry.get("status"), int(bool(entry.get("ready_to_contribute"))),
+             order_value(entry, "scanned_count"), order_value(entry, "last_updated"),
+             json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+            for barcode, entry in pending.items() if entry is not None
+        ]
+        deletes = [(barcode,) for barcode, entry in pending.items() if entry is None]
+
+        def _write():
+            with self._conn:
+                self._conn.executemany(SQLITE_UPSERT, upserts)
+                self._conn.executemany("DELETE FROM entries WHERE barcode = ?", deletes)
+
+        await self._run(_write)
+
+    async def async_query(self, status=None, order_by=None, limit=None):
+        if order_by and order_by not in ORDER_COLUMNS:
+            raise ValueError(f"Cannot order by {order_by}")
+        sql = "SELECT barcode, data FROM entries"
+        conditions, params = _sqlite_status_filter(status)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if order_by:
+            sql += f" ORDER BY {order_by} DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        def _query():
+            return [(barcode, json.loads(data)) for barcode, data in self._conn.execute(sql, params)]
+
+        return await self._run(_query)
+
+    async def async_get(self, barcode: str) -> Optional[Dict[str, Any]]:
+        if barcode in self._pending:
+            entry = self._pending[barcode]
+            return dict(entry) if entry is not None else None
+
+        def _get():
+            row = self._conn.execute("SELECT data FROM entries WHERE barcode = ?", (barcode,)).fetchone()
+            return json.loads(row[0]) if row else None
+
+        return await self._run(_get)
+
+    async def async_get_many(self, barcodes: List[str]) -> Entries:
+        found: Entries = {}
+        to_read = []
+        for barcode in barcodes:
+            if barcode not in self._pending:
+                to_read.append(barcode)
+            elif self._pending[barcode] is not None:
+                found[barcode] = dict(self._pending[barcode])
+
+        def _get_many():
+            rows = []
+            # Stay below SQLite's limit of 999 parameters per statement
+            for start in range(0, len(to_read), 500):
+                chunk = to_read[start:start + 500]
+                sql = f"SELECT barcode, data FROM entries WHERE barcode IN ({', '.join('?' * len(chunk))})"
+                rows.extend(self._conn.execute(sql, chunk))
+            return {barcode: json.loads(data) for barcode, data in rows}
+
+        if to_read:
+            found.update(await self._run(_get_many))
+        return found
+
+    async def async_page(self, cursor=None, limit=500, status=None):
+        conditions, params = _sqlite_status_filter(status)
+        if cursor:
+            conditions.append("barcode > ?")
+            params.append(cursor)
+        sql = "SELECT barcode, data FROM entries"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY barcode LIMIT ?"
+        # One extra row tells whether there is a next page
+        params.append(limit + 1)
+
+        def _page():
+            return [(barcode, json.loads(data)) for barcode, data in self._conn.execute(sql, params)]
+
+        rows = await self._run(_page)
+        entries = dict(rows[:limit])
+        return entries, rows[limit - 1][0] if len(rows) > limit else None
+
+    async def async_retire(self):
+        await self.async_close()
+
+        def _retire():
+            for path in self._paths():
+                if os.path.exists(path):
+                    os.replace(path, f"{path}.migrated")
+
+        await self.hass.async_add_executor_job(_retire)
+
+    async def async_close(self):
+        await self.async_flush()
+
+        def _close():
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+        await self._run(_close)
+        self._executor.shutdown(wait=False)
+
+
+def create_stores(hass: HomeAssistant, backend: str, cache_path: str,
+                  entries: Callable[[], Entries]) -> Tuple[CacheStore, CacheStore]:
+    """Return (selected store, the other backend's store to migrate from)."""
+    json_store = JsonJournalStore(hass, cache_path, entries)
+    sqlite_store = SqliteStore(hass, os.path.splitext(cache_path)[0] + ".db")
+    if backend == STORAGE_SQLITE:
+        return sqlite_store, json_store
+    return json_store, sqlite_store
+
+
+async def async_other_store_exists(hass: HomeAssistant, backend: str, cache_path: str) -> bool:
+    """Whether the non-selected backend left data behind."""
+    base = os.path.splitext(cache_path)[0]
+    paths = [base + ".db"] if backend == STORAGE_JSON else [cache_path, base + ".journal"]
+    return any(await asyncio.gather(*(hass.async_add_executor_job(os.path.exists, p) for p in paths)))
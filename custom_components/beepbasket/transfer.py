@@ -0,0 +1,205 @@
+import json
+import logging
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple
+from aiohttp import StreamReader, web
+
+from .barcode import normalize_barcode
+from .cache import BarcodeCache
+
+_LOGGER = logging.getLogger(__name__)
+
+# Entries read from the cache per written chunk
+EXPORT_PAGE_SIZE = 1000
+# Imported entries merged into the cache per store write
+IMPORT_BATCH_SIZE = 500
+IMPORT_CHUNK_SIZE = 64 * 1024
+MAX_LINE_BYTES = 1024 * 1024
+MAX_REPORTED_ERRORS = 20
+
+GZIP_MAGIC = b"\x1f\x8b"
+IMPORT_STATUSES = ("complete", "unknown")
+
+# JSON types of the entry fields; anything else would break ranking or storage
+TEXT_FIELDS = ("name", "source", "brands", "categories", "quantity", "stores")
+COUNT_FIELDS = ("scanned_count", "miss_count")
+FLAG_FIELDS = ("local_override", "ready_to_contribute")
+TIMESTAMP_FIELDS = ("first_seen", "last_updated", "last_scanned", "last_checked", "retry_after")
+
+
+def export_line(barcode: str, entry: Mapping[str, Any]) -> bytes:
+    return (json.dumps({"barcode": barcode, **entry}, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+
+
+def _check_fields(data: Dict[str, Any]):
+    """Raise ValueError for an entry field of the wrong type."""
+    for key in TEXT_FIELDS:
+        if data.get(key) is not None and not isinstance(data[key], str):
+            raise ValueError(f"{key} must be a string")
+    for key in COUNT_FIELDS:
+        value = data.get(key)
+        if value is not None and (type(value) is not int or value < 0):
+            raise ValueError(f"{key} must be a non-negative integer")
+    for key in FLAG_FIELDS:
+        if data.get(key) is not None and not isinstance(data[key], bool):
+            raise ValueError(f"{key} must be true or false")
+    for key in TIMESTAMP_FIELDS:
+        value = data.get(key)
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            raise ValueError(f"{key} must be an ISO timestamp")
+        datetime.fromisoformat(value)  # ValueError names the bad value
+
+
+def parse_line(line: bytes) -> Tuple[str, Dict[str, Any]]:
+    """(barcode, entry) from one exported line; ValueError says what is wrong with it."""
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("not a JSON object")
+    raw = data.pop("barcode", None)
+    if not isinstance(raw, str):
+        raise ValueError("barcode must be a string")
+    raw = raw.strip()
+    barcode = normalize_barcode(raw)
+    if barcode is None:
+        raise ValueError(f"invalid barcode {raw!r}")
+    if data.get("status") not in IMPORT_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(IMPORT_STATUSES)}")
+    if not isinstance(data.get("name"), str):
+        raise ValueError("missing name")
+    _check_fields(data)
+    if data["name"] == raw:
+        # Unknown products are named after their barcode
+        data["name"] = barcode
+    return barcode, data
+
+
+async def async_stream_export(request: web.Request, cache: BarcodeCache, status: Optional[str],
+                              compress: bool) -> web.StreamResponse:
+    """Write the cache as NDJSON, one page at a time, gzipped if ``compress``."""
+    filename = "beepbasket_cache.ndjson.gz" if compress else "beepbasket_cache.ndjson"
+    response = web.StreamResponse(headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    response.content_type = "application/gzip" if compress else "application/x-ndjson"
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+
+    # The gzip container, so the file can be saved and imported as is
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    cursor = None
+    exported = 0
+    while True:
+        entries, cursor = await cache.async_page(cursor, EXPORT_PAGE_SIZE, status)
+        data = b"".join(export_line(barcode, entry) for barcode, entry in entries.items())
+        exported += len(entries)
+        if compressor:
+            data = compressor.compress(data)
+        if data:
+            await response.write(data)
+        if cursor is None:
+            break
+    if compressor:
+        await response.write(compressor.flush())
+    await response.write_eof()
+    _LOGGER.info("📤 Exported %d cache entries", exported)
+    return response
+
+
+async def _iter_plain(content: StreamReader) -> AsyncIterator[bytes]:
+    """The request body, gunzipped if it is a gzip file (aiohttp already handles Content-Encoding)."""
+    chunks = content.iter_chunked(IMPORT_CHUNK_SIZE)
+    head = b""
+    async for chunk in chunks:
+        head += chunk
+        if len(head) >= len(GZIP_MAGIC):
+            break
+    if not head.startswith(GZIP_MAGIC):
+        yield head
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    data = head
+    while True:
+        while data:
+            # Bounded output per step, however well the input compresses
+            yield decompressor.decompress(data, IMPORT_CHUNK_SIZE)
+            data = decompressor.unconsumed_tail
+        try:
+            data = await chunks.__anext__()
+        except StopAsyncIteration:
+            break
+    if not decompressor.eof:
+        raise ValueError("gzip data is truncated")
+    yield decompressor.flush()
+
+
+async def _iter_lines(content: StreamReader) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for data in _iter_plain(content):
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ValueError(f"line longer than {MAX_LINE_BYTES} bytes")
+    if buffer:
+        yield buffer
+
+
+async def async_import_ndjson(cache: BarcodeCache, content: StreamReader) -> Dict[str, Any]:
+    """Merge an NDJSON export into the cache while it is being received.
+
+    Lines are parsed as they arrive and merged ``IMPORT_BATCH_SIZE`` at a
+    time (see ``BarcodeCache.async_import``), so memory stays flat however
+    large the upload is. Invalid lines are counted and skipped; a broken
+    stream stops the import after merging what was read.
+    """
+    batch: Dict[str, Dict[str, Any]] = {}
+    received = imported = invalid = 0
+    errors: List[str] = []
+    result: Dict[str, Any] = {}
+
+    async def merge():
+        nonlocal batch, imported
+        imported += await cache.async_import(batch)
+        batch = {}
+
+    line_number = 0
+    try:
+        async for line in _iter_lines(content):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                barcode, entry = parse_line(line)
+            except ValueError as err:
+                invalid += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(f"line {line_number}: {err}")
+                continue
+            received += 1
+            if barcode in batch:
+                # Two spellings of one barcode: let the merge rules pick
+                await merge()
+            batch[barcode] = entry
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await merge()
+    except (ValueError, zlib.error) as err:
+        result["error"] = f"Import stopped after line {line_number}: {err}"
+        _LOGGER.warning("⚠️ %s", result["error"])
+    if batch:
+        await merge()
+
+    _LOGGER.info("📥 Imported %d of %d cache entries (%d invalid lines)", imported, received, invalid)
+    result.update({
+        "received": received,
+        "imported": imported,
+        "unchanged": received - imported,
+        "invalid": invalid,
+        "errors": errors,
+        "version": cache.version,
+    })
+    return result
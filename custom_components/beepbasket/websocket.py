@@ -0,0 +1,143 @@
+import logging
+from collections import deque
+from typing import Dict, Any, Optional
+import voluptuous as vol
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, SIGNAL_CACHE_UPDATED, SIGNAL_SCAN
+
+_LOGGER = logging.getLogger(__name__)
+
+# Per-connection batching: updates within BATCH_DELAY seconds go out as one
+# message. Past MAX_PENDING_ENTRIES unsent entries the batch is dropped and
+# the client is told to resync through /api/beepbasket/mappings?since=.
+BATCH_DELAY = 0.25
+MAX_PENDING_ENTRIES = 1000
+MAX_PENDING_SCANS = 100
+
+
+@callback
+def async_register_websocket(hass: HomeAssistant):
+    websocket_api.async_register_command(hass, ws_subscribe)
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): "beepbasket/subscribe",
+    vol.Optional("since"): int,
+})
+@websocket_api.async_response
+async def ws_subscribe(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: Dict[str, Any]):
+    """Push changed cache entries, scan results and pipeline status."""
+    data = hass.data.get(DOMAIN, {})
+    ready = data.get("ready")
+    if data.get("startup_error"):
+        connection.send_error(msg["id"], "not_ready", f"BeepBasket failed to start: {data['startup_error']}")
+        return
+    if ready is None or not ready.is_set():
+        connection.send_error(msg["id"], "not_ready", "BeepBasket is not loaded yet")
+        return
+
+    subscription = _Subscription(hass, connection, msg["id"])
+    connection.subscriptions[msg["id"]] = subscription.async_unsubscribe
+    connection.send_result(msg["id"])
+    await subscription.async_start(msg.get("since"))
+
+
+class _Subscription:
+    """One card's subscription, with coalesced and batched updates."""
+
+    def __init__(self, hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg_id: int):
+        self.hass = hass
+        self._connection = connection
+        self._msg_id = msg_id
+        self._entries: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._scans: deque = deque(maxlen=MAX_PENDING_SCANS)
+        self._overflowed = False
+        self._unsubs = []
+        self._unsub_flush = None
+
+    async def async_start(self, since: Optional[int]):
+        self._unsubs = [
+            async_dispatcher_connect(self.hass, SIGNAL_CACHE_UPDATED, self._async_cache_updated),
+            async_dispatcher_connect(self.hass, SIGNAL_SCAN, self._async_scan),
+        ]
+        if since is None:
+            self._async_flush()
+            return
+
+        delta = await self.hass.data[DOMAIN]["cache"].changes_since(since)
+        if delta is None:
+            self._overflowed = True
+        else:
+            # Updates received while the delta was read are newer: keep them
+            changed, removed = delta
+            for barcode, entry in changed.items():
+                self._entries.setdefault(barcode, dict(entry))
+            for barcode in removed:
+                self._entries.setdefault(barcode, None)
+        self._async_flush()
+
+    @callback
+    def async_unsubscribe(self):
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+        if self._unsub_flush:
+            self._unsub_flush()
+            self._unsub_flush = None
+
+    @callback
+    def _async_cache_updated(self, barcode: str, entry: Optional[Dict[str, Any]], version: int):
+        if self._overflowed:
+            return
+        self._entries[barcode] = dict(entry) if entry is not None else None
+        if len(self._entries) > MAX_PENDING_ENTRIES:
+            # Slow consumer: stop buffering, the client refetches instead
+            self._entries.clear()
+            self._overflowed = True
+        self._schedule_flush()
+
+    @callback
+    def _async_scan(self, scan: Dict[str, Any]):
+        self._scans.append(scan)
+        self._schedule_flush()
+
+    @callback
+    def _schedule_flush(self):
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(self.hass, BATCH_DELAY, self._async_flush)
+
+    @callback
+    def _async_flush(self, _now=None):
+        self._unsub_flush = None
+        data = self.hass.data.get(DOMAIN, {})
+        cache = data.get("cache")
+        if cache is None:
+            return
+
+        message: Dict[str, Any] = {"version": cache.version, "status": _pipeline_status(data)}
+        if self._overflowed:
+            message["resync"] = True
+            self._overflowed = False
+        elif self._entries:
+            message["entries"] = {b: e for b, e in self._entries.items() if e is not None}
+            message["removed"] = [b for b, e in self._entries.items() if e is None]
+        self._entries = {}
+        if self._scans:
+            message["scans"] = list(self._scans)
+            self._scans.clear()
+
+        self._connection.send_message(websocket_api.event_message(self._msg_id, message))
+
+
+def _pipeline_status(data: Dict[str, Any]) -> Dict[str, Any]:
+    scan_queue = data.get("scan_queue")
+    resolver = data.get("resolver")
+    return {
+        "queue_depth": scan_queue.depth if scan_queue else 0,
+        "resolver_pending": resolver.pending if resolver else 0,
+        "cache_size": len(data["cache"]),
+    }
@@ -0,0 +1,17 @@
+import asyncio
+
+import pytest
+
+from tests.fake_hass import async_create_hass
+
+
+@pytest.fixture
+def hass(tmp_path):
+    """Home Assistant core with a fake todo list; run coroutines with ``hass.loop.run_until_complete``."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    hass = loop.run_until_complete(async_create_hass(str(tmp_path)))
+    yield hass
+    loop.run_until_complete(hass.async_stop(force=True))
+    loop.close()
+    asyncio.set_event_loop(None)
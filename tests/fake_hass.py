@@ -0,0 +1,130 @@
+"""Minimal Home Assistant for the tests and benchmarks.
+
+The bus, service registry and state machine are Home Assistant's own (the
+``homeassistant`` package must be installed); the todo list, the HTTP server
+and config entries are small stand-ins so the integration can be set up
+without bootstrapping a full instance.
+"""
+import asyncio
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+
+TODO_ENTITY = "todo.shopping_list"
+
+
+class FakeTodoList:
+    """``todo.*`` services backed by a list; the entity state is the active count."""
+
+    def __init__(self, hass: HomeAssistant, entity_id: str = TODO_ENTITY, latency: float = 0.0):
+        self.hass = hass
+        self.entity_id = entity_id
+        self.latency = latency
+        self.items: List[Dict[str, Any]] = []
+        self.calls = 0
+
+    def register(self):
+        services = self.hass.services
+        services.async_register("todo", "get_items", self._get_items, supports_response=SupportsResponse.ONLY)
+        services.async_register("todo", "add_item", self._add_item)
+        services.async_register("todo", "update_item", self._update_item)
+        services.async_register("todo", "remove_item", self._remove_item)
+        self._write_state()
+
+    def _write_state(self):
+        active = sum(1 for item in self.items if item["status"] == "needs_action")
+        self.hass.states.async_set(self.entity_id, str(active))
+
+    async def _delay(self):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _find(self, key: str) -> Optional[Dict[str, Any]]:
+        for item in self.items:
+            if key in (item["uid"], item["summary"]):
+                return item
+        return None
+
+    async def _get_items(self, call: ServiceCall):
+        await self._delay()
+        status = call.data.get("status")
+        statuses = [status] if isinstance(status, str) else status
+        return {self.entity_id: {"items": [
+            dict(item) for item in self.items if not statuses or item["status"] in statuses
+        ]}}
+
+    async def _add_item(self, call: ServiceCall):
+        await self._delay()
+        self.items.append({"summary": call.data["item"], "uid": uuid.uuid4().hex, "status": "needs_action"})
+        self._write_state()
+
+    async def _update_item(self, call: ServiceCall):
+        await self._delay()
+        item = self._find(call.data["item"])
+        if item:
+            item["summary"] = call.data.get("rename", item["summary"])
+            item["status"] = call.data.get("status", item["status"])
+            self._write_state()
+
+    async def _remove_item(self, call: ServiceCall):
+        await self._delay()
+        keys = call.data["item"]
+        for key in keys if isinstance(keys, list) else [keys]:
+            item = self._find(key)
+            if item:
+                self.items.remove(item)
+        self._write_state()
+
+
+class FakeHttp:
+    def register_view(self, view):
+        pass
+
+
+class FakeConfigEntries:
+    """Platforms are not set up; callers drive the pipeline directly."""
+
+    async def async_forward_entry_setups(self, entry, platforms):
+        pass
+
+    async def async_unload_platforms(self, entry, platforms) -> bool:
+        return True
+
+    async def async_reload(self, entry_id: str):
+        pass
+
+
+class FakeConfigEntry:
+    def __init__(self, data: Dict[str, Any], options: Dict[str, Any]):
+        self.entry_id = uuid.uuid4().hex
+        self.data = data
+        self.options = options
+        self._on_unload: List[Callable[[], None]] = []
+
+    def async_on_unload(self, func: Callable[[], None]):
+        self._on_unload.append(func)
+
+    def add_update_listener(self, listener) -> Callable[[], None]:
+        return lambda: None
+
+    def async_create_background_task(self, hass: HomeAssistant, target, name: str, eager_start: bool = False):
+        task = hass.async_create_background_task(target, name)
+        self._on_unload.append(task.cancel)
+        return task
+
+    def async_unload(self):
+        while self._on_unload:
+            self._on_unload.pop()()
+
+
+async def async_create_hass(config_dir: str, todo_latency: float = 0.0) -> HomeAssistant:
+    hass = HomeAssistant(config_dir)
+    hass.http = FakeHttp()
+    hass.config_entries = FakeConfigEntries()
+    todo = FakeTodoList(hass, latency=todo_latency)
+    todo.register()
+    hass.data["fake_todo"] = todo
+    return hass
+
@@ -0,0 +1,40 @@
+from custom_components.beepbasket.barcode import is_in_store, is_variable_measure, normalize_barcode
+
+
+def test_store_internal_prefix_04_is_in_store_and_kept_as_scanned():
+    # UPC-A with number system 4: a store-assigned number
+    key = normalize_barcode("412345678903")
+    assert key == "0412345678903"
+    assert is_in_store(key)
+    assert not is_variable_measure(key)
+
+
+def test_variable_measure_codes_drop_the_price_and_are_in_store():
+    key = normalize_barcode("2012345012349")
+    assert key == "2012345000001"
+    assert is_in_store(key)
+
+
+def test_regular_products_are_not_in_store():
+    assert not is_in_store(normalize_barcode("5449000000996"))
+
+
+def test_valid_ean8_is_not_read_as_upce():
+    # Also a valid UPC-E (→ 012345000058), but EAN-8 wins
+    assert normalize_barcode("01234558") == "01234558"
+
+
+def test_upce_expands_to_its_upca_key():
+    assert normalize_barcode("04252614") == normalize_barcode("042100005264") == "0042100005264"
+
+
+def test_numeric_codes_of_other_lengths_pass_through():
+    # Code 128 / ITF numbers without a GTIN check digit
+    assert normalize_barcode("123456789") == "123456789"
+    assert normalize_barcode("123456789012345678") == "123456789012345678"
+    assert normalize_barcode("1234567") is None
+    assert normalize_barcode("123456789012345678901") is None
+
+
+def test_gtin_lengths_still_need_a_valid_check_digit():
+    assert normalize_barcode("5449000000997") is None
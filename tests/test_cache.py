@@ -0,0 +1,265 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from custom_components.beepbasket.cache import BarcodeCache
+from custom_components.beepbasket.search import ProductSearchIndex
+
+BARCODE = "5449000000996"
+
+
+def _cache(hass, backend="json"):
+    cache = BarcodeCache(os.path.join(hass.config.config_dir, "barcode_cache.json"), hass, backend)
+    hass.loop.run_until_complete(cache.load())
+    return cache
+
+
+def test_import_keeps_complete_over_newer_unknown(hass):
+    cache = _cache(hass)
+
+    async def scenario():
+        await cache.set_product(BARCODE, {"name": "Coca-Cola", "source": "openfoodfacts"})
+        incoming = {
+            "status": "unknown",
+            "name": BARCODE,
+            "scanned_count": 1,
+            "first_seen": "2099-01-01T00:00:00",
+        }
+        taken = await cache.async_import({BARCODE: incoming})
+        return taken, await cache.get(BARCODE)
+
+    taken, entry = hass.loop.run_until_complete(scenario())
+    assert taken == 0
+    assert entry["status"] == "complete"
+    assert entry["name"] == "Coca-Cola"
+
+
+def test_import_takes_newer_complete_and_keeps_scan_count(hass):
+    cache = _cache(hass)
+
+    async def scenario():
+        await cache.set_product(BARCODE, {"name": "Old", "source": "openfoodfacts", "scanned_count": 4}, scans=1)
+        incoming = {
+            "status": "complete",
+            "name": "New",
+            "scanned_count": 1,
+            "last_updated": "2099-01-01T00:00:00",
+        }
+        taken = await cache.async_import({BARCODE: incoming})
+        return taken, await cache.get(BARCODE)
+
+    taken, entry = hass.loop.run_until_complete(scenario())
+    assert taken == 1
+    assert entry["name"] == "New"
+    assert entry["scanned_count"] == 5
+
+
+def test_changes_since_with_status_removes_entries_that_stop_matching(hass):
+    cache = _cache(hass)
+
+    async def scenario():
+        await cache.set_unknown(BARCODE)
+        since = cache.version
+        await cache.set_product(BARCODE, {"name": "Coca-Cola", "source": "openfoodfacts"})
+        return await cache.changes_since(since, "unknown"), await cache.changes_since(since, "complete")
+
+    (unknown_changed, unknown_removed), (complete_changed, complete_removed) = hass.loop.run_until_complete(scenario())
+    assert unknown_changed == {}
+    assert unknown_removed == [BARCODE]
+    assert list(complete_changed) == [BARCODE]
+    assert complete_removed == []
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_query_orders_by_last_updated_falling_back_to_first_seen(hass, backend):
+    cache = _cache(hass, backend)
+
+    async def scenario():
+        await cache.set_product(BARCODE, {"name": "Coca-Cola", "source": "openfoodfacts"})
+        # No last_updated: ordered by its (newer) first_seen
+        await cache.set_unknown("4006381333931")
+        rows = await cache.async_query(order_by="last_updated")
+        await cache.async_close()
+        return rows
+
+    rows = hass.loop.run_until_complete(scenario())
+    assert [barcode for barcode, _ in rows] == ["4006381333931", BARCODE]
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_status_filtered_page(hass, backend):
+    cache = _cache(hass, backend)
+
+    async def scenario():
+        await cache.set_product(BARCODE, {"name": "Coca-Cola", "source": "openfoodfacts"})
+        await cache.set_unknown("4006381333931")
+        await cache.set_unknown("0012345678905")
+        first, cursor = await cache.async_page(None, 1, "unknown")
+        second, end = await cache.async_page(cursor, 1, "unknown")
+        await cache.async_close()
+        return list(first), cursor, list(second), end
+
+    first, cursor, second, end = hass.loop.run_until_complete(scenario())
+    assert first == ["0012345678905"]
+    assert cursor == "0012345678905"
+    assert second == ["4006381333931"]
+    assert end is None
+
+
+def test_load_merges_other_spellings_once(hass):
+    path = os.path.join(hass.config.config_dir, "barcode_cache.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"049000050103": {"status": "complete", "name": "Cola", "scanned_count": 2}}, f)
+
+    async def scenario():
+        cache = BarcodeCache(path, hass)
+        await cache.load()
+        merged = await cache.get("0049000050103")
+        await cache.async_close()
+        # A spelling stored after the migration is left alone on the next load
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        snapshot["049000050103"] = {"status": "complete", "name": "Cola"}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        cache = BarcodeCache(path, hass)
+        await cache.load()
+        return merged, await cache.get("049000050103")
+
+    merged, variant = hass.loop.run_until_complete(scenario())
+    assert merged["scanned_count"] == 2
+    assert variant is not None
+
+
+def test_set_product_keeps_scan_history(hass):
+    cache = _cache(hass)
+
+    async def scenario():
+        await cache.set_unknown(BARCODE)
+        await cache.set_unknown(BARCODE)
+        first_seen = (await cache.get(BARCODE))["first_seen"]
+        await cache.set_product(BARCODE, {"name": "Coca-Cola", "source": "manual", "local_override": True})
+        return first_seen, await cache.get(BARCODE)
+
+    first_seen, entry = hass.loop.run_until_complete(scenario())
+    assert entry["scanned_count"] == 2
+    assert entry["first_seen"] == first_seen
+
+
+def test_sqlite_loads_only_max_resident_entries(hass):
+    path = os.path.join(hass.config.config_dir, "barcode_cache.json")
+    barcodes = ["0012345678905", "4006381333931", BARCODE, "0049000050103", "96385074"]
+
+    async def scenario():
+        cache = BarcodeCache(path, hass, "sqlite")
+        await cache.load()
+        for barcode in barcodes:
+            await cache.set_product(barcode, {"name": f"Product {barcode}", "source": "openfoodfacts"})
+        await cache.async_close()
+
+        cache = BarcodeCache(path, hass, "sqlite", max_resident=2)
+        await cache.load()
+        loaded = cache.resident_count, len(cache)
+        since = cache.version
+        # The oldest entry is not resident: read from the database
+        first = await cache.get(barcodes[0])
+        await cache.remove(barcodes[1])
+        delta = await cache.changes_since(since)
+        entries = await cache.async_entries()
+        page, _ = await cache.async_page(None, 10)
+        index = ProductSearchIndex()
+        indexed = await cache.async_scan(index.build)
+        await cache.async_close()
+        hits = index.search("product 0012"), index.search("product 4006")
+        return loaded, first, delta, entries, page, indexed, len(cache), hits
+
+    loaded, first, delta, entries, page, indexed, count, hits = hass.loop.run_until_complete(scenario())
+    assert loaded == (2, 5)
+    assert first["name"] == f"Product {barcodes[0]}"
+    assert delta == ({}, [barcodes[1]])
+    assert set(entries) == set(page) == set(barcodes) - {barcodes[1]}
+    assert indexed == count == 4
+    assert hits == ([barcodes[0]], [])
+
+
+def test_journal_compacts_into_snapshot(hass, monkeypatch):
+    monkeypatch.setattr("custom_components.beepbasket.storage.COMPACT_MIN_RECORDS", 2)
+    path = os.path.join(hass.config.config_dir, "barcode_cache.json")
+    journal_path = os.path.join(hass.config.config_dir, "barcode_cache.journal")
+    barcodes = ["0012345678905", "4006381333931", BARCODE]
+
+    async def scenario():
+        cache = BarcodeCache(path, hass)
+        await cache.load()
+        for barcode in barcodes:
+            await cache.set_product(barcode, {"name": f"Product {barcode}", "source": "openfoodfacts"})
+            await cache.async_flush()
+        with open(journal_path, encoding="utf-8") as f:
+            journaled = len(f.readlines())
+        # One more record than entries: folded into the snapshot
+        await cache.set_product(BARCODE, {"name": "Coca-Cola", "source": "manual", "local_override": True})
+        await cache.async_flush()
+        await cache.async_close()
+        cache = BarcodeCache(path, hass)
+        await cache.load()
+        return journaled, await cache.get(BARCODE), len(cache)
+
+    journaled, entry, count = hass.loop.run_until_complete(scenario())
+    assert journaled == 3
+    assert os.path.getsize(journal_path) == 0
+    with open(path, encoding="utf-8") as f:
+        assert sorted(json.load(f)) == sorted(barcodes)
+    assert entry["name"] == "Coca-Cola"
+    assert count == 3
+
+
+def test_torn_journal_tail_is_skipped_and_folded(hass):
+    path = os.path.join(hass.config.config_dir, "barcode_cache.json")
+    journal_path = os.path.join(hass.config.config_dir, "barcode_cache.journal")
+    with open(journal_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"b": BARCODE, "e": {"status": "complete", "name": "Cola"}}) + "\n")
+        f.write('{"b": "4006381333931", "e": {"status": "comp')
+
+    async def scenario():
+        cache = BarcodeCache(path, hass)
+        await cache.load()
+        recovered = await cache.get(BARCODE), await cache.get("4006381333931")
+        # Appends after recovery must not land behind the torn line
+        await cache.set_product("4006381333931", {"name": "Pen", "source": "manual"})
+        await cache.async_close()
+        cache = BarcodeCache(path, hass)
+        await cache.load()
+        return recovered, await cache.get("4006381333931")
+
+    (cola, torn), pen = hass.loop.run_until_complete(scenario())
+    assert cola["name"] == "Cola"
+    assert torn is None
+    assert pen["name"] == "Pen"
+
+
+def test_negative_cache_window_grows_with_each_miss_and_expires(hass):
+    cache = _cache(hass)
+
+    async def scenario():
+        hours = []
+        for _ in range(4):
+            await cache.set_unknown(BARCODE)
+            retry_after = datetime.fromisoformat((await cache.get(BARCODE))["retry_after"])
+            hours.append(round((retry_after - datetime.now()).total_seconds() / 3600))
+        entry = dict(await cache.get(BARCODE))
+        # A scan served from the window does not extend it
+        await cache.set_unknown(BARCODE, lookup_missed=False)
+        served = dict(await cache.get(BARCODE))
+        await cache.clear_negative(BARCODE)
+        return hours, entry, served, dict(await cache.get(BARCODE))
+
+    hours, entry, served, cleared = hass.loop.run_until_complete(scenario())
+    assert hours == [1, 6, 24, 24]
+    assert BarcodeCache.in_negative_window(entry)
+    assert served["retry_after"] == entry["retry_after"]
+    assert served["scanned_count"] == 5
+    expired = {**entry, "retry_after": (datetime.now() - timedelta(seconds=1)).isoformat()}
+    assert not BarcodeCache.in_negative_window(expired)
+    assert not BarcodeCache.in_negative_window(cleared)
@@ -0,0 +1,65 @@
+import asyncio
+
+from custom_components.beepbasket.const import OVERFLOW_COALESCE, OVERFLOW_DROP_OLDEST
+from custom_components.beepbasket.ingest import ScanQueue
+
+
+def _queue(hass, handled, maxsize=10, dedup_window=0.0, overflow=OVERFLOW_COALESCE):
+    async def handler(barcode, queued_at):
+        await asyncio.sleep(0.01)
+        handled.append(barcode)
+
+    return ScanQueue(hass, handler, maxsize=maxsize, workers=1, dedup_window=dedup_window, overflow=overflow)
+
+
+def test_coalesce_rejects_waiting_barcode_and_full_queue(hass):
+    handled = []
+    queue = _queue(hass, handled, maxsize=2)
+
+    submitted = [queue.async_submit(barcode) for barcode in ("a", "a", "b", "c")]
+
+    assert submitted == [True, False, True, False]
+    assert queue.depth == 2
+    assert queue.stats["coalesced"] == 1
+    assert queue.stats["dropped"] == 1
+
+
+def test_drop_oldest_keeps_newest_scans(hass):
+    handled = []
+    queue = _queue(hass, handled, maxsize=2, overflow=OVERFLOW_DROP_OLDEST)
+
+    async def scenario():
+        for barcode in ("a", "b", "c"):
+            queue.async_submit(barcode)
+        queue.async_start()
+        await queue.async_stop()
+
+    hass.loop.run_until_complete(scenario())
+    assert handled == ["b", "c"]
+    assert queue.stats["dropped"] == 1
+
+
+def test_repeat_within_window_is_debounced(hass):
+    handled = []
+    queue = _queue(hass, handled, dedup_window=60.0)
+
+    assert queue.async_submit("a")
+    assert not queue.async_submit("a")
+    assert queue.async_submit("b")
+    assert queue.stats["deduplicated"] == 1
+
+
+def test_stop_drains_waiting_scans(hass):
+    handled = []
+    queue = _queue(hass, handled)
+
+    async def scenario():
+        queue.async_start()
+        for barcode in ("a", "b", "c"):
+            queue.async_submit(barcode)
+        await queue.async_stop()
+
+    hass.loop.run_until_complete(scenario())
+    assert handled == ["a", "b", "c"]
+    assert queue.depth == 0
+    assert queue.stats["processed"] == 3
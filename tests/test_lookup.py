@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from custom_components.beepbasket import lookup
+from custom_components.beepbasket.lookup import (
+    LookupClient,
+    LookupProvider,
+    LookupUnavailable,
+    build_providers,
+    provider_timeouts,
+)
+
+BARCODE = "5449000000996"
+
+
+class _Server:
+    """Product API whose answer per path (``ok``, ``slow``, ``fail``) can be switched."""
+
+    def __init__(self):
+        self.modes = {}
+        self.requests = {}
+        self._runner = None
+        self._released = asyncio.Event()
+        self.port = 0
+
+    def url(self, path: str, mode: str) -> str:
+        self.modes[path] = mode
+        return f"http://127.0.0.1:{self.port}/{path}/{{barcode}}"
+
+    async def async_start(self):
+        app = web.Application()
+        app.router.add_get("/{path}/{barcode}", self._product)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def async_stop(self):
+        self._released.set()
+        await self._runner.cleanup()
+
+    async def _product(self, request: web.Request) -> web.Response:
+        path = request.match_info["path"]
+        self.requests[path] = self.requests.get(path, 0) + 1
+        mode = self.modes[path]
+        if mode == "fail":
+            return web.json_response({"status": 0}, status=503)
+        if mode == "slow":
+            # Answers only once the test is over
+            await self._released.wait()
+        return web.json_response({"status": 1, "product": {"product_name": f"Cola from {path}"}})
+
+
+@pytest.fixture
+def server(hass):
+    server = _Server()
+    hass.loop.run_until_complete(server.async_start())
+    yield server
+    hass.loop.run_until_complete(server.async_stop())
+
+
+def test_hedged_lookup_returns_first_product(hass, server):
+    providers = [
+        LookupProvider("slow", server.url("slow", "slow"), 5.0, 0),
+        LookupProvider("fast", server.url("fast", "ok"), 5.0, 1),
+    ]
+
+    async def scenario():
+        client = LookupClient(hass, providers=providers, hedge_delay=0.05)
+        return await client.async_lookup(BARCODE)
+
+    product = hass.loop.run_until_complete(scenario())
+
+    assert product["source"] == "fast"
+    assert product["name"] == "Cola from fast"
+
+
+def test_breaker_opens_after_failures_and_recovers(hass, server, monkeypatch):
+    monkeypatch.setattr(lookup, "BREAKER_COOLDOWN", 0.1)
+    provider = LookupProvider("flaky", server.url("flaky", "fail"), 5.0, 0)
+
+    async def scenario():
+        client = LookupClient(hass, providers=[provider], hedge_delay=0)
+        for _ in range(lookup.BREAKER_THRESHOLD):
+            with pytest.raises(LookupUnavailable):
+                await client.async_lookup(BARCODE)
+        opened = provider.available
+        # Skipped while open: no request reaches the server
+        with pytest.raises(LookupUnavailable, match="circuit open"):
+            await client.async_lookup(BARCODE)
+        requests = server.requests["flaky"]
+        server.modes["flaky"] = "ok"
+        await asyncio.sleep(0.15)
+        return opened, requests, await client.async_lookup(BARCODE)
+
+    opened, requests, product = hass.loop.run_until_complete(scenario())
+    assert not opened
+    assert requests == lookup.BREAKER_THRESHOLD
+    assert product["source"] == "flaky"
+    assert provider.failures == 0
+    assert provider.available
+
+
+def test_each_provider_gets_its_own_timeout():
+    # An older shared lookup_timeout fills in for providers without their own
+    timeouts = provider_timeouts({"lookup_timeout": 8.0, "openbeautyfacts_timeout": 2.0})
+    providers = build_providers(["openfoodfacts", "openbeautyfacts"], "http://127.0.0.1/{barcode}", timeouts, 1.0)
+
+    assert [(provider.name, provider.timeout.total) for provider in providers] == [
+        ("local", 1.0), ("openfoodfacts", 8.0), ("openbeautyfacts", 2.0),
+    ]
+    assert provider_timeouts({})["openfoodfacts"] > provider_timeouts({})["openproductsfacts"]
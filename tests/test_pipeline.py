@@ -0,0 +1,71 @@
+import asyncio
+import os
+
+from tests.fake_hass import TODO_ENTITY, FakeConfigEntry
+from custom_components.beepbasket import async_setup_entry, async_unload_entry
+from custom_components.beepbasket.const import CONF_DEDUP_WINDOW, CONF_PROVIDERS, CONF_SCANNER_ENTITIES, DOMAIN
+
+BARCODE = "5449000000996"
+
+
+async def _setup(hass, **options):
+    os.makedirs(hass.config.path(f"custom_components/{DOMAIN}"), exist_ok=True)
+    entry = FakeConfigEntry(
+        {"shopping_list_entity": TODO_ENTITY, CONF_SCANNER_ENTITIES: []},
+        {CONF_DEDUP_WINDOW: 0, CONF_PROVIDERS: [], **options},
+    )
+    await async_setup_entry(hass, entry)
+    await asyncio.wait_for(hass.data[DOMAIN]["ready"].wait(), 5)
+    return entry
+
+
+async def _drain(hass, scans: int):
+    scan_queue = hass.data[DOMAIN]["scan_queue"]
+    while scan_queue.stats["processed"] + scan_queue.stats["failed"] < scans or scan_queue.depth:
+        await asyncio.sleep(0.01)
+
+
+def test_cache_hits_count_every_scan(hass):
+    async def scenario():
+        entry = await _setup(hass)
+        cache = hass.data[DOMAIN]["cache"]
+        await cache.set_product(BARCODE, {"name": "Coca-Cola", "source": "manual", "local_override": True})
+        for scans in (1, 2):
+            # One at a time: a barcode already waiting in the queue is coalesced
+            hass.bus.async_fire("barcode_scanned", {"barcode": BARCODE})
+            await asyncio.wait_for(_drain(hass, scans), 5)
+        scanned = dict(await cache.get(BARCODE))
+        await async_unload_entry(hass, entry)
+        return scanned
+
+    scanned = hass.loop.run_until_complete(scenario())
+    assert scanned["scanned_count"] == 2
+    assert scanned["last_scanned"] >= scanned["first_seen"]
+
+
+def test_item_renamed_elsewhere_is_added_again(hass):
+    async def scenario():
+        entry = await _setup(hass)
+        await hass.data[DOMAIN]["cache"].set_product(BARCODE, {"name": "Coca-Cola", "source": "manual"})
+        hass.bus.async_fire("barcode_scanned", {"barcode": BARCODE})
+        await asyncio.wait_for(_drain(hass, 1), 5)
+        # Renamed in another app: the active count does not change
+        await hass.services.async_call(
+            "todo", "update_item", {"entity_id": TODO_ENTITY, "item": "Coca-Cola", "rename": "Cola Zero"}, blocking=True
+        )
+        hass.bus.async_fire("barcode_scanned", {"barcode": BARCODE})
+        await asyncio.wait_for(_drain(hass, 2), 5)
+        await async_unload_entry(hass, entry)
+        return [item["summary"] for item in hass.data["fake_todo"].items]
+
+    assert hass.loop.run_until_complete(scenario()) == ["Cola Zero", "Coca-Cola"]
+
+
+def test_unload_removes_services(hass):
+    async def scenario():
+        entry = await _setup(hass)
+        registered = hass.services.has_service(DOMAIN, "scan_batch")
+        await async_unload_entry(hass, entry)
+        return registered, hass.services.has_service(DOMAIN, "scan_batch")
+
+    assert hass.loop.run_until_complete(scenario()) == (True, False)
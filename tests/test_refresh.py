@@ -0,0 +1,52 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+from tests.fake_hass import TODO_ENTITY
+from custom_components.beepbasket import refresh
+from custom_components.beepbasket.cache import BarcodeCache
+from custom_components.beepbasket.refresh import ProductRefresher
+from custom_components.beepbasket.shopping_list import ShoppingListMirror
+from custom_components.beepbasket.stats import PipelineStats
+
+BARCODE = "5449000000996"
+
+
+def test_stale_entry_is_served_then_refreshed(hass, monkeypatch):
+    monkeypatch.setattr(refresh, "REFRESH_SPACING", 0)
+    cache = BarcodeCache(os.path.join(hass.config.config_dir, "barcode_cache.json"), hass)
+    lookups = []
+
+    async def async_lookup(barcode):
+        lookups.append(barcode)
+        return {"name": "Coca-Cola Zero", "brands": "Coca-Cola", "categories": "", "source": "openfoodfacts"}
+
+    async def scenario():
+        await cache.load()
+        await cache.async_import({BARCODE: {
+            "status": "complete", "name": "Coca-Cola", "source": "openfoodfacts",
+            "scanned_count": 4, "last_updated": "2020-01-01T00:00:00",
+        }})
+        await cache.set_product("4006381333931", {"name": "Pen", "source": "openfoodfacts"})
+        stats = PipelineStats()
+        refresher = ProductRefresher(
+            hass, cache, SimpleNamespace(async_lookup=async_lookup), ShoppingListMirror(hass, TODO_ENTITY),
+            SimpleNamespace(pending=0), stats, max_age_days=30, budget=10, idle_start=0, idle_end=0,
+        )
+        refresher.async_start()
+        # What a scan does: serve the cached entry, request a refresh
+        served = dict(await cache.get(BARCODE))
+        refresher.async_request(BARCODE, await cache.get(BARCODE))
+        refresher.async_request("4006381333931", await cache.get("4006381333931"))
+        while not stats.counters["refresh_updated"]:
+            await asyncio.sleep(0.01)
+        await refresher.async_stop()
+        return served, dict(await cache.get(BARCODE)), stats.counters
+
+    served, refreshed, counters = hass.loop.run_until_complete(asyncio.wait_for(scenario(), 5))
+    assert served["name"] == "Coca-Cola"
+    assert lookups == [BARCODE]
+    assert counters["refresh_queued"] == 1
+    assert refreshed["name"] == "Coca-Cola Zero"
+    assert refreshed["scanned_count"] == 4
+    assert refreshed["last_updated"] > "2020-01-01T00:00:00"
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+from aiohttp import StreamReader
+from aiohttp.base_protocol import BaseProtocol
+
+from custom_components.beepbasket.cache import BarcodeCache
+from custom_components.beepbasket.transfer import async_import_ndjson, parse_line
+
+BARCODE = "5449000000996"
+
+
+def _content(hass, data: bytes) -> StreamReader:
+    reader = StreamReader(BaseProtocol(hass.loop), 2 ** 16, loop=hass.loop)
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+@pytest.mark.parametrize("line", [
+    b'{"barcode": "5449000000996", "status": "complete", "name": "Cola", "scanned_count": "3"}',
+    b'{"barcode": "5449000000996", "status": "complete", "name": "Cola", "scanned_count": true}',
+    b'{"barcode": "5449000000996", "status": "complete", "name": "Cola", "last_updated": 17}',
+    b'{"barcode": "5449000000996", "status": "complete", "name": "Cola", "brands": ["A"]}',
+    b'{"barcode": 5449000000996, "status": "complete", "name": "Cola"}',
+])
+def test_parse_line_rejects_wrongly_typed_fields(line):
+    with pytest.raises(ValueError):
+        parse_line(line)
+
+
+def test_import_counts_wrongly_typed_line_as_invalid(hass):
+    cache = BarcodeCache(os.path.join(hass.config.config_dir, "barcode_cache.json"), hass)
+    hass.loop.run_until_complete(cache.load())
+    data = (
+        b'{"barcode": "4006381333931", "status": "complete", "name": "Pen", "last_updated": 17}\n'
+        b'{"barcode": "5449000000996", "status": "complete", "name": "Cola", '
+        b'"last_updated": "2026-01-01T00:00:00"}\n'
+    )
+
+    async def scenario():
+        await cache.set_product("4006381333931", {"name": "Marker", "source": "manual"})
+        result = await async_import_ndjson(cache, _content(hass, data))
+        return result, await cache.get("4006381333931"), await cache.get(BARCODE)
+
+    result, kept, imported = hass.loop.run_until_complete(scenario())
+    assert result["invalid"] == 1
+    assert result["imported"] == 1
+    assert result["errors"][0].startswith("line 1:")
+    assert kept["name"] == "Marker"
+    assert imported["name"] == "Cola"